@@ -33,10 +33,32 @@ from __future__ import annotations
 import math
 import random
 from dataclasses import dataclass
-from typing import Sequence
+from typing import TYPE_CHECKING, Sequence
 
 from gaokao.data import Province, PROVINCES
 
+if TYPE_CHECKING:  # seeds may be numpy streams; numpy is never imported
+    import numpy as np
+
+    SeedLike = (int | random.Random | np.random.SeedSequence
+                | np.random.Generator | None)
+
+
+def _make_rng(seed: SeedLike) -> random.Random:
+    """Local random.Random from None, an int or a random.Random.
+
+    A numpy SeedSequence or Generator (a worker's child stream) is also
+    accepted by duck typing and reduced to an integer seed, so the
+    module stays stdlib only.
+    """
+    if isinstance(seed, random.Random):
+        return seed
+    if hasattr(seed, "generate_state"):  # numpy SeedSequence
+        seed = int.from_bytes(seed.generate_state(4).tobytes(), "little")
+    elif hasattr(seed, "integers"):  # numpy Generator
+        seed = int(seed.integers(2**63))
+    return random.Random(seed)
+
 
 @dataclass
 class BandConfig:
@@ -216,7 +238,7 @@ class ReformModel:
     def band_shuffle(
         scores: list[int],
         band_width: int = 5,
-        seed: int | None = None,
+        seed: SeedLike = None,
     ) -> list[int]:
         """Shuffle students within each score band.
 
@@ -224,10 +246,10 @@ class ReformModel:
         and randomly permutes within each band. Returns new ordering indices.
 
         This models the "within-band randomization" that removes
-        the one-point-one-fate problem.
+        the one-point-one-fate problem.  Shuffles draw from a local
+        generator built from `seed`, never from the global `random` state.
         """
-        if seed is not None:
-            random.seed(seed)
+        rng = _make_rng(seed)
 
         n = len(scores)
         indexed = list(range(n))
@@ -245,7 +267,7 @@ class ReformModel:
         result: list[int] = []
         for bk in sorted(bands.keys(), reverse=True):
             group = bands[bk]
-            random.shuffle(group)
+            rng.shuffle(group)
             result.extend(group)
 
         return result
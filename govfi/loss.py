@@ -20,9 +20,32 @@ from __future__ import annotations
 import math
 import random
 from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 from govfi.ledger import Ledger
 
+if TYPE_CHECKING:  # seeds may be numpy streams; numpy is never imported
+    import numpy as np
+
+    SeedLike = (int | random.Random | np.random.SeedSequence
+                | np.random.Generator | None)
+
+
+def _make_rng(seed: SeedLike) -> random.Random:
+    """Private random.Random for one simulation run.
+
+    `seed` may be None, an int, a random.Random (used as is), or a numpy
+    SeedSequence / Generator — e.g. a child stream handed to a worker —
+    from which an integer seed is drawn; numpy itself is not imported.
+    """
+    if isinstance(seed, random.Random):
+        return seed
+    if hasattr(seed, "generate_state"):  # numpy SeedSequence
+        seed = int.from_bytes(seed.generate_state(4).tobytes(), "little")
+    elif hasattr(seed, "integers"):  # numpy Generator
+        seed = int(seed.integers(2**63))
+    return random.Random(seed)
+
 
 @dataclass
 class BreakpointEvent:
@@ -207,15 +230,16 @@ class LossField:
         sigma: float = 0.0,
         dt: float = 0.01,
         T: float = 10.0,
-        seed: int | None = None,
+        seed: SeedLike = None,
     ) -> tuple[list[float], list[float], list[str]]:
         """Solve L'(t) = r L(t) - a(t - delta_lag) [+ sigma dW].
 
         Returns (t_arr, L_arr, events).
         The delay term a(t - delta_lag) kicks in only after t > delta_lag.
+        The noise comes from a private generator built from `seed` (see
+        _make_rng); the global `random` state is left untouched.
         """
-        if seed is not None:
-            random.seed(seed)
+        rng = _make_rng(seed)
 
         B = self.ledger.project.budget
         n_steps = int(T / dt)
@@ -237,7 +261,7 @@ class LossField:
 
             # Stochastic term
             if sigma > 0:
-                dW = random.gauss(0, math.sqrt(dt))
+                dW = rng.gauss(0, math.sqrt(dt))
                 dL += sigma * dW
 
             L_t = max(L_t + dL, 0.0)
@@ -0,0 +1,101 @@
+"""
+Anderson Acceleration for Fixed-Point Iterations
+
+Accelerates x ← G(x) (here: the PMP control update u ← u*(p(u))) by
+mixing the last m iterates so that the linearised residual is minimal
+[Walker & Ni 2011, type-II]:
+
+    f_k = G(x_k) − x_k
+    γ   = argmin ‖f_k − ΔF γ‖         ΔF, ΔX: last m differences
+    x⁺  = x_k + β f_k − (ΔX + β ΔF) γ
+
+With m = 0 this is the damped update x⁺ = (1 − β) x + β G(x).
+
+Safeguarding: the history is dropped and a plain damped step taken
+whenever the residual grows by more than `restart_ratio` or the
+least-squares coefficients blow up (ill-conditioned history).
+"""
+
+import numpy as np
+
+
+class AndersonMixer:
+    """Type-II Anderson mixing with restart safeguards.
+
+    Parameters
+    ----------
+    m : int
+        History window (number of previous differences kept).
+    beta : float
+        Default mixing / damping parameter.
+    reg : float
+        Tikhonov regularisation of the least-squares problem.
+    restart_ratio : float
+        Restart when ‖f_k‖ > restart_ratio · ‖f_{k−1}‖.
+    max_coef : float
+        Restart when ‖γ‖ exceeds this.
+    """
+
+    def __init__(self, m=5, beta=0.3, reg=1e-10, restart_ratio=2.0,
+                 max_coef=1e3):
+        self.m = m
+        self.beta = beta
+        self.reg = reg
+        self.restart_ratio = restart_ratio
+        self.max_coef = max_coef
+        self.reset()
+
+    def reset(self):
+        """Forget the history."""
+        self._dx = []
+        self._df = []
+        self._x_prev = None
+        self._f_prev = None
+        self.n_restarts = 0
+
+    def update(self, x, g, beta=None):
+        """Next iterate from the current x and its image g = G(x).
+
+        Parameters
+        ----------
+        x, g : arrays of equal shape
+        beta : float or None — overrides the default mixing parameter
+
+        Returns
+        -------
+        x_next : array of the same shape
+        """
+        beta = self.beta if beta is None else beta
+        shape = x.shape
+        x = x.ravel()
+        f = g.ravel() - x
+
+        if self._f_prev is not None:
+            if np.linalg.norm(f) > self.restart_ratio * np.linalg.norm(
+                    self._f_prev):
+                self._dx.clear()
+                self._df.clear()
+                self.n_restarts += 1
+            else:
+                self._dx.append(x - self._x_prev)
+                self._df.append(f - self._f_prev)
+                if len(self._dx) > self.m:
+                    self._dx.pop(0)
+                    self._df.pop(0)
+        self._x_prev, self._f_prev = x.copy(), f.copy()
+
+        x_next = x + beta * f
+        if self._df:
+            dF = np.stack(self._df, axis=1)
+            dX = np.stack(self._dx, axis=1)
+            A = dF.T @ dF
+            A += self.reg * max(np.trace(A), 1.0) * np.eye(len(A))
+            gamma = np.linalg.solve(A, dF.T @ f)
+            if np.all(np.isfinite(gamma)) and \
+                    np.linalg.norm(gamma) < self.max_coef:
+                x_next = x_next - (dX + beta * dF) @ gamma
+            else:
+                self._dx.clear()
+                self._df.clear()
+                self.n_restarts += 1
+        return x_next.reshape(shape)
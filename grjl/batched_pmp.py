@@ -0,0 +1,290 @@
+"""
+Batched Multi-Start PMP Solver
+
+Runs B independent gravity damper OCPs — different initial conditions
+and/or ε, α settings — through the forward-backward sweep of
+pmp_solver.py together.  States, controls and costates are carried as
+(B, N+1, 6n) / (B, N, 3) arrays; every time step is one vectorised
+update over the batch:
+
+    forward    a(q), λ₁ = eigvalsh(L(q))       batched (B, n, n) eigensolve
+    backward   ṗ = −∂H/∂x with the analytical ∂H/∂x of jacobians.py
+               (replaces the 2·6n-point finite difference per step)
+    update     damped or Anderson blend, only for unconverged problems
+
+Each problem keeps its own convergence test (same criterion as
+PontryaginSolver.solve); converged problems drop out of the active set,
+so the remaining sweeps shrink with the batch.
+
+Usage:
+    python batched_pmp.py          # 100-start sweep vs serial solver
+
+Requirements: numpy
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+
+from pmp_solver import PontryaginSolver, benchmark_state
+from anderson import AndersonMixer
+from jacobians import (gravity_accelerations, gravity_jacobian,
+                       potential_terms, tidal_laplacian, lambda1_gradient)
+
+
+class BatchedPontryaginSolver(PontryaginSolver):
+    """Forward-backward sweep over a batch of OCPs.
+
+    Parameters
+    ----------
+    masses : list of float
+        Masses [m1, m2, m3, m_star] (shared by the batch).
+    G, u_max, dt : float
+    alpha, epsilon : float or (B,) array
+        Control weight and spectral threshold, per problem if arrays.
+    softening : float
+    """
+
+    def __init__(self, masses, G=0.5, alpha=0.05, epsilon=0.02,
+                 u_max=5.0, dt=0.002, softening=0.05):
+        super().__init__(masses, G=G, alpha=alpha, epsilon=epsilon,
+                         u_max=u_max, dt=dt)
+        self.softening = softening
+        self._m = np.asarray(self.masses, dtype=float)
+
+    def _per_problem(self, value, B):
+        return np.broadcast_to(np.asarray(value, dtype=float), (B,))
+
+    def _split(self, X):
+        """(B, 6n) → q (B, n, 3), v (B, n, 3)."""
+        n = self.n_bodies
+        return (X[:, :3 * n].reshape(-1, n, 3),
+                X[:, 3 * n:].reshape(-1, n, 3))
+
+    # ── Batched kernels ──
+
+    def dynamics_batch(self, X, U):
+        """dx/dt for states (B, 6n) and controls (B, 3)."""
+        q, v = self._split(X)
+        a = gravity_accelerations(q, self._m, self.G, self.softening)
+        a[:, self.damper_idx] += U / self._m[self.damper_idx]
+        return np.concatenate([v.reshape(len(X), -1),
+                               a.reshape(len(X), -1)], axis=1)
+
+    def lambda1_batch(self, X):
+        """Fiedler eigenvalues (B,) from one batched eigensolve."""
+        q, _ = self._split(X)
+        _, L = tidal_laplacian(q, self._m, self.G, self.softening)
+        return np.linalg.eigvalsh(L)[:, 1]
+
+    def lagrangian_batch(self, X, U, alpha):
+        """T − V + (α/2)‖u‖² per problem, (B,)."""
+        q, v = self._split(X)
+        T = 0.5 * np.sum(self._m * np.sum(v * v, axis=-1), axis=-1)
+        phi, _, _ = potential_terms(q, self._m, self.G, self.softening)
+        return T + phi + 0.5 * alpha * np.sum(U * U, axis=-1)
+
+    def multiplier_batch(self, lambda1s, epsilon):
+        """PontryaginSolver.compute_multiplier, vectorised."""
+        return np.maximum(0.0, (epsilon - lambda1s) / epsilon) * 100.0
+
+    def costate_rhs_batch(self, P, X, mu):
+        """dp/dt = −∂H/∂x for H = L + p·f + μ(ε − λ₁).
+
+        ∂H/∂q = ∇Φ + (∂a/∂q)ᵀ p_v − μ ∇λ₁,   ∂H/∂v = M v + p_q.
+        """
+        n3 = 3 * self.n_bodies
+        q, v = self._split(X)
+        _, g_phi, _ = potential_terms(q, self._m, self.G, self.softening)
+        J = gravity_jacobian(q, self._m, self.G, self.softening)
+        _, g_l1 = lambda1_gradient(q, self._m, self.G, self.softening)
+        p_q, p_v = P[:, :n3], P[:, n3:]
+
+        dH_dq = (g_phi + np.einsum('bij,bi->bj', J, p_v)
+                 - mu[:, None] * g_l1)
+        dH_dv = np.repeat(self._m, 3) * v.reshape(len(X), -1) + p_q
+        return -np.concatenate([dH_dq, dH_dv], axis=1)
+
+    # ── Sweeps ──
+
+    def forward_sweep_batch(self, X0, controls):
+        """States (B, N+1, 6n) and λ₁ (B, N) under controls (B, N, 3)."""
+        B, N = controls.shape[:2]
+        states = np.zeros((B, N + 1, X0.shape[1]))
+        states[:, 0] = X0
+        lambda1s = np.zeros((B, N))
+        for t in range(N):
+            lambda1s[:, t] = self.lambda1_batch(states[:, t])
+            states[:, t + 1] = states[:, t] + self.dynamics_batch(
+                states[:, t], controls[:, t]) * self.dt
+        return states, lambda1s
+
+    def backward_sweep_batch(self, states, lambda1s, epsilon):
+        """Costates (B, N+1, 6n) with p(T) = 0 and multipliers (B, N)."""
+        B, N = lambda1s.shape
+        costates = np.zeros_like(states)
+        multipliers = self.multiplier_batch(lambda1s, epsilon[:, None])
+        for t in range(N - 1, -1, -1):
+            dp = self.costate_rhs_batch(costates[:, t + 1], states[:, t],
+                                        multipliers[:, t])
+            costates[:, t] = costates[:, t + 1] - dp * self.dt
+        return costates, multipliers
+
+    def optimal_control_batch(self, costates, alpha):
+        """u* = sat(−p_{v*} / (α m*)) for costates (B, N, 6n)."""
+        n = self.n_bodies
+        i = 3 * n + 3 * self.damper_idx
+        u = -costates[..., i:i + 3] / (
+            alpha[:, None, None] * self._m[self.damper_idx])
+        return np.clip(u, -self.u_max, self.u_max)
+
+    # ── Solve ──
+
+    def solve_batch(self, X0, N, max_iter=20, tol=1e-4, verbose=False,
+                    anderson=0):
+        """Solve B OCPs by forward-backward sweep.
+
+        Parameters
+        ----------
+        X0 : (B, 6n) initial states
+        N : number of time steps
+        max_iter, tol, anderson : as PontryaginSolver.solve, per problem
+        verbose : print the active-set size per iteration
+
+        Returns
+        -------
+        result : dict of batched arrays — states (B, N+1, 6n), controls
+                 (B, N, 3), costates, lambda1s (B, N), multipliers,
+                 arc_types, converged (B,), iterations (B,) — and
+                 cost_history, a list of B per-problem lists.
+        """
+        X0 = np.atleast_2d(np.asarray(X0, dtype=float))
+        B = len(X0)
+        alpha = self._per_problem(self.alpha, B)
+        epsilon = self._per_problem(self.epsilon, B)
+
+        controls = np.zeros((B, N, 3))
+        costates = np.zeros((B, N + 1, X0.shape[1]))
+        multipliers = np.zeros((B, N))
+        cost_history = [[] for _ in range(B)]
+        du = np.full(B, np.inf)
+        iterations = np.zeros(B, dtype=int)
+        active = np.ones(B, dtype=bool)
+        mixers = ([AndersonMixer(m=anderson) for _ in range(B)]
+                  if anderson > 0 else None)
+
+        for iteration in range(max_iter):
+            idx = np.flatnonzero(active)
+            if len(idx) == 0:
+                break
+            U = controls[idx]
+            states, lambda1s = self.forward_sweep_batch(X0[idx], U)
+            P, mu = self.backward_sweep_batch(states, lambda1s, epsilon[idx])
+            U_new = self.optimal_control_batch(P[:, :N], alpha[idx])
+            costates[idx], multipliers[idx] = P, mu
+
+            du[idx] = (np.linalg.norm(U_new - U, axis=(1, 2))
+                       / np.maximum(np.linalg.norm(U, axis=(1, 2)), 1e-10))
+
+            step = min(0.3, 1.0 / (iteration + 1) + 0.1)
+            if mixers is None:
+                U = (1 - step) * U + step * U_new
+            else:
+                U = np.stack([np.clip(mixers[b].update(U[k], U_new[k],
+                                                       beta=step),
+                                      -self.u_max, self.u_max)
+                              for k, b in enumerate(idx)])
+            controls[idx] = U
+
+            # Cost as PontryaginSolver.solve: sweep states, new controls
+            J = sum(self.lagrangian_batch(states[:, t], U[:, t], alpha[idx])
+                    for t in range(N)) * self.dt
+            for k, b in enumerate(idx):
+                cost_history[b].append(J[k])
+            iterations[idx] += 1
+
+            if iteration > 2:
+                active[idx[du[idx] < tol]] = False
+            if verbose:
+                print(f"  iter {iteration:3d}: active={len(idx):4d}  "
+                      f"du_max={np.max(du[idx]):.2e}  "
+                      f"l1_min={np.min(lambda1s):.4f}")
+
+        # Final forward sweep with the converged controls
+        states, lambda1s = self.forward_sweep_batch(X0, controls)
+        u_norm = np.linalg.norm(controls, axis=-1)
+
+        return {
+            'states': states,
+            'controls': controls,
+            'costates': costates,
+            'lambda1s': lambda1s,
+            'multipliers': multipliers,
+            'arc_types': (u_norm > 0.95 * self.u_max).astype(int),
+            'cost_history': cost_history,
+            'converged': du < tol if max_iter > 2 else np.ones(B, bool),
+            'iterations': iterations,
+        }
+
+
+def split_results(result):
+    """Per-problem dicts in the format of PontryaginSolver.solve()."""
+    B = len(result['states'])
+    return [{k: (v[b] if k != 'converged' else bool(v[b]))
+             for k, v in result.items()} for b in range(B)]
+
+
+# ══════════════════════════════════════════════════════════════
+# Benchmark
+# ══════════════════════════════════════════════════════════════
+
+def compare_serial(B=100, N=50, n_serial=2, sigma=0.05, seed=0,
+                   max_iter=20):
+    """Batched sweep of B perturbed starts vs the serial solver.
+
+    The serial PontryaginSolver is timed on the first `n_serial`
+    problems and extrapolated to B; its controls are compared with the
+    batched ones for those problems.
+    """
+    masses = [1.0, 1.0, 1.0, 0.5]
+    batched = BatchedPontryaginSolver(masses)
+    x0 = benchmark_state(batched)
+    rng = np.random.default_rng(seed)
+    n3 = 3 * len(masses)
+    X0 = np.tile(x0, (B, 1))
+    X0[:, :n3] += sigma * rng.standard_normal((B, n3))
+
+    t0 = time.perf_counter()
+    res = batched.solve_batch(X0, N, max_iter=max_iter)
+    t_batch = time.perf_counter() - t0
+
+    serial = PontryaginSolver(masses)
+    t0 = time.perf_counter()
+    diffs = []
+    for b in range(n_serial):
+        r = serial.solve(X0[b], N, max_iter=max_iter)
+        diffs.append(np.max(np.abs(r['controls'] - res['controls'][b])))
+    t_serial = (time.perf_counter() - t0) / n_serial
+
+    print(f"\n  B={B}, N={N}: batched {t_batch:.2f} s "
+          f"({res['converged'].sum()}/{B} converged, "
+          f"mean {res['iterations'].mean():.1f} iters)")
+    print(f"  serial: {t_serial:.2f} s / problem → "
+          f"{t_serial * B:.1f} s for B={B} "
+          f"(speed-up {t_serial * B / t_batch:.0f}×)")
+    print(f"  max |u_batched − u_serial| over {n_serial} problems: "
+          f"{max(diffs):.2e}")
+    return res
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("  Batched multi-start PMP")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+    compare_serial()
@@ -0,0 +1,366 @@
+"""
+Integrators with λ₁-Crossing Event Detection
+
+Pluggable time-stepping layer for the damper simulators.  The existing
+loops use symplectic Euler at a fixed DT and only look at the arc
+(bang / transition / singular) on the grid, so a crossing of λ₁ = ε or
+λ₁ = 2ε is resolved to within one step at best.
+
+Schemes (all share the signature step(q, v, a, h, accel) → q, v, a, err):
+
+    euler      symplectic Euler (1st order) — the legacy scheme
+    verlet     velocity Verlet (2nd order, symplectic)
+    yoshida4   Yoshida triple-jump composition of Verlet (4th order,
+               symplectic)
+    rk45       Dormand–Prince 5(4) with an embedded error estimate and
+               adaptive step size
+
+Events: a switching function s(q) (here λ₁) and sorted `levels`
+(here ε, 2ε) split state space into regions.  Inside a step the region
+— i.e. the arc of the control law — is frozen, so the vector field is
+smooth.  When s crosses a level during a step, the crossing time is
+found by brentq on the step length (re-integrating the sub-step from
+the start of the step) and the step is cut there.
+
+Usage:
+    python integrators.py                  # compare schemes on three-body
+    python integrators.py --t-final 4
+
+Requirements: numpy, scipy
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from scipy.optimize import brentq
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+
+
+# ══════════════════════════════════════════════════════════════
+# One-step schemes
+# ══════════════════════════════════════════════════════════════
+#
+# q, v, a are (n, 3) arrays; a = accel(q) at the start of the step is
+# passed in and the end-of-step acceleration is returned, so a chain of
+# steps costs one force evaluation less per step (FSAL).
+
+def symplectic_euler_step(q, v, a, h, accel):
+    """Symplectic Euler, as in the fixed-DT simulators."""
+    v = v + h * a
+    q = q + h * v
+    return q, v, accel(q), 0.0
+
+
+def verlet_step(q, v, a, h, accel):
+    """Velocity Verlet (kick–drift–kick)."""
+    v_half = v + 0.5 * h * a
+    q = q + h * v_half
+    a = accel(q)
+    return q, v_half + 0.5 * h * a, a, 0.0
+
+
+_YOSHIDA_W1 = 1.0 / (2.0 - 2.0 ** (1.0 / 3.0))
+_YOSHIDA_W0 = -2.0 ** (1.0 / 3.0) * _YOSHIDA_W1
+
+
+def yoshida4_step(q, v, a, h, accel):
+    """Yoshida (1990) 4th-order composition: Verlet at w1·h, w0·h, w1·h."""
+    for w in (_YOSHIDA_W1, _YOSHIDA_W0, _YOSHIDA_W1):
+        q, v, a, _ = verlet_step(q, v, a, w * h, accel)
+    return q, v, a, 0.0
+
+
+# Dormand–Prince 5(4) tableau
+_DP_C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0])
+_DP_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+_DP_B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84, 0.0])
+_DP_E = _DP_B - np.array([5179/57600, 0.0, 7571/16695, 393/640,
+                          -92097/339200, 187/2100, 1/40])
+
+
+def dopri5_step(q, v, a, h, accel, rtol=1e-6, atol=1e-9):
+    """Dormand–Prince 5(4) step for q̇ = v, v̇ = accel(q).
+
+    Returns
+    -------
+    q, v, a : 5th-order solution and accel(q) at the end of the step
+    err : float
+        RMS of the embedded error scaled by atol + rtol·|y|; the step
+        is acceptable when err ≤ 1.
+    """
+    kq = [v]
+    kv = [a]
+    for i in range(1, 7):
+        qi = q + h * sum(c * k for c, k in zip(_DP_A[i], kq) if c)
+        vi = v + h * sum(c * k for c, k in zip(_DP_A[i], kv) if c)
+        kq.append(vi)
+        kv.append(accel(qi))
+    # Stage 7 sits at the 5th-order solution (FSAL)
+    q_new, v_new, a_new = qi, vi, kv[-1]
+
+    eq = h * sum(e * k for e, k in zip(_DP_E, kq) if e)
+    ev = h * sum(e * k for e, k in zip(_DP_E, kv) if e)
+    sq = atol + rtol * np.maximum(np.abs(q), np.abs(q_new))
+    sv = atol + rtol * np.maximum(np.abs(v), np.abs(v_new))
+    err = np.sqrt(0.5 * (np.mean((eq / sq) ** 2) + np.mean((ev / sv) ** 2)))
+    return q_new, v_new, a_new, float(err)
+
+
+SCHEMES = {
+    'euler': symplectic_euler_step,
+    'verlet': verlet_step,
+    'yoshida4': yoshida4_step,
+    'rk45': dopri5_step,
+}
+
+
+# ══════════════════════════════════════════════════════════════
+# Driver with event detection
+# ══════════════════════════════════════════════════════════════
+
+def integrate(accel_fn, q0, v0, t_final, method='yoshida4', h=0.01,
+              switch_fn=None, levels=(), rtol=1e-6, atol=1e-9,
+              h_min=1e-8, h_max=None, stop_fn=None, xtol=1e-12,
+              max_steps=1_000_000):
+    """Integrate q̈ = accel_fn(q, region) with region switching events.
+
+    Parameters
+    ----------
+    accel_fn : callable (q, region) -> (n, 3)
+        Closed-loop acceleration with the control arc frozen to
+        `region` (index into the intervals delimited by `levels`).
+    q0, v0 : (n, 3) arrays
+    t_final : float
+    method : one of SCHEMES
+    h : float
+        Step size (fixed schemes) or initial step (rk45).
+    switch_fn : callable q -> float, optional
+        Switching function s(q), e.g. λ₁.  Without it there is a
+        single region 0 and no events.
+    levels : sequence of float
+        Sorted thresholds; region = number of levels ≤ s.
+    rtol, atol, h_min, h_max : float
+        Error control for rk45 (h_max defaults to 0.1·t_final).
+    stop_fn : callable (t, q, v) -> bool, optional
+        Checked after every accepted step; True ends the run.
+    xtol : float
+        Absolute tolerance on the crossing time.
+
+    Returns
+    -------
+    out : dict with 'time', 'positions', 'velocities', 'region',
+          'switch' (per accepted step, including t = 0), 'events'
+          (list of dicts: time, level, direction), 'n_steps',
+          'n_rejected', 'n_accel', 'stopped'.
+    """
+    scheme = SCHEMES[method]
+    adaptive = method == 'rk45'
+    if adaptive:
+        def step(q, v, a, dt, f):
+            return dopri5_step(q, v, a, dt, f, rtol, atol)
+    else:
+        step = scheme
+    if h_max is None:
+        h_max = 0.1 * t_final
+    levels = np.asarray(levels, dtype=float)
+
+    n_accel = [0]
+
+    def frozen(region):
+        def f(q):
+            n_accel[0] += 1
+            return accel_fn(q, region)
+        return f
+
+    def region_of(s):
+        return int(np.searchsorted(levels, s, side='right'))
+
+    q = np.array(q0, dtype=float)
+    v = np.array(v0, dtype=float)
+    t = 0.0
+    s = switch_fn(q) if switch_fn is not None else 0.0
+    region = region_of(s) if switch_fn is not None else 0
+    f = frozen(region)
+    a = f(q)
+
+    out = {
+        'time': [t],
+        'positions': [q.copy()],
+        'velocities': [v.copy()],
+        'region': [region],
+        'switch': [s],
+        'events': [],
+        'n_steps': 0,
+        'n_rejected': 0,
+        'n_accel': 0,
+        'stopped': False,
+    }
+
+    while t < t_final - 1e-14 and out['n_steps'] < max_steps:
+        dt = min(h, t_final - t)
+        q1, v1, a1, err = step(q, v, a, dt, f)
+
+        if adaptive:
+            factor = 0.9 * max(err, 1e-10) ** -0.2
+            if err > 1.0 and dt > h_min:
+                h = max(h_min, dt * max(0.2, factor))
+                out['n_rejected'] += 1
+                continue
+            h = min(h_max, dt * min(5.0, factor))
+
+        # ── Event location on the frozen-arc step ──
+        crossing = None
+        if switch_fn is not None:
+            s1 = switch_fn(q1)
+            for c in levels:
+                if (s - c) * (s1 - c) >= 0.0:
+                    continue
+
+                def g(tau, c=c):
+                    return switch_fn(step(q, v, a, tau, f)[0]) - c
+                tau = brentq(g, 0.0, dt, xtol=xtol)
+                if crossing is None or tau < crossing[0]:
+                    crossing = (tau, c, 1 if s1 > c else -1)
+
+        if crossing is not None:
+            tau, c, direction = crossing
+            if tau > 0.0:
+                q1, v1, _, _ = step(q, v, a, tau, f)
+            else:
+                q1, v1 = q, v
+            dt = tau
+            s1 = c
+            region = int(np.searchsorted(levels, c)) + (direction > 0)
+            f = frozen(region)
+            a1 = f(q1)
+            out['events'].append({'time': t + tau, 'level': c,
+                                  'direction': direction})
+        elif switch_fn is not None:
+            new_region = region_of(s1)
+            if new_region != region:
+                # Started on a level (sliding along it): switch at the
+                # end of the step instead of locating a crossing at τ=0
+                region = new_region
+                f = frozen(region)
+                a1 = f(q1)
+
+        t += dt
+        q, v, a = q1, v1, a1
+        if switch_fn is not None:
+            s = s1
+        out['n_steps'] += 1
+        out['time'].append(t)
+        out['positions'].append(q.copy())
+        out['velocities'].append(v.copy())
+        out['region'].append(region)
+        out['switch'].append(s)
+
+        if stop_fn is not None and stop_fn(t, q, v):
+            out['stopped'] = True
+            break
+
+    out['n_accel'] = n_accel[0]
+    return out
+
+
+# ══════════════════════════════════════════════════════════════
+# Scheme comparison on the three-body damper
+# ══════════════════════════════════════════════════════════════
+
+def compare_schemes(t_final=8.0, steps=None, rtol=1e-7, epsilon=0.08):
+    """Energy drift (no damper) and switching-time accuracy (damper).
+
+    The reference is rk45 at rtol = 1e-11.  Each fixed-step scheme is
+    run at the step sizes in `steps` (default: the legacy DT and 10×DT).
+    With the default initial conditions λ₁ never gets near the paper's
+    ε = 0.02 while the damper is present, so the switching comparison
+    uses a larger ε to make the arcs actually switch.  Only the first
+    switching time is compared: later ones follow a close encounter
+    inside the softening length, where the force is not smooth and
+    the fixed-step runs part ways with the reference.
+
+    Returns
+    -------
+    rows : list of dicts with method, h, n_accel, wall time, energy
+           drift, number of events and the first switching-time error.
+    """
+    from threebody_damper import simulate_integrated, DT
+
+    if steps is None:
+        steps = (DT, 10 * DT)
+
+    ref = simulate_integrated('rk45', use_damper=True, t_final=t_final,
+                              rtol=1e-11, epsilon=epsilon)
+    ref_events = np.array([e['time'] for e in ref['events']])
+
+    runs = [('euler', DT, None)]
+    for method in ('verlet', 'yoshida4'):
+        runs += [(method, h, None) for h in steps]
+    runs.append(('rk45', DT, rtol))
+
+    print(f"  reference: rk45 rtol=1e-11, {len(ref_events)} events, "
+          f"{ref['n_accel']} force evals")
+    print(f"  {'method':<9} {'h':>7} {'evals':>8} {'ms':>8} "
+          f"{'|ΔE/E₀|':>9} {'events':>7} {'Δt first switch':>16}")
+
+    rows = []
+    for method, h, tol in runs:
+        kw = dict(h=h, t_final=t_final, epsilon=epsilon)
+        if tol is not None:
+            kw['rtol'] = tol
+        t0 = time.perf_counter()
+        log = simulate_integrated(method, use_damper=True, **kw)
+        wall = time.perf_counter() - t0
+        free = simulate_integrated(method, use_damper=False, **kw)
+        E = np.asarray(free['energy'])
+        drift = float(np.max(np.abs(E - E[0])) / abs(E[0]))
+
+        ev = np.array([e['time'] for e in log['events']])
+        if len(ev) and len(ref_events):
+            dt_switch = float(abs(ev[0] - ref_events[0]))
+        else:
+            dt_switch = np.nan
+
+        rows.append({'method': method, 'h': h, 'n_accel': log['n_accel'],
+                     'wall_ms': 1e3 * wall, 'energy_drift': drift,
+                     'n_events': len(ev), 'switch_error': dt_switch})
+        h_str = f"{h:7.3f}" if tol is None else f"{'adapt':>7}"
+        print(f"  {method:<9} {h_str} {log['n_accel']:8d} "
+              f"{1e3 * wall:8.0f} {drift:9.2e} {len(ev):7d} "
+              f"{dt_switch:16.2e}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare integrators on the three-body damper')
+    parser.add_argument('--t-final', type=float, default=8.0)
+    parser.add_argument('--h', type=float, nargs='+', default=None,
+                        help='Step sizes for the fixed-step schemes')
+    parser.add_argument('--rtol', type=float, default=1e-7)
+    parser.add_argument('--epsilon', type=float, default=0.08,
+                        help='Arc threshold ε for the switching comparison')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Integrators with λ₁-crossing events")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+    compare_schemes(args.t_final, args.h, args.rtol, args.epsilon)
+
+
+if __name__ == '__main__':
+    main()
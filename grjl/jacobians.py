@@ -0,0 +1,157 @@
+"""
+Analytical Derivatives of the Gravity Damper OCP
+
+Closed-form first and second derivatives of the quantities the
+PMP / iLQR solvers differentiate, in the state convention of
+PontryaginSolver: x = (q_1..q_n, v_1..v_n) ∈ R^{6n}, control u ∈ R³
+acting on the damper (last body).
+
+All kernels use the softening of pmp_solver.py: d = max(|q_j − q_i|, s).
+Inside the softening radius the force is r G m_i m_j / s³ (linear in r)
+and the potential and tidal weights are constant, which is exactly
+what the clamped expressions differentiate to.
+
+    gravity_accelerations(q)      a_i = Σ_j G m_j (q_j − q_i) / d³
+    gravity_jacobian(q)           ∂a/∂q                  (3n, 3n)
+    potential_terms(q)            Σ G m_i m_j / d, gradient, Hessian
+    tidal_laplacian(q)            tidal weights W and L = D − W
+    lambda1_gradient(q)           λ₁ and ∂λ₁/∂q for all bodies (3n,)
+    euler_jacobians(x)            F_x, F_u of x⁺ = x + f(x, u) dt
+
+All but euler_jacobians accept q of shape (..., n, 3) and broadcast
+over the leading (batch) dimensions.
+
+Reference: spectral_analytical.py (∂λ₁/∂q* for the damper only).
+"""
+
+import numpy as np
+
+
+def _pairs(q, softening):
+    """Pairwise r_ij = q_j − q_i, distances and the softened mask."""
+    n = q.shape[-2]
+    r = q[..., None, :, :] - q[..., :, None, :]
+    dist = np.sqrt(np.sum(r * r, axis=-1))
+    soft = dist < softening
+    d = np.where(soft, softening, dist)
+    d[..., np.arange(n), np.arange(n)] = np.inf
+    return r, d, soft
+
+
+def _flatten_blocks(blocks):
+    """(..., n, n, 3, 3) pair blocks → (..., 3n, 3n) matrix."""
+    n = blocks.shape[-3]
+    return np.swapaxes(blocks, -3, -2).reshape(
+        blocks.shape[:-4] + (3 * n, 3 * n))
+
+
+def gravity_accelerations(q, masses, G=0.5, softening=0.05):
+    """Gravitational accelerations (..., n, 3) of all bodies."""
+    m = np.asarray(masses, dtype=float)
+    r, d, _ = _pairs(q, softening)
+    return G * np.einsum('...ij,...ijk->...ik', m / d**3, r)
+
+
+def gravity_jacobian(q, masses, G=0.5, softening=0.05):
+    """∂a/∂q as a (..., 3n, 3n) matrix, block (i, j) = ∂a_i/∂q_j.
+
+    Outside the softening radius
+        ∂a_i/∂q_j = G m_j (I − 3 r̂ r̂ᵀ) / d³,
+    inside it G m_j I / s³; the diagonal blocks are minus the row sums.
+    """
+    m = np.asarray(masses, dtype=float)
+    n = len(m)
+    r, d, soft = _pairs(q, softening)
+    rhat = r / np.where(soft, 1.0, d)[..., None]
+    outer = np.einsum('...ijk,...ijl->...ijkl', rhat, rhat)
+    outer[soft] = 0.0
+    K = (np.eye(3) - 3.0 * outer) / d[..., None, None]**3
+    blocks = G * m[:, None, None] * K
+    blocks[..., np.arange(n), np.arange(n), :, :] = -blocks.sum(axis=-3)
+    return _flatten_blocks(blocks)
+
+
+def potential_terms(q, masses, G=0.5, softening=0.05):
+    """Φ(q) = Σ_{i<j} G m_i m_j / d_ij with gradient and Hessian.
+
+    Φ is −V of PontryaginSolver.lagrangian, so T − V = T + Φ.
+
+    Returns
+    -------
+    phi : float or (...,) array
+    grad : (..., 3n) array
+    hess : (..., 3n, 3n) array
+    """
+    m = np.asarray(masses, dtype=float)
+    n = len(m)
+    r, d, soft = _pairs(q, softening)
+    mm = G * m[:, None] * m[None, :]
+    phi = 0.5 * np.sum(mm / d, axis=(-2, -1))
+
+    # ∂Φ/∂q_i = Σ_j G m_i m_j (q_j − q_i) / d³ (zero when softened)
+    coef = np.where(soft, 0.0, mm / d**3)
+    grad = np.einsum('...ij,...ijk->...ik', coef, r)
+    grad = grad.reshape(grad.shape[:-2] + (3 * n,))
+
+    # Pair Hessian wrt r of G m m / d is −G m m (I − 3 r̂ r̂ᵀ) / d³;
+    # it enters (i,i), (j,j) with + and (i,j) with −.
+    rhat = r / d[..., None]
+    outer = np.einsum('...ijk,...ijl->...ijkl', rhat, rhat)
+    H_r = -coef[..., None, None] * (np.eye(3) - 3.0 * outer)
+    blocks = -H_r
+    blocks[..., np.arange(n), np.arange(n), :, :] = H_r.sum(axis=-3)
+    return phi, grad, _flatten_blocks(blocks)
+
+
+def tidal_laplacian(q, masses, G=0.5, softening=0.05):
+    """Tidal weights W and Laplacian L = D − W, both (..., n, n)."""
+    m = np.asarray(masses, dtype=float)
+    n = len(m)
+    _, d, _ = _pairs(q, softening)
+    W = G * m[:, None] * m[None, :] / d**3
+    L = -W
+    L[..., np.arange(n), np.arange(n)] = W.sum(axis=-1)
+    return W, L
+
+
+def lambda1_gradient(q, masses, G=0.5, softening=0.05):
+    """Fiedler eigenvalue and its gradient wrt every body position.
+
+    ∂λ₁/∂q_k = Σ_{i<j} (∂w_ij/∂q_k) (v_i − v_j)²  with
+    ∂w_ij/∂q_i = 3 G m_i m_j r_ij / d⁵ = −∂w_ij/∂q_j.
+
+    Returns
+    -------
+    lambda1 : float or (...,) array
+    grad : (..., 3n) array
+    """
+    r, d, soft = _pairs(q, softening)
+    W, L = tidal_laplacian(q, masses, G, softening)
+    evals, evecs = np.linalg.eigh(L)
+    v1 = evecs[..., :, 1]
+
+    dw = np.where(soft, 0.0, 3.0 * W / d**2)
+    dw *= (v1[..., :, None] - v1[..., None, :])**2
+    grad = np.einsum('...ij,...ijk->...ik', dw, r)
+    return evals[..., 1], grad.reshape(grad.shape[:-2] + (-1,))
+
+
+def euler_jacobians(x, masses, dt, G=0.5, softening=0.05):
+    """Jacobians of the explicit Euler step x⁺ = x + f(x, u) dt.
+
+    f = (v, a(q) + e_* u / m_*) is affine in u and v, so
+        F_x = I + dt [[0, I], [∂a/∂q, 0]],   F_u = dt [0; e_*/m_*].
+
+    Returns
+    -------
+    F_x : (6n, 6n) array
+    F_u : (6n, 3) array
+    """
+    n = len(masses)
+    q = x[:3 * n].reshape(n, 3)
+    F_x = np.eye(6 * n)
+    F_x[:3 * n, 3 * n:] += dt * np.eye(3 * n)
+    F_x[3 * n:, :3 * n] += dt * gravity_jacobian(q, masses, G, softening)
+    F_u = np.zeros((6 * n, 3))
+    F_u[6 * n - 3:, :] = dt / masses[-1] * np.eye(3)
+    return F_x, F_u
@@ -30,19 +30,18 @@ import os
 import sys
 import numpy as np
 from numpy.linalg import eigvalsh, eigh, norm
-import matplotlib
-import matplotlib.pyplot as plt
-
-import mujoco
 
 # Ensure sibling modules are importable
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
 _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
 from mppi_sampler import MPPISampler, contact_weight
+from sim_log import SimLog
 from mppi_sampler import MODE_SEPARATING, MODE_SLIDING, MODE_STICKING
 
 
@@ -271,6 +270,8 @@ def get_contact_forces(model, data):
     force_left, force_right : float
         Total normal contact force on left and right fingers.
     """
+    import mujoco
+
     obj_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_GEOM,
                                  'object_geom')
     fl_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_GEOM,
@@ -299,8 +300,10 @@ def get_contact_forces(model, data):
 def simulate(headless=False):
     """Run the MuJoCo manipulation simulation.
 
-    Returns: dict with time series of object pose, λ₁, control effort.
+    Returns: SimLog with time series of object pose, λ₁, control effort.
     """
+    import mujoco
+
     model_path = os.path.join(_CODE_DIR, 'manipulation.xml')
     model = mujoco.MjModel.from_xml_path(model_path)
     data = mujoco.MjData(model)
@@ -312,17 +315,7 @@ def simulate(headless=False):
 
     controller = ManipulationController()
 
-    log = {
-        'time': [],
-        'lambda1': [],
-        'object_pos': [],
-        'object_quat': [],
-        'touch_left': [],
-        'touch_right': [],
-        'control': [],
-        'arc_type': [],
-        'phase': [],
-    }
+    log = SimLog(capacity=N_STEPS)
 
     for step in range(N_STEPS):
         t = step * DT
@@ -342,15 +335,10 @@ def simulate(headless=False):
         data.ctrl[:] = ctrl
         mujoco.mj_step(model, data)
 
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['object_pos'].append(object_pos)
-        log['object_quat'].append(object_quat)
-        log['touch_left'].append(float(touch_left))
-        log['touch_right'].append(float(touch_right))
-        log['control'].append(ctrl.copy())
-        log['arc_type'].append(arc_type)
-        log['phase'].append(controller.phase)
+        log.append(time=t, lambda1=lambda1, object_pos=object_pos,
+                   object_quat=object_quat, touch_left=float(touch_left),
+                   touch_right=float(touch_right), control=ctrl,
+                   arc_type=arc_type, phase=controller.phase)
 
         if object_pos[2] < -0.1:
             print(f"Object dropped at t={t:.2f}")
@@ -365,6 +353,8 @@ def simulate(headless=False):
 
 def plot_results(log):
     """Plot manipulation results: grasp quality, forces, object pose."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(4, 1, figsize=(10, 12), sharex=True)
 
     t = log['time']
@@ -425,6 +415,7 @@ def main():
                         help='Run without viewer')
     args = parser.parse_args()
 
+    import matplotlib
     if args.headless:
         matplotlib.use('Agg')
 
@@ -5,13 +5,42 @@ Samples K trajectories, weights by Boltzmann factor exp(-J_k/alpha)/Z,
 and fuses into a single optimal trajectory.  Contact mode tracking
 (separating/sliding/sticking) with SDF barrier penalty.
 
+With n_knots set, noise is sampled on n_knots cubic B-spline control
+points per control dimension and mapped to the horizon through a cached
+basis matrix (BSplineTrajectory.basis_matrix): the sample dimension
+drops from horizon × control_dim to n_knots × control_dim and every
+perturbation is C² smooth.
+
+Variance reduction (noise.py): `noise` selects the perturbation
+generator (gaussian, antithetic, sobol, halton, colored) and
+reuse=True pools the previous iteration's rollouts with the new ones
+under importance weights; ess_history records the effective sample
+size of each iteration's weights.
+
+solve(schedule=MPPISchedule(...)) adapts K between iterations from the
+ESS fraction of the weights, stops early once the mean cost plateaus
+and caps the rollouts per call; self.budget reports what a call spent.
+
 Reference: threebody.tex thm:3b-mppi (lines 395-430),
            calculus.tex (lines 1153-1203) path integral interpretation.
 """
 
+import os
+import sys
+import time
+
 import numpy as np
 from numpy.linalg import norm
 
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from noise import (NOISE_KINDS, draw_noise, mixture_log_ratio,
+                   effective_sample_size)
+
 
 # Contact mode enumeration
 MODE_SEPARATING = 0
@@ -19,6 +48,52 @@ MODE_SLIDING = 1
 MODE_STICKING = 2
 
 
+class MPPISchedule:
+    """Adaptive sample count and stopping rule for MPPISampler.solve.
+
+    Parameters
+    ----------
+    K_min, K_max : int
+        Bounds on the samples per iteration.
+    ess_low, ess_high : float
+        ESS / K fractions: below ess_low the weights have collapsed
+        onto a few samples and K grows; above ess_high they are nearly
+        uniform and K shrinks.
+    factor : float
+        Multiplicative K change.
+    cost_tol : float
+        Stop when the relative change of the mean cost falls below this.
+    max_rollouts : int or None
+        Rollout budget per solve() call.
+    """
+
+    def __init__(self, K_min=8, K_max=256, ess_low=0.1, ess_high=0.5,
+                 factor=2.0, cost_tol=1e-3, max_rollouts=None):
+        self.K_min = K_min
+        self.K_max = K_max
+        self.ess_low = ess_low
+        self.ess_high = ess_high
+        self.factor = factor
+        self.cost_tol = cost_tol
+        self.max_rollouts = max_rollouts
+
+    def next_K(self, K, ess, n_samples):
+        """Sample count for the next iteration (ESS of n_samples draws)."""
+        frac = ess / n_samples
+        if frac < self.ess_low:
+            K = K * self.factor
+        elif frac > self.ess_high:
+            K = K / self.factor
+        return int(np.clip(round(K), self.K_min, self.K_max))
+
+    def converged(self, cost_history):
+        """True once the mean cost has plateaued."""
+        if len(cost_history) < 2:
+            return False
+        c_prev, c = cost_history[-2], cost_history[-1]
+        return abs(c - c_prev) <= self.cost_tol * max(abs(c_prev), 1e-12)
+
+
 class MPPISampler:
     """MPPI trajectory sampler with contact mode selection.
 
@@ -38,10 +113,26 @@ class MPPISampler:
         Box constraint on control.
     beta : float
         SDF barrier coefficient.
+    n_knots : int or None
+        Sample noise on this many B-spline control points (>= 4)
+        instead of at every time step.
+    noise : str
+        Noise generator, one of noise.NOISE_KINDS.
+    noise_beta : float
+        Spectral exponent for noise='colored'.
+    reuse : bool
+        Pool the previous iteration's rollouts into the reweighting.
+    rng : numpy Generator, SeedSequence, int or None
+        Source of the perturbations; None draws from the global
+        np.random state.
     """
 
     def __init__(self, dynamics_fn, cost_fn, state_dim, control_dim,
-                 alpha=0.05, u_max=5.0, beta=10.0):
+                 alpha=0.05, u_max=5.0, beta=10.0, n_knots=None,
+                 noise='gaussian', noise_beta=1.0, reuse=False, rng=None):
+        if n_knots is not None and n_knots < 4:
+            raise ValueError(
+                f"Need >= 4 knots for cubic B-spline noise, got {n_knots}")
         self.dynamics_fn = dynamics_fn
         self.cost_fn = cost_fn
         self.state_dim = state_dim
@@ -49,6 +140,37 @@ class MPPISampler:
         self.alpha = alpha
         self.u_max = u_max
         self.beta = beta
+        self.n_knots = n_knots
+        self._basis = {}   # horizon -> (horizon, n_knots) basis matrix
+        self.noise = noise
+        self.noise_beta = noise_beta
+        self.reuse = reuse
+        self.rng = None if rng is None else np.random.default_rng(rng)
+        self.ess_history = []
+        self.budget = {}
+
+    def basis(self, horizon):
+        """Cached B-spline basis matrix mapping knots to time steps."""
+        if horizon not in self._basis:
+            from grjl_core.bspline_trajectory import BSplineTrajectory
+            self._basis[horizon] = BSplineTrajectory.basis_matrix(
+                self.n_knots, np.linspace(0.0, 1.0, horizon))
+        return self._basis[horizon]
+
+    def sample_noise(self, K, horizon, noise_std=1.0):
+        """Control perturbations (K, horizon, control_dim).
+
+        Per-step noise from the `noise` generator, or with n_knots the
+        same noise on the control points mapped through the basis matrix.
+        """
+        if self.n_knots is None:
+            return noise_std * draw_noise(
+                self.noise, K, (horizon, self.control_dim), self.noise_beta,
+                self.rng)
+        knots = noise_std * draw_noise(
+            self.noise, K, (self.n_knots, self.control_dim), self.noise_beta,
+            self.rng)
+        return np.einsum('tm,kmd->ktd', self.basis(horizon), knots)
 
     def sample(self, x0, K, horizon, dt, noise_std=1.0, u_nominal=None):
         """Sample K trajectories from current state.
@@ -80,11 +202,11 @@ class MPPISampler:
         trajectories = np.zeros((K, horizon + 1, self.state_dim))
         controls = np.zeros((K, horizon, self.control_dim))
         costs = np.zeros(K)
+        noise = self.sample_noise(K, horizon, noise_std)
 
         for k in range(K):
             # Perturb nominal control with Gaussian noise
-            noise = noise_std * np.random.randn(horizon, self.control_dim)
-            u_k = np.clip(u_nominal + noise, -self.u_max, self.u_max)
+            u_k = np.clip(u_nominal + noise[k], -self.u_max, self.u_max)
 
             x = x0.copy()
             trajectories[k, 0] = x
@@ -103,12 +225,14 @@ class MPPISampler:
 
         return trajectories, controls, costs
 
-    def reweight(self, costs):
+    def reweight(self, costs, log_ratio=None):
         """Compute Boltzmann weights: w_k = exp(-J_k / alpha) / Z.
 
         Parameters
         ----------
         costs : (K,) array
+        log_ratio : (K,) array or None
+            Importance log ratios log p/q added to the log weights.
 
         Returns
         -------
@@ -117,6 +241,8 @@ class MPPISampler:
         # Shift for numerical stability
         c_min = np.min(costs)
         log_weights = -(costs - c_min) / self.alpha
+        if log_ratio is not None:
+            log_weights = log_weights + log_ratio
         # Softmax
         max_lw = np.max(log_weights)
         weights = np.exp(log_weights - max_lw)
@@ -143,7 +269,7 @@ class MPPISampler:
         return np.clip(u_fused, -self.u_max, self.u_max)
 
     def solve(self, x0, horizon, dt, K=64, noise_std=1.0,
-              n_iters=5, u_init=None):
+              n_iters=5, u_init=None, schedule=None):
         """Run MPPI for n_iters, refining the nominal trajectory.
 
         Parameters
@@ -155,26 +281,141 @@ class MPPISampler:
         noise_std : control noise
         n_iters : number of refinement iterations
         u_init : initial nominal control sequence
+        schedule : MPPISchedule or None
+            Adapt K from the ESS and stop early; K is the initial count
+            and n_iters the maximum number of iterations.
 
         Returns
         -------
         u_opt : (horizon, control_dim) optimal control sequence
         cost_history : list of mean costs per iteration
+
+        self.budget records iterations, rollouts, K_history, seconds
+        and the stop reason ('n_iters', 'converged' or 'budget').
         """
         u_nominal = (u_init.copy() if u_init is not None
                      else np.zeros((horizon, self.control_dim)))
         cost_history = []
+        self.ess_history = []
+        previous = None   # (controls, costs, nominal) of the last iteration
+        K_history = []
+        rollouts = 0
+        stop = 'n_iters'
+        t_start = time.perf_counter()
 
         for it in range(n_iters):
+            if schedule is not None and schedule.max_rollouts is not None:
+                K = min(K, schedule.max_rollouts - rollouts)
+                if K < 1:
+                    stop = 'budget'
+                    break
+            K_history.append(K)
+            rollouts += K
             trajs, ctrls, costs = self.sample(
                 x0, K, horizon, dt, noise_std, u_nominal)
-            weights = self.reweight(costs)
-            u_nominal = self.fuse(ctrls, weights)
             cost_history.append(float(np.mean(costs)))
-
+            if self.reuse and previous is not None:
+                pool_ctrls = np.concatenate([ctrls, previous[0]])
+                pool_costs = np.concatenate([costs, previous[1]])
+                weights = self.reweight(pool_costs, mixture_log_ratio(
+                    pool_ctrls, u_nominal, previous[2], noise_std,
+                    len(ctrls), len(previous[0])))
+            else:
+                pool_ctrls, weights = ctrls, self.reweight(costs)
+            self.ess_history.append(effective_sample_size(weights))
+            previous = (ctrls, costs, u_nominal)
+            u_nominal = self.fuse(pool_ctrls, weights)
+
+            if schedule is not None:
+                if schedule.converged(cost_history):
+                    stop = 'converged'
+                    break
+                # ESS fraction of the fresh samples, not of the pool
+                K = schedule.next_K(K, self.ess_history[-1], len(ctrls))
+
+        self.budget = {
+            'iterations': len(K_history),
+            'rollouts': rollouts,
+            'rollout_steps': rollouts * horizon,
+            'K_history': K_history,
+            'seconds': time.perf_counter() - t_start,
+            'stop': stop,
+        }
         return u_nominal, cost_history
 
 
+def _benchmark_problem():
+    """Gravity damper OCP of pmp_solver as an MPPI benchmark."""
+    from pmp_solver import PontryaginSolver, benchmark_state
+
+    pmp = PontryaginSolver([1.0, 1.0, 1.0, 0.5])
+
+    def dynamics(x, u, dt):
+        return x + pmp.dynamics(x, u) * dt
+
+    return pmp, dynamics, benchmark_state(pmp)
+
+
+def _fused_stats(mppi, x0, horizon, dt, K, noise_std, n_iters, n_seeds):
+    """Mean noise-free cost, roughness mean ‖Δu‖ and ESS over seeds."""
+    J, rough, ess = [], [], []
+    for seed in range(n_seeds):
+        mppi.rng = np.random.default_rng(seed)
+        u, _ = mppi.solve(x0, horizon, dt, K=K, noise_std=noise_std,
+                          n_iters=n_iters)
+        J.append(mppi.sample(x0, 1, horizon, dt, 0.0, u)[2][0])
+        rough.append(np.mean(norm(np.diff(u, axis=0), axis=1)))
+        ess.append(np.mean(mppi.ess_history))
+    return np.mean(J), np.mean(rough), np.mean(ess)
+
+
+def compare_sampling(Ks=(8, 16, 32, 64), n_knots=8, horizon=50,
+                     n_seeds=5, noise_std=2.0, n_iters=3):
+    """Per-step vs control-point MPPI on the gravity damper OCP.
+
+    Reports, per sample count K, the mean cost of the fused control
+    sequence (rolled out noise-free) and its roughness mean ‖Δu‖.
+    """
+    pmp, dynamics, x0 = _benchmark_problem()
+
+    print(f"\n  {'K':>4}  {'J per-step':>12} {'J knots':>12}  "
+          f"{'|du| per-step':>14} {'|du| knots':>11}")
+    rows = []
+    for K in Ks:
+        stats = {}
+        for mode, knots in (('step', None), ('knots', n_knots)):
+            mppi = MPPISampler(dynamics, pmp.lagrangian, len(x0), 3,
+                               alpha=0.05, u_max=pmp.u_max, n_knots=knots)
+            stats[mode] = _fused_stats(mppi, x0, horizon, pmp.dt, K,
+                                       noise_std, n_iters, n_seeds)
+        rows.append((K, stats))
+        print(f"  {K:4d}  {stats['step'][0]:12.5f} {stats['knots'][0]:12.5f}"
+              f"  {stats['step'][1]:14.4f} {stats['knots'][1]:11.4f}")
+    return rows
+
+
+def compare_noise(Ks=(8, 16, 32), horizon=50, n_seeds=5, noise_std=2.0,
+                  n_iters=3):
+    """Fused cost and mean ESS per noise generator and sample count."""
+    pmp, dynamics, x0 = _benchmark_problem()
+    variants = [(kind, False) for kind in NOISE_KINDS] + [('gaussian', True)]
+
+    print(f"\n  {'noise':<18}" + "".join(f"{'J K=' + str(K):>12}"
+                                        for K in Ks) + f"{'ESS':>8}")
+    rows = []
+    for kind, reuse in variants:
+        mppi = MPPISampler(dynamics, pmp.lagrangian, len(x0), 3,
+                           alpha=0.05, u_max=pmp.u_max, noise=kind,
+                           reuse=reuse)
+        stats = [_fused_stats(mppi, x0, horizon, pmp.dt, K, noise_std,
+                              n_iters, n_seeds) for K in Ks]
+        label = kind + (' + reuse' if reuse else '')
+        rows.append((label, stats))
+        print(f"  {label:<18}" + "".join(f"{st[0]:12.5f}" for st in stats)
+              + f"{stats[-1][2]:8.1f}")
+    return rows
+
+
 def contact_weight(mode, k_n=1.0, k_t=1.0, mu_friction=0.5):
     """Compute edge weight for a contact point given its mode.
 
@@ -228,3 +469,12 @@ def sdf_barrier_cost(sdf_values, beta=10.0):
         else:
             cost += beta / phi
     return cost
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("  MPPI: noise parameterisation and variance reduction")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+    compare_sampling()
+    compare_noise()
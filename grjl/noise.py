@@ -0,0 +1,130 @@
+"""
+Noise Generators and Importance Weights for MPPI
+
+Standard-normal perturbation tensors (K, *shape) for the MPPI samplers,
+shape = (horizon, control_dim) or (n_knots, control_dim):
+
+    gaussian      iid N(0, 1)
+    antithetic    pairs (ε, −ε): odd moments cancel exactly
+    sobol         scrambled Sobol points through Φ⁻¹ (quasi-Monte Carlo)
+    halton        scrambled Halton points through Φ⁻¹
+    colored       1/f^β noise along the time axis, unit variance
+
+Every generator takes `rng`, a numpy Generator (or anything
+np.random.default_rng accepts) to draw from; rng=None falls back to the
+global np.random state, so np.random.seed still reproduces old runs.
+
+Importance reuse: samples kept from the previous MPPI iteration were
+drawn around the previous nominal.  Pooling them with the new samples
+under the balance heuristic gives the log ratio
+
+    log p(u) − log q(u),   p = N(μ_new, σ²),
+    q = (K_new N(μ_new, σ²) + K_old N(μ_old, σ²)) / (K_new + K_old)
+
+which is exact for per-step Gaussian noise and a heuristic otherwise.
+effective_sample_size() reports how many samples the weights use.
+"""
+
+import warnings
+
+import numpy as np
+
+
+NOISE_KINDS = ('gaussian', 'antithetic', 'sobol', 'halton', 'colored')
+
+
+def _source(rng):
+    """Generator for `rng`; None → the global np.random state."""
+    return np.random if rng is None else np.random.default_rng(rng)
+
+
+def _qmc_normal(engine_cls, K, dim, rng=None):
+    """K scrambled low-discrepancy points in R^dim mapped to N(0, I)."""
+    from scipy.special import ndtri
+
+    seed = (np.random.randint(2**31 - 1) if rng is None
+            else np.random.default_rng(rng).integers(2**31 - 1))
+    engine = engine_cls(d=dim, scramble=True, seed=seed)
+    with warnings.catch_warnings():
+        # Sobol balance warning for K not a power of two
+        warnings.simplefilter('ignore', UserWarning)
+        points = engine.random(K)
+    return ndtri(np.clip(points, 1e-12, 1.0 - 1e-12))
+
+
+def colored_noise(K, shape, beta=1.0, rng=None):
+    """Power-law (1/f^β) noise along axis 0 of `shape`, unit variance."""
+    n = shape[0]
+    white = _source(rng).standard_normal((K, *shape))
+    spectrum = np.fft.rfft(white, axis=1)
+    f = np.fft.rfftfreq(n)
+    f[0] = f[1] if n > 1 else 1.0
+    scale = f ** (-beta / 2.0)
+    spectrum *= scale.reshape((1, -1) + (1,) * (len(shape) - 1))
+    x = np.fft.irfft(spectrum, n=n, axis=1)
+    return x / np.maximum(x.std(axis=1, keepdims=True), 1e-12)
+
+
+def draw_noise(kind, K, shape, beta=1.0, rng=None):
+    """Standard-normal-like perturbations of shape (K, *shape).
+
+    Parameters
+    ----------
+    kind : str
+        One of NOISE_KINDS.
+    K : int
+        Number of samples.
+    shape : tuple
+        Shape of one sample, time axis first.
+    beta : float
+        Spectral exponent for kind='colored' (0 white, 1 pink, 2 brown).
+    rng : numpy Generator, seed or None
+        Random source; None draws from the global np.random state.
+    """
+    shape = tuple(shape)
+    dim = int(np.prod(shape))
+    if kind == 'gaussian':
+        return _source(rng).standard_normal((K, *shape))
+    if kind == 'antithetic':
+        half = _source(rng).standard_normal(((K + 1) // 2, *shape))
+        return np.concatenate([half, -half])[:K]
+    if kind in ('sobol', 'halton'):
+        from scipy.stats import qmc
+        engine = qmc.Sobol if kind == 'sobol' else qmc.Halton
+        return _qmc_normal(engine, K, dim, rng).reshape(K, *shape)
+    if kind == 'colored':
+        return colored_noise(K, shape, beta, rng)
+    raise ValueError(f"Unknown noise kind '{kind}', "
+                     f"expected one of {NOISE_KINDS}")
+
+
+def mixture_log_ratio(controls, u_new, u_old, noise_std, K_new=1, K_old=1):
+    """log p/q for pooled samples under the balance heuristic.
+
+    Parameters
+    ----------
+    controls : (K, horizon, control_dim) pooled samples
+    u_new, u_old : (horizon, control_dim) current / previous nominal
+    noise_std : float
+    K_new, K_old : int
+        Samples drawn around u_new / u_old; they weight the mixture q
+        (equal counts give ½ / ½).
+
+    Returns
+    -------
+    log_ratio : (K,) array
+    """
+    from scipy.special import logsumexp
+
+    var = 2.0 * noise_std**2
+    lp_new = -np.sum((controls - u_new)**2, axis=(1, 2)) / var
+    lp_old = -np.sum((controls - u_old)**2, axis=(1, 2)) / var
+    log_q = (logsumexp([np.log(K_new) + lp_new, np.log(K_old) + lp_old],
+                       axis=0)
+             - np.log(K_new + K_old))
+    return lp_new - log_q
+
+
+def effective_sample_size(weights):
+    """Kish effective sample size 1 / Σ w_k² of normalised weights."""
+    return float(1.0 / np.sum(np.asarray(weights)**2))
@@ -0,0 +1,218 @@
+"""
+Column-Buffered Simulation Log
+
+Drop-in replacement for the `log = {'time': [], ...}` dicts that the
+simulators grow with one list append per key per step.  A SimLog keeps
+one preallocated NumPy buffer per column and writes each step's row in
+place:
+
+    log = SimLog(capacity=N_STEPS)
+    log['total_cost'] = 0.0                 # scalars: plain entries
+    for step in range(N_STEPS):
+        ...
+        log.append(time=t, lambda1=lambda1, positions=positions)
+        log['total_cost'] += cost
+
+    log['lambda1']        # (n_rows,) array view
+    log['positions']      # (n_rows, n, 3) array view
+
+It is a Mapping, so the plotting and statistics helpers that index
+`log[key]`, call `np.array(log[key])`, `log.get(...)` or `log[key][-1]`
+consume it unchanged.  Columns are created from the first row (shape
+and dtype inferred per key) and grow by doubling when `capacity` is
+exceeded.
+
+Options:
+    every=k      keep only every k-th appended row (decimation)
+    ring=True    fixed-capacity ring buffer holding the latest rows
+    flush_to=p   write the buffer to p_00000.npz, p_00001.npz, ...
+                 whenever `chunk` rows are buffered; SimLog.load(p)
+                 reassembles the run.
+"""
+
+import glob
+import os
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class SimLog(MutableMapping):
+    """Preallocated column log with optional decimation, ring buffer
+    and chunked .npz flushing.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial rows per column (the ring size when ring=True).
+    every : int
+        Record one row out of every `every` calls to append().
+    ring : bool
+        Keep only the latest `capacity` rows.
+    flush_to : str or None
+        Path prefix for chunked flushing to .npz files.
+    chunk : int or None
+        Rows per flushed chunk (defaults to `capacity`).
+    columns : sequence of str or None
+        Column names to expose (as empty arrays) before the first row;
+        their shape and dtype are still taken from that row.
+    """
+
+    def __init__(self, capacity=1024, every=1, ring=False, flush_to=None,
+                 chunk=None, columns=None):
+        if ring and flush_to is not None:
+            raise ValueError("ring buffer and flushing are exclusive")
+        self.capacity = max(int(capacity), 1)
+        self.every = max(int(every), 1)
+        self.ring = ring
+        self.flush_to = flush_to
+        self.chunk = chunk or self.capacity
+
+        self._cols = {k: np.empty(0) for k in columns or ()}
+        self._typed = False   # buffers allocated from a first row
+        self._scalars = {}    # everything else (totals, histories, ...)
+        self._n = 0           # rows currently held in the buffers
+        self._total = 0       # rows ever recorded (incl. flushed / dropped)
+        self._calls = 0
+        self._n_chunks = 0
+
+    # ── Recording ──
+
+    def append(self, **row):
+        """Record one row; every key is a column."""
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        if self._cols and row.keys() != self._cols.keys():
+            raise KeyError(f"row keys {sorted(row)} do not match columns "
+                           f"{sorted(self._cols)}")
+        if not self._typed:
+            self._typed = True
+            for key, value in row.items():
+                value = np.asarray(value)
+                # Strings (phase labels, ...) as objects so that longer
+                # later values are not truncated to the first one's width
+                dtype = object if value.dtype.kind in 'US' else value.dtype
+                self._cols[key] = np.empty(
+                    (self.capacity,) + value.shape, dtype=dtype)
+
+        if self.ring:
+            i = self._total % self.capacity
+        else:
+            i = self._n
+            if i == len(next(iter(self._cols.values()))):
+                self._grow()
+        for key, value in row.items():
+            self._cols[key][i] = value
+
+        self._total += 1
+        self._n = min(self._n + 1, self.capacity) if self.ring else i + 1
+        if self.flush_to is not None and self._n >= self.chunk:
+            self.flush()
+
+    def _grow(self):
+        for key, buf in self._cols.items():
+            new = np.empty((2 * len(buf),) + buf.shape[1:], dtype=buf.dtype)
+            new[:len(buf)] = buf
+            self._cols[key] = new
+
+    def flush(self):
+        """Write the buffered rows to the next .npz chunk and clear them."""
+        if self.flush_to is None or self._n == 0:
+            return
+        path = f"{self.flush_to}_{self._n_chunks:05d}.npz"
+        np.savez_compressed(path, **{k: self[k] for k in self._cols})
+        self._n_chunks += 1
+        self._n = 0
+
+    def close(self):
+        """Flush the remaining rows and write the scalar entries."""
+        if self.flush_to is None:
+            return
+        self.flush()
+        np.savez(f"{self.flush_to}_scalars.npz",
+                 **{k: np.asarray(v) for k, v in self._scalars.items()})
+
+    # ── Access ──
+
+    @property
+    def n_rows(self):
+        """Rows currently held in memory."""
+        return self._n
+
+    @property
+    def columns(self):
+        return list(self._cols)
+
+    def __getitem__(self, key):
+        if key in self._cols:
+            buf = self._cols[key]
+            if self.ring and self._total > self.capacity:
+                start = self._total % self.capacity
+                return np.concatenate([buf[start:], buf[:start]])
+            return buf[:self._n]
+        return self._scalars[key]
+
+    def __setitem__(self, key, value):
+        if key in self._cols:
+            raise KeyError(f"'{key}' is a column; use append()")
+        self._scalars[key] = value
+
+    def __delitem__(self, key):
+        if key in self._cols:
+            del self._cols[key]
+        else:
+            del self._scalars[key]
+
+    def __iter__(self):
+        yield from self._cols
+        yield from self._scalars
+
+    def __len__(self):
+        return len(self._cols) + len(self._scalars)
+
+    def __repr__(self):
+        return (f"SimLog(rows={self._n}, columns={self.columns}, "
+                f"scalars={list(self._scalars)})")
+
+    def to_dict(self):
+        """Plain dict of column arrays and scalar entries."""
+        return {k: self[k] for k in self}
+
+    def save(self, path):
+        """Save all in-memory columns and scalars to one .npz file."""
+        np.savez_compressed(path, **{k: np.asarray(v)
+                                     for k, v in self.to_dict().items()})
+
+    @staticmethod
+    def load(path):
+        """Load a run written by save() or by chunked flushing.
+
+        Parameters
+        ----------
+        path : str
+            A .npz file, or the `flush_to` prefix of a chunked run.
+
+        Returns
+        -------
+        log : dict of column arrays (chunks concatenated) and scalars
+        """
+        if os.path.isfile(path):
+            with np.load(path, allow_pickle=True) as data:
+                return {k: data[k][()] if data[k].ndim == 0 else data[k]
+                        for k in data.files}
+
+        chunks = sorted(glob.glob(f"{path}_[0-9][0-9][0-9][0-9][0-9].npz"))
+        if not chunks:
+            raise FileNotFoundError(f"no log chunks at {path}")
+        parts = []
+        for c in chunks:
+            with np.load(c, allow_pickle=True) as data:
+                parts.append({k: data[k] for k in data.files})
+        log = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        scalars = f"{path}_scalars.npz"
+        if os.path.isfile(scalars):
+            with np.load(scalars, allow_pickle=True) as data:
+                log.update({k: data[k][()] if data[k].ndim == 0
+                            else data[k] for k in data.files})
+        return log
@@ -0,0 +1,557 @@
+"""
+Swarm Gravity Damper — N bodies, M dampers
+
+Generalises threebody_damper.py from (3 bodies + 1 damper) to an
+N-body swarm held together by M controlled dampers.  The control law
+is the same three-term decomposition:
+
+    m*_d q̈*_d = (I) gravity + (II) least action + (III) spectral kick
+
+but the tidal graph is now sparse: only pairs closer than a neighbour
+cutoff r_c carry an edge,
+
+    w_ij = G m_i m_j / |q_i - q_j|^3    if |q_i - q_j| < r_c,
+
+so L_G is stored as a scipy.sparse matrix and λ₁ comes from a
+shift-invert `eigsh` instead of a dense eigensolve.  Each damper d
+receives its own spectral gradient
+
+    ∂λ₁/∂q*_d = Σ_j ∂w_dj/∂q*_d · (v₁[d] − v₁[j])²
+
+from a single Fiedler vector v₁ (eigenvector perturbation, as in
+spectral_analytical.py).
+
+Usage:
+    python swarm_damper.py                               # 200 bodies, 8 dampers
+    python swarm_damper.py --bodies 500 --dampers 16 --headless
+    python swarm_damper.py --no-damper                   # swarm fragments
+
+Requirements: numpy, scipy, matplotlib (plots only)
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from numpy.linalg import eigh, norm
+import scipy.sparse as sp
+from scipy.sparse.linalg import eigsh, ArpackNoConvergence
+from scipy.spatial import cKDTree
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+
+from sim_log import SimLog
+
+_OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
+os.makedirs(_OUTPUT_DIR, exist_ok=True)
+
+
+# ── Physical constants ──────────────────────────────────────
+G = 0.5            # gravitational constant (normalised)
+M_TOTAL = 3.0      # total swarm mass (same as three unit bodies)
+M_DAMPER = 0.5     # total damper mass, split over the M dampers
+U_MAX = 5.0        # box constraint on each damper's thrust
+ALPHA = 0.05       # control cost weight
+DT = 0.002         # time step
+T_FINAL = 4.0      # simulation duration
+N_STEPS = int(T_FINAL / DT)
+SOFTENING = 0.05   # gravitational softening length
+R_CUTOFF = 1.0     # neighbour cutoff of the tidal graph
+EPSILON_REL = 0.5  # ε = EPSILON_REL · λ₁(0) when no ε is given
+
+# Below this many nodes a dense eigh is faster than ARPACK
+DENSE_EIG_MAX = 64
+
+
+# ══════════════════════════════════════════════════════════════
+# Sparse tidal graph
+# ══════════════════════════════════════════════════════════════
+
+def neighbour_pairs(positions, cutoff=R_CUTOFF):
+    """All pairs (i, j), i < j, closer than the cutoff.
+
+    Returns
+    -------
+    pairs : (E, 2) int array
+    """
+    tree = cKDTree(positions)
+    pairs = tree.query_pairs(cutoff, output_type='ndarray')
+    if len(pairs) == 0:
+        return np.zeros((0, 2), dtype=np.intp)
+    return pairs
+
+
+def tidal_edge_weights(positions, masses, pairs, G=G, softening=SOFTENING):
+    """Tidal weights w_ij = G m_i m_j / d_ij^3 for the given edge list.
+
+    Returns
+    -------
+    w : (E,) array
+    r : (E, 3) array, q_j − q_i for each edge
+    d : (E,) array, softened distance
+    """
+    i, j = pairs[:, 0], pairs[:, 1]
+    r = positions[j] - positions[i]
+    d = np.maximum(norm(r, axis=1), softening)
+    w = G * masses[i] * masses[j] / d**3
+    return w, r, d
+
+
+def sparse_laplacian(n, pairs, w):
+    """Assemble L = D − W as a CSR matrix from an edge list."""
+    i, j = pairs[:, 0], pairs[:, 1]
+    W = sp.coo_matrix((w, (i, j)), shape=(n, n)).tocsr()
+    W = W + W.T
+    deg = np.bincount(i, w, n) + np.bincount(j, w, n)
+    return (sp.diags(deg) - W).tocsr()
+
+
+def fiedler_pair(L, v0=None):
+    """Fiedler eigenvalue λ₁ and eigenvector v₁ of a sparse Laplacian.
+
+    Uses shift-invert Lanczos around a small negative shift, so the two
+    smallest eigenpairs converge in a handful of iterations.  A previous
+    Fiedler vector can be passed as `v0` to warm-start ARPACK; small
+    graphs fall back to a dense eigensolve.
+
+    Returns
+    -------
+    lambda1 : float
+    v1 : (n,) array
+    """
+    n = L.shape[0]
+    if n <= DENSE_EIG_MAX:
+        evals, evecs = eigh(L.toarray())
+        return float(evals[1]), evecs[:, 1]
+
+    scale = max(float(L.diagonal().max()), 1e-12)
+    try:
+        evals, evecs = eigsh(L.tocsc(), k=2, sigma=-1e-3 * scale,
+                             which='LM', v0=v0, tol=1e-8)
+    except ArpackNoConvergence:
+        evals, evecs = eigh(L.toarray())
+    order = np.argsort(evals)
+    return float(evals[order[1]]), evecs[:, order[1]]
+
+
+def swarm_laplacian(positions, masses, cutoff=R_CUTOFF, G=G,
+                    softening=SOFTENING, v0=None):
+    """Sparse tidal Laplacian of the swarm and its Fiedler pair.
+
+    Returns
+    -------
+    L : (n, n) csr_matrix
+    lambda1 : float
+    v1 : (n,) array
+    edges : tuple (pairs, w, r, d) reused by the spectral gradient
+    """
+    n = len(masses)
+    pairs = neighbour_pairs(positions, cutoff)
+    w, r, d = tidal_edge_weights(positions, masses, pairs, G, softening)
+    L = sparse_laplacian(n, pairs, w)
+    lambda1, v1 = fiedler_pair(L, v0)
+    return L, lambda1, v1, (pairs, w, r, d)
+
+
+def spectral_gradients(v1, masses, edges, damper_idx, G=G,
+                       softening=SOFTENING):
+    """Per-damper gradients ∂λ₁/∂q*_d from one Fiedler vector.
+
+    For every edge (i, j) with d_ij > softening,
+
+        ∂w_ij/∂q_i = +3 G m_i m_j / d^5 · (q_j − q_i)
+        ∂λ₁/∂q_i  += ∂w_ij/∂q_i · (v₁[i] − v₁[j])²
+
+    and symmetrically for q_j.  Softened edges have zero gradient.
+
+    Returns
+    -------
+    grads : (M, 3) array, one row per damper
+    """
+    pairs, w, r, d = edges
+    n = len(masses)
+    i, j = pairs[:, 0], pairs[:, 1]
+    coeff = 3.0 * w / d**2 * (v1[i] - v1[j])**2
+    coeff[d <= softening] = 0.0
+    g_edge = coeff[:, None] * r          # ∂λ₁/∂q_i contribution
+
+    grad = np.empty((n, 3))
+    for k in range(3):
+        grad[:, k] = (np.bincount(i, g_edge[:, k], n)
+                      - np.bincount(j, g_edge[:, k], n))
+    return grad[damper_idx]
+
+
+# ══════════════════════════════════════════════════════════════
+# Dynamics
+# ══════════════════════════════════════════════════════════════
+
+def gravitational_forces(positions, masses, G=G, softening=SOFTENING):
+    """Direct O(n²) pairwise gravity, vectorised.
+
+    Returns
+    -------
+    forces : (n, 3) array, force on each body
+    """
+    sq = np.einsum('ij,ij->i', positions, positions)
+    d2 = sq[:, None] + sq[None, :] - 2.0 * positions @ positions.T
+    d = np.maximum(np.sqrt(np.maximum(d2, 0.0)), softening)
+    np.fill_diagonal(d, np.inf)
+    # F_i = G m_i Σ_j m_j (q_j − q_i) / d_ij³
+    coeff = masses[None, :] / d**3
+    acc = coeff @ positions - coeff.sum(axis=1)[:, None] * positions
+    return G * masses[:, None] * acc
+
+
+def saturate(v, u_max):
+    """Componentwise saturation: sat_{u_max}(v)."""
+    return np.clip(v, -u_max, u_max)
+
+
+def three_term_control(lambda1, grads, epsilon, u_max=U_MAX, alpha=ALPHA):
+    """Three-term law applied to every damper at once.
+
+    Bang arc (λ₁ < ε):      u_d = ū · g_d / ‖g_d‖
+    Transition (λ₁ < 2ε):   u_d = sat(gain · g_d / α)
+    Singular arc:           u_d = 0
+
+    Returns
+    -------
+    u : (M, 3) array
+    arc_type : int, 0=singular, 1=bang
+    """
+    u = np.zeros_like(grads)
+    if lambda1 < epsilon:
+        g_norm = norm(grads, axis=1, keepdims=True)
+        ok = g_norm[:, 0] > 1e-8
+        u[ok] = u_max * grads[ok] / g_norm[ok]
+        return u, 1
+    if lambda1 < 2 * epsilon:
+        gain = (2 * epsilon - lambda1) / epsilon
+        u = saturate(gain * grads / alpha, u_max)
+    return u, 0
+
+
+# ══════════════════════════════════════════════════════════════
+# Initial conditions
+# ══════════════════════════════════════════════════════════════
+
+def make_swarm_initial_conditions(n_bodies, n_dampers, radius=1.5,
+                                  seed=0):
+    """Rotating, slightly perturbed disc of bodies with dampers inside.
+
+    Bodies are spread uniformly over a thin disc and given the circular
+    speed of the enclosed mass plus an asymmetric perturbation, so the
+    uncontrolled swarm shears apart (the N-body analogue of the
+    perturbed equilateral triangle).  Dampers sit on a smaller ring
+    slightly above the plane.
+
+    Returns
+    -------
+    positions : (n_bodies + n_dampers, 3) array
+    velocities : (n_bodies + n_dampers, 3) array
+    masses : (n_bodies + n_dampers,) array
+    damper_idx : (n_dampers,) int array
+    """
+    rng = np.random.default_rng(seed)
+    n = n_bodies + n_dampers
+
+    rad = radius * np.sqrt(rng.uniform(0.05, 1.0, n_bodies))
+    theta = rng.uniform(0.0, 2 * np.pi, n_bodies)
+    positions = np.zeros((n, 3))
+    positions[:n_bodies, 0] = rad * np.cos(theta)
+    positions[:n_bodies, 1] = rad * np.sin(theta)
+    positions[:n_bodies, 2] = 0.05 * rng.standard_normal(n_bodies)
+
+    phi = 2 * np.pi * np.arange(n_dampers) / max(n_dampers, 1)
+    positions[n_bodies:, 0] = 0.5 * radius * np.cos(phi)
+    positions[n_bodies:, 1] = 0.5 * radius * np.sin(phi)
+    positions[n_bodies:, 2] = 0.3
+
+    masses = np.empty(n)
+    masses[:n_bodies] = M_TOTAL / n_bodies
+    masses[n_bodies:] = M_DAMPER / max(n_dampers, 1)
+
+    # Circular speed of the enclosed mass, with asymmetric scatter
+    m_enclosed = M_TOTAL * (rad / radius)**2
+    v_circ = np.sqrt(G * m_enclosed / np.maximum(rad, SOFTENING))
+    v_mag = v_circ * (0.8 + 0.4 * rng.uniform(size=n_bodies))
+    velocities = np.zeros((n, 3))
+    velocities[:n_bodies, 0] = -v_mag * np.sin(theta)
+    velocities[:n_bodies, 1] = v_mag * np.cos(theta)
+
+    damper_idx = np.arange(n_bodies, n)
+    return positions, velocities, masses, damper_idx
+
+
+# ══════════════════════════════════════════════════════════════
+# Simulator
+# ══════════════════════════════════════════════════════════════
+
+def simulate_swarm(n_bodies=200, n_dampers=8, use_damper=True,
+                   cutoff=R_CUTOFF, epsilon=None, n_steps=N_STEPS,
+                   spectral_every=1, seed=0, gravity='direct', theta=None):
+    """Run the N-body + M-damper swarm with the three-term controller.
+
+    Parameters
+    ----------
+    n_bodies, n_dampers : int
+    use_damper : bool
+        If False the dampers are removed from the system.
+    cutoff : float
+        Neighbour cutoff r_c of the tidal graph.
+    epsilon : float or None
+        Spectral gap threshold.  None → EPSILON_REL · λ₁(0), since the
+        absolute scale of λ₁ depends on N through the body masses.
+    n_steps : int
+    spectral_every : int
+        Recompute the Laplacian / gradients every k steps (the control
+        is held in between).
+    seed : int
+    gravity : {'direct', 'barnes-hut'}
+        Force kernel; 'barnes-hut' uses the octree of barnes_hut.py.
+    theta : float or None
+        Barnes–Hut opening angle (None → barnes_hut.THETA).
+
+    Returns
+    -------
+    log : SimLog with the same time series as threebody_damper.simulate()
+        (time, lambda1, control_norm, arc_type, total_cost) plus
+        'step_time' and the swarm configuration.
+    """
+    positions, velocities, masses, damper_idx = \
+        make_swarm_initial_conditions(n_bodies, n_dampers, seed=seed)
+    if not use_damper:
+        positions = positions[:n_bodies]
+        velocities = velocities[:n_bodies]
+        masses = masses[:n_bodies]
+        damper_idx = np.zeros(0, dtype=np.intp)
+
+    if gravity == 'direct':
+        forces_fn = gravitational_forces
+    else:
+        from barnes_hut import THETA, make_force_kernel
+        forces_fn = make_force_kernel(
+            gravity, theta=THETA if theta is None else theta)
+
+    # Watch only the swarm bodies when deciding whether it escaped
+    body_slice = slice(0, n_bodies)
+
+    _, lambda1, v1, edges = swarm_laplacian(positions, masses, cutoff)
+    if epsilon is None:
+        epsilon = EPSILON_REL * lambda1
+
+    log = SimLog(capacity=n_steps)
+    log['total_cost'] = 0.0
+    log['epsilon'] = epsilon
+    log['n_bodies'] = n_bodies
+    log['n_dampers'] = len(damper_idx)
+    log['cutoff'] = cutoff
+
+    u = np.zeros((len(damper_idx), 3))
+    arc_type = 0
+
+    for step in range(n_steps):
+        t = step * DT
+        t_wall = time.perf_counter()
+
+        # ── Sparse tidal graph, λ₁ and per-damper gradients ──
+        if step % spectral_every == 0:
+            _, lambda1, v1, edges = swarm_laplacian(
+                positions, masses, cutoff, v0=v1)
+            if use_damper:
+                grads = spectral_gradients(v1, masses, edges, damper_idx)
+                u, arc_type = three_term_control(lambda1, grads, epsilon)
+
+        # ── Gravity + control ──
+        forces = forces_fn(positions, masses)
+        if use_damper:
+            forces[damper_idx] += u
+
+        # ── Symplectic Euler ──
+        velocities += forces / masses[:, None] * DT
+        positions += velocities * DT
+
+        # ── Accumulate cost ──
+        log['total_cost'] += 0.5 * ALPHA * float(np.sum(u * u)) * DT
+
+        # ── Log ──
+        log.append(time=t, lambda1=lambda1, control_norm=norm(u),
+                   arc_type=arc_type, n_edges=len(edges[0]),
+                   step_time=time.perf_counter() - t_wall)
+
+        # Early exit if the swarm has clearly dispersed
+        spread = norm(positions[body_slice]
+                      - positions[body_slice].mean(axis=0), axis=1).max()
+        if spread > 20.0:
+            print(f"Swarm escaped at t={t:.2f}, spread={spread:.1f}")
+            break
+
+    log['final_positions'] = positions.copy()
+    log['damper_idx'] = damper_idx
+    return log
+
+
+# ══════════════════════════════════════════════════════════════
+# Scaling study
+# ══════════════════════════════════════════════════════════════
+
+def scaling_study(body_counts=(50, 100, 200, 400), dampers_per_body=0.04,
+                  n_steps=200, cutoff=R_CUTOFF):
+    """Time per step of the spectral-gap controller versus N.
+
+    Returns
+    -------
+    rows : list of dicts with n_bodies, n_dampers, ms_per_step,
+           mean edges and final λ₁ / ε.
+    """
+    rows = []
+    for n in body_counts:
+        m = max(1, int(round(dampers_per_body * n)))
+        log = simulate_swarm(n, m, n_steps=n_steps, cutoff=cutoff)
+        rows.append({
+            'n_bodies': n,
+            'n_dampers': m,
+            'ms_per_step': 1e3 * float(np.mean(log['step_time'])),
+            'mean_edges': float(np.mean(log['n_edges'])),
+            'lambda1_ratio': log['lambda1'][-1] / log['epsilon'],
+        })
+        print(f"  N={n:5d}  M={m:3d}  "
+              f"{rows[-1]['ms_per_step']:7.2f} ms/step  "
+              f"edges={rows[-1]['mean_edges']:8.0f}  "
+              f"λ₁/ε={rows[-1]['lambda1_ratio']:.2f}")
+    return rows
+
+
+# ══════════════════════════════════════════════════════════════
+# Plotting / statistics
+# ══════════════════════════════════════════════════════════════
+
+def plot_swarm(log, log_compare=None, compare_label='Without dampers'):
+    """λ₁ evolution, control effort and final swarm snapshot."""
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 3, figsize=(16, 5))
+    eps = log['epsilon']
+
+    ax = axes[0]
+    ax.plot(log['time'], log['lambda1'], 'b-', linewidth=1.2,
+            label=f"{log['n_dampers']} dampers")
+    if log_compare is not None:
+        ax.plot(log_compare['time'], log_compare['lambda1'], 'r--',
+                linewidth=1.2, label=compare_label)
+    ax.axhline(y=eps, color='orange', linestyle=':', linewidth=1,
+               label=f'ε = {eps:.3g}')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Fiedler eigenvalue λ₁')
+    ax.set_title(f"Swarm spectral gap (N = {log['n_bodies']})")
+    ax.legend(fontsize=8)
+
+    ax = axes[1]
+    ax.plot(log['time'], log['control_norm'], 'g-', linewidth=0.8)
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Total control ‖u‖')
+
+    ax = axes[2]
+    pos = log['final_positions']
+    d_idx = log['damper_idx']
+    ax.scatter(pos[:log['n_bodies'], 0], pos[:log['n_bodies'], 1],
+               s=4, c='#377eb8', label='bodies')
+    if len(d_idx):
+        ax.scatter(pos[d_idx, 0], pos[d_idx, 1], s=30, c='#ff7f00',
+                   marker='^', label='dampers')
+    ax.set_aspect('equal')
+    ax.set_title('Final configuration')
+    ax.legend(fontsize=8)
+
+    plt.tight_layout()
+    _out = os.path.join(_OUTPUT_DIR, 'swarm_results.png')
+    plt.savefig(_out, dpi=150)
+    print(f"Saved {_out}")
+    plt.show()
+
+
+def print_stats(log, label=''):
+    """Print summary statistics for a swarm run."""
+    l1 = np.array(log['lambda1'])
+    arc = np.array(log['arc_type'])
+    eps = log['epsilon']
+    print(f"  {label}")
+    print(f"    Final λ₁ = {l1[-1]:.4g}  (ε = {eps:.4g}, "
+          f"{'STABLE' if l1[-1] >= eps else 'UNSTABLE'})")
+    print(f"    Min λ₁   = {np.min(l1):.4g}")
+    print(f"    Total cost J  = {log['total_cost']:.4f}")
+    print(f"    Bang fraction = {100 * np.mean(arc == 1):.1f}%")
+    print(f"    Mean edges    = {np.mean(log['n_edges']):.0f}")
+    print(f"    Step time     = {1e3 * np.mean(log['step_time']):.2f} ms")
+
+
+# ══════════════════════════════════════════════════════════════
+# Main
+# ══════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Swarm Gravity Damper (N bodies, M dampers)')
+    parser.add_argument('--bodies', type=int, default=200)
+    parser.add_argument('--dampers', type=int, default=8)
+    parser.add_argument('--cutoff', type=float, default=R_CUTOFF,
+                        help='Neighbour cutoff of the tidal graph')
+    parser.add_argument('--steps', type=int, default=N_STEPS)
+    parser.add_argument('--spectral-every', type=int, default=1,
+                        help='Recompute λ₁ and gradients every k steps')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gravity', choices=['direct', 'barnes-hut'],
+                        default='direct', help='Gravity kernel')
+    parser.add_argument('--theta', type=float, default=None,
+                        help='Barnes–Hut opening angle')
+    parser.add_argument('--headless', action='store_true',
+                        help='Run without display')
+    parser.add_argument('--no-damper', action='store_true',
+                        help='Run without dampers (swarm fragments)')
+    parser.add_argument('--scaling', action='store_true',
+                        help='Time the controller for several N')
+    args = parser.parse_args()
+
+    if args.headless:
+        import matplotlib
+        matplotlib.use('Agg')
+
+    print("=" * 60)
+    print("  Swarm Gravity Damper")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+
+    if args.scaling:
+        scaling_study(cutoff=args.cutoff)
+        return
+
+    kw = dict(n_bodies=args.bodies, n_dampers=args.dampers,
+              cutoff=args.cutoff, n_steps=args.steps,
+              spectral_every=args.spectral_every, seed=args.seed,
+              gravity=args.gravity, theta=args.theta)
+
+    if args.no_damper:
+        log = simulate_swarm(use_damper=False, **kw)
+        print_stats(log, 'Without dampers')
+        plot_swarm(log)
+        return
+
+    print(f"\n[1/2] Running WITH {args.dampers} dampers...")
+    log_damper = simulate_swarm(use_damper=True, **kw)
+    print_stats(log_damper, 'With dampers')
+
+    print("\n[2/2] Running WITHOUT dampers...")
+    log_free = simulate_swarm(use_damper=False,
+                              epsilon=log_damper['epsilon'], **kw)
+    print_stats(log_free, 'Without dampers')
+
+    plot_swarm(log_damper, log_free)
+    print("\nDone.")
+
+
+if __name__ == '__main__':
+    main()
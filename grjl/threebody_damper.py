@@ -17,6 +17,7 @@ Usage:
     python threebody_damper.py                          # reactive (default)
     python threebody_damper.py --solver pmp --headless  # full stack
     python threebody_damper.py --no-damper              # shows instability
+    python threebody_damper.py --integrator rk45        # adaptive + events
 
 Requirements: numpy, scipy, matplotlib
 """
@@ -26,13 +27,16 @@ import os
 import sys
 import numpy as np
 from numpy.linalg import eigvalsh, norm
-import matplotlib
-import matplotlib.pyplot as plt
 
 # Ensure sibling modules are importable regardless of how the script is invoked
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from sim_log import SimLog
+
 _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
@@ -112,11 +116,13 @@ def saturate(v, u_max):
 # Reactive simulator (existing three-term controller)
 # ══════════════════════════════════════════════════════════════
 
-def simulate(use_damper=True, headless=False):
+def simulate(use_damper=True, headless=False, log_every=1):
     """
     Run the three-body + gravity damper simulation (reactive controller).
 
-    Returns: dict with time series of positions, λ₁, control effort.
+    log_every: record every k-th step only (total_cost is still exact).
+
+    Returns: SimLog with time series of positions, λ₁, control effort.
     """
     # ── Initial conditions: perturbed equilateral triangle ──
     r0 = 1.5  # initial separation
@@ -145,14 +151,10 @@ def simulate(use_damper=True, headless=False):
     n_bodies = 4 if use_damper else 3
 
     # ── Logging ──
-    log = {
-        'time': [],
-        'lambda1': [],
-        'control_norm': [],
-        'positions': [],
-        'arc_type': [],  # 0=singular, 1=bang, -1=infeasible
-        'total_cost': 0.0,
-    }
+    # Columns: time, lambda1, control_norm, positions,
+    #          arc_type (0=singular, 1=bang, -1=infeasible)
+    log = SimLog(capacity=N_STEPS // log_every + 1, every=log_every)
+    log['total_cost'] = 0.0
 
     # ── Main loop ──
     for step in range(N_STEPS):
@@ -208,11 +210,8 @@ def simulate(use_damper=True, headless=False):
         log['total_cost'] += (0.5 * ALPHA * np.dot(u, u)) * DT
 
         # ── Log ──
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['control_norm'].append(norm(u))
-        log['positions'].append([p.copy() for p in positions])
-        log['arc_type'].append(arc_type)
+        log.append(time=t, lambda1=lambda1, control_norm=norm(u),
+                   positions=positions, arc_type=arc_type)
 
         # Early exit if system has clearly escaped
         max_dist = max(norm(positions[i] - positions[j])
@@ -225,11 +224,149 @@ def simulate(use_damper=True, headless=False):
     return log
 
 
+# ══════════════════════════════════════════════════════════════
+# Reactive simulator on the integrator layer
+# ══════════════════════════════════════════════════════════════
+
+def total_energy(positions, velocities, masses):
+    """Kinetic + softened gravitational potential energy."""
+    ke = 0.5 * sum(m * np.dot(v, v) for m, v in zip(masses, velocities))
+    pe = 0.0
+    n = len(masses)
+    for i in range(n):
+        for j in range(i + 1, n):
+            d = max(norm(positions[i] - positions[j]), 0.05)
+            pe -= G * masses[i] * masses[j] / d
+    return ke + pe
+
+
+def simulate_integrated(method='yoshida4', use_damper=True, h=10 * DT,
+                        t_final=T_FINAL, rtol=1e-7, epsilon=EPSILON):
+    """
+    Reactive three-term controller on a pluggable integrator.
+
+    Same control law as simulate(), but the arc is a function of the
+    state rather than of the grid: the λ₁ = ε (bang ↔ transition) and
+    λ₁ = 2ε (transition ↔ singular) crossings are located by root
+    finding, so much larger steps can be taken (see integrators.py).
+    The spectral gradient is the analytical one.
+
+    Parameters
+    ----------
+    method : 'euler', 'verlet', 'yoshida4' or 'rk45'
+    use_damper : bool
+    h : float
+        Step size (fixed schemes) or initial step (rk45).
+    t_final : float
+    rtol : float
+        Relative tolerance for rk45.
+    epsilon : float
+        Spectral gap threshold ε (arc levels ε and 2ε).
+
+    Returns: dict with the simulate() time series (one entry per
+    accepted step) plus 'events', 'energy', 'n_steps', 'n_accel'.
+    """
+    from integrators import integrate
+    from grjl_core.spectral_analytical import spectral_gradient_analytical
+
+    # ── Initial conditions (same as reactive) ──
+    r0 = 1.5
+    positions = [
+        np.array([r0 * np.cos(2 * np.pi * k / 3),
+                   r0 * np.sin(2 * np.pi * k / 3),
+                   0.0])
+        for k in range(3)
+    ]
+    positions[0] += np.array([0.3, 0.1, 0.0])
+    positions[2] += np.array([-0.1, -0.2, 0.0])
+    positions.append(np.array([0.0, 0.0, 0.3]))
+
+    velocities = [np.zeros(3) for _ in range(4)]
+    for k in range(3):
+        theta = 2 * np.pi * k / 3 + np.pi / 2
+        v_mag = 0.25 + 0.15 * k
+        velocities[k] = v_mag * np.array([np.cos(theta),
+                                           np.sin(theta), 0.0])
+
+    masses = [M_BODY, M_BODY, M_BODY, M_DAMPER]
+    n_bodies = 4 if use_damper else 3
+    masses = masses[:n_bodies]
+    m_col = np.array(masses)[:, None]
+
+    def lambda1_of(q):
+        return graph_laplacian(q, masses)[1]
+
+    def control(q, region):
+        """Three-term control with the arc frozen to `region`."""
+        if not use_damper or region == 2:
+            return np.zeros(3)
+        grad = spectral_gradient_analytical(q, masses, G=G)
+        if region == 0:
+            # Bang arc: saturated spectral gradient kick
+            g_norm = norm(grad)
+            if g_norm > 1e-8:
+                return U_MAX * grad / g_norm
+            return np.zeros(3)
+        # Transition: proportional spectral kick
+        gain = (2 * epsilon - lambda1_of(q)) / epsilon
+        return saturate(gain * grad / ALPHA, U_MAX)
+
+    def accel(q, region):
+        forces = np.zeros((n_bodies, 3))
+        for i in range(n_bodies):
+            for j in range(i + 1, n_bodies):
+                f = gravitational_force(q[i], q[j], masses[i], masses[j])
+                forces[i] += f
+                forces[j] -= f
+        if use_damper:
+            forces[3] += control(q, region)
+        return forces / m_col
+
+    def escaped(t, q, v):
+        max_dist = max(norm(q[i] - q[j])
+                       for i in range(3) for j in range(i + 1, 3))
+        if max_dist > 20.0:
+            print(f"System escaped at t={t:.2f}, "
+                  f"max_dist={max_dist:.1f}")
+            return True
+        return False
+
+    out = integrate(accel, np.array(positions[:n_bodies]),
+                    np.array(velocities[:n_bodies]), t_final,
+                    method=method, h=h, switch_fn=lambda1_of,
+                    levels=(epsilon, 2 * epsilon), rtol=rtol,
+                    stop_fn=escaped)
+
+    # ── Log in the simulate() format ──
+    log = {
+        'time': out['time'],
+        'lambda1': out['switch'],
+        'control_norm': [],
+        'positions': [list(q) for q in out['positions']],
+        'arc_type': [1 if r == 0 else 0 for r in out['region']],
+        'total_cost': 0.0,
+        'energy': [],
+        'events': out['events'],
+        'n_steps': out['n_steps'],
+        'n_accel': out['n_accel'],
+    }
+    for q, v, r in zip(out['positions'], out['velocities'],
+                       out['region']):
+        log['control_norm'].append(norm(control(q, r)))
+        log['energy'].append(total_energy(q, v, masses))
+
+    # Trapezoidal cost over the (non-uniform) accepted steps
+    effort = 0.5 * ALPHA * np.array(log['control_norm']) ** 2
+    log['total_cost'] = float(np.trapezoid(effort, log['time']))
+    return log
+
+
 # ══════════════════════════════════════════════════════════════
 # PMP simulator (full solver stack)
 # ══════════════════════════════════════════════════════════════
 
-def simulate_pmp(headless=False):
+def simulate_pmp(headless=False, log_every=1, pmp_solver='sweep',
+                 mppi_knots=None, seed=None):
     """
     Run the three-body + gravity damper simulation using the full
     solver stack: PMP + MPPI + B-spline + analytical spectral gradients.
@@ -238,12 +375,20 @@ def simulate_pmp(headless=False):
     contact mode selection.  The analytical spectral gradient replaces
     finite differences.
 
-    Returns: dict with time series (same format as simulate()).
+    pmp_solver selects the planner: 'sweep' (forward-backward
+    PontryaginSolver) or 'ilqr' (ILQRSolver, warm-started from the
+    MPPI plan).  mppi_knots samples the MPPI noise on that many
+    B-spline control points instead of per time step.  seed (int,
+    SeedSequence or Generator) fixes the MPPI noise; None draws from
+    the global np.random state.
+
+    Returns: SimLog with time series (same format as simulate()).
     """
     from pmp_solver import PontryaginSolver
-    from mppi_sampler import MPPISampler
-    from spectral_analytical import spectral_gradient_analytical
-    from bspline_trajectory import BSplineTrajectory
+    from ilqr_solver import ILQRSolver
+    from mppi_sampler import MPPISampler, MPPISchedule
+    from grjl_core.spectral_analytical import spectral_gradient_analytical
+    from grjl_core.bspline_trajectory import BSplineTrajectory
 
     # ── Initial conditions (same as reactive) ──
     r0 = 1.5
@@ -267,7 +412,10 @@ def simulate_pmp(headless=False):
     masses = [M_BODY, M_BODY, M_BODY, M_DAMPER]
 
     # ── Solvers ──
-    pmp = PontryaginSolver(
+    if pmp_solver not in ('sweep', 'ilqr'):
+        raise ValueError(f"Unknown PMP solver '{pmp_solver}'")
+    solver_cls = ILQRSolver if pmp_solver == 'ilqr' else PontryaginSolver
+    pmp = solver_cls(
         masses, G=G, alpha=ALPHA, epsilon=EPSILON,
         u_max=U_MAX, dt=DT)
 
@@ -299,25 +447,26 @@ def simulate_pmp(headless=False):
     mppi = MPPISampler(
         mppi_dynamics, mppi_cost,
         state_dim=24, control_dim=3,
-        alpha=ALPHA, u_max=U_MAX, beta=10.0)
+        alpha=ALPHA, u_max=U_MAX, beta=10.0, n_knots=mppi_knots,
+        rng=seed)
 
     # ── Planning parameters ──
     PLAN_HORIZON = 50     # steps to plan ahead
     REPLAN_EVERY = 25     # re-plan every N steps
-    MPPI_K = 32           # number of MPPI samples
+    MPPI_K = 32           # initial MPPI samples per iteration
+    MPPI_ITERS = 3        # max MPPI iterations per plan
+    # Adaptive K with a fixed rollout cap per replan (the old K × iters)
+    mppi_schedule = MPPISchedule(K_min=8, K_max=4 * MPPI_K,
+                                 max_rollouts=MPPI_ITERS * MPPI_K)
     PMP_ITERS = 5         # PMP iterations per plan
+    PMP_ANDERSON = 5      # Anderson window of the sweep's control update
 
     # ── Logging ──
-    log = {
-        'time': [],
-        'lambda1': [],
-        'control_norm': [],
-        'positions': [],
-        'arc_type': [],
-        'total_cost': 0.0,
-        'pmp_cost_history': [],
-        'mppi_cost_history': [],
-    }
+    log = SimLog(capacity=N_STEPS // log_every + 1, every=log_every)
+    log['total_cost'] = 0.0
+    log['pmp_cost_history'] = []
+    log['mppi_cost_history'] = []
+    log['mppi_rollouts'] = []
 
     # ── Planned control buffer ──
     planned_controls = np.zeros((PLAN_HORIZON, 3))
@@ -337,14 +486,22 @@ def simulate_pmp(headless=False):
             # Phase 1: MPPI for rough trajectory / mode selection
             u_mppi, mppi_costs = mppi.solve(
                 x0, PLAN_HORIZON, DT, K=MPPI_K,
-                noise_std=2.0, n_iters=3, u_init=planned_controls)
+                noise_std=2.0, n_iters=MPPI_ITERS, u_init=planned_controls,
+                schedule=mppi_schedule)
             log['mppi_cost_history'].extend(mppi_costs)
+            log['mppi_rollouts'].append(mppi.budget['rollouts'])
 
             # Phase 2: PMP refinement over the MPPI warm-start
             # Use a shorter PMP horizon for speed
             pmp_horizon = min(PLAN_HORIZON, N_STEPS - step)
-            pmp_result = pmp.solve(
-                x0, pmp_horizon, max_iter=PMP_ITERS, verbose=False)
+            if pmp_solver == 'ilqr':
+                pmp_result = pmp.solve(
+                    x0, pmp_horizon, max_iter=PMP_ITERS, verbose=False,
+                    u_init=u_mppi)
+            else:
+                pmp_result = pmp.solve(
+                    x0, pmp_horizon, max_iter=PMP_ITERS, verbose=False,
+                    anderson=PMP_ANDERSON)
             log['pmp_cost_history'].extend(pmp_result['cost_history'])
 
             # Blend: use PMP controls where λ₁ > ε (smooth arcs),
@@ -404,11 +561,8 @@ def simulate_pmp(headless=False):
         log['total_cost'] += (0.5 * ALPHA * np.dot(u, u)) * DT
 
         # ── Log ──
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['control_norm'].append(norm(u))
-        log['positions'].append([p.copy() for p in positions])
-        log['arc_type'].append(arc_type)
+        log.append(time=t, lambda1=lambda1, control_norm=norm(u),
+                   positions=positions, arc_type=arc_type)
 
         # Early exit if system escaped
         max_dist = max(norm(positions[i] - positions[j])
@@ -426,6 +580,8 @@ def simulate_pmp(headless=False):
 
 def plot_results(log, log_compare=None, compare_label='Without damper'):
     """Plot λ₁ evolution and control effort."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
 
     # ── λ₁ ──
@@ -470,6 +626,8 @@ def plot_results(log, log_compare=None, compare_label='Without damper'):
 
 def plot_comparison(log_reactive, log_pmp):
     """Plot reactive vs PMP solver comparison."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(3, 1, figsize=(10, 10), sharex=True)
 
     # ── λ₁ comparison ──
@@ -518,6 +676,8 @@ def plot_comparison(log_reactive, log_pmp):
 
 def plot_trajectories(log, title='Three-Body Trajectories'):
     """Plot 2D trajectories of all bodies."""
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(1, 1, figsize=(8, 8))
 
     n_bodies = len(log['positions'][0])
@@ -569,6 +729,10 @@ def print_stats(log, label=''):
     print(f"    Total cost J = {log['total_cost']:.4f}")
     print(f"    Mean ‖u‖     = {np.mean(cn):.4f}")
     print(f"    Bang fraction = {100 * bang_steps / total_steps:.1f}%")
+    if log.get('mppi_rollouts'):
+        print(f"    MPPI rollouts / replan = "
+              f"{np.mean(log['mppi_rollouts']):.1f} "
+              f"(max {np.max(log['mppi_rollouts'])})")
 
 
 # ══════════════════════════════════════════════════════════════
@@ -585,8 +749,23 @@ def main():
     parser.add_argument('--solver', choices=['reactive', 'pmp'],
                         default='reactive',
                         help='Solver mode: reactive (default) or pmp')
+    parser.add_argument('--pmp-solver', choices=['sweep', 'ilqr'],
+                        default='sweep',
+                        help='Planner for --solver pmp: forward-backward '
+                             'sweep (default) or box-constrained iLQR')
+    parser.add_argument('--mppi-knots', type=int, default=None,
+                        help='Sample MPPI noise on this many B-spline '
+                             'control points (default: per time step)')
+    parser.add_argument('--integrator',
+                        choices=['euler', 'verlet', 'yoshida4', 'rk45'],
+                        default=None,
+                        help='Reactive mode on the integrator layer with '
+                             'λ₁-crossing events (default: legacy loop)')
+    parser.add_argument('--dt', type=float, default=10 * DT,
+                        help='Step size for --integrator')
     args = parser.parse_args()
 
+    import matplotlib
     if args.headless:
         matplotlib.use('Agg')
 
@@ -602,7 +781,9 @@ def main():
         print_stats(log_reactive, 'Reactive')
 
         print(f"\n[2/3] Running PMP solver (full stack)...")
-        log_pmp = simulate_pmp(headless=args.headless)
+        log_pmp = simulate_pmp(headless=args.headless,
+                               pmp_solver=args.pmp_solver,
+                               mppi_knots=args.mppi_knots)
         print_stats(log_pmp, 'PMP')
 
         print(f"\n[3/3] Running WITHOUT damper...")
@@ -619,12 +800,25 @@ def main():
         plot_trajectories(log_pmp, 'PMP Solver Trajectories')
     else:
         # ── Standard reactive mode ──
+        if args.integrator is None:
+            def run(use_damper):
+                return simulate(use_damper=use_damper,
+                                headless=args.headless)
+        else:
+            def run(use_damper):
+                return simulate_integrated(
+                    args.integrator, use_damper=use_damper, h=args.dt)
+
         print("\n[1/2] Running WITH damper...")
-        log_damper = simulate(use_damper=True, headless=args.headless)
+        log_damper = run(use_damper=True)
         print_stats(log_damper, 'Reactive')
+        if args.integrator is not None:
+            print(f"    {args.integrator}: {log_damper['n_steps']} steps, "
+                  f"{log_damper['n_accel']} force evals, "
+                  f"{len(log_damper['events'])} arc switches")
 
         print("\n[2/2] Running WITHOUT damper...")
-        log_no_damper = simulate(use_damper=False, headless=args.headless)
+        log_no_damper = run(use_damper=False)
         l1_nd = log_no_damper['lambda1'][-1]
         print(f"  Final λ₁ = {l1_nd:.4f} "
               f"({'STABLE' if l1_nd >= EPSILON else 'UNSTABLE'})")
@@ -0,0 +1 @@
+../grjl/anderson.py
\ No newline at end of file
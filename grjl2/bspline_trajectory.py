@@ -1 +0,0 @@
-../grjl/bspline_trajectory.py
\ No newline at end of file
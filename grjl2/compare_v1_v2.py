@@ -4,8 +4,13 @@ Compare GRJL 1.0 (discrete modes) vs 2.0 (continuous ρ)
 Runs both simulators with identical initial conditions and produces
 a 4-panel comparison: λ₁, control norm, ρ, edge weights.
 
+Runs are cached in outputs/run_cache, keyed by the simulator source and
+arguments, so iterating on the figure does not re-simulate.
+
 Usage:
     python compare_v1_v2.py [--headless]
+    python compare_v1_v2.py --no-cache        # force fresh runs
+    python compare_v1_v2.py --workers 2       # cache misses in parallel
 """
 
 import argparse
@@ -29,20 +34,29 @@ def main():
     parser = argparse.ArgumentParser(
         description='Compare GRJL 1.0 vs 2.0')
     parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--cache', default=os.path.join(
+        _OUTPUT_DIR, 'run_cache'), help='Run cache directory')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore and do not write the run cache')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes for uncached runs (0: all cores)')
     args = parser.parse_args()
 
     if args.headless:
         matplotlib.use('Agg')
 
-    # ── Run 1.0 ──
-    print("[1/2] Running GRJL 1.0 (discrete modes)...")
+    # ── Run 1.0 (discrete modes) and 2.0 (continuous ρ) ──
     from grjl.threebody_damper import simulate as simulate_v1
-    log_v1 = simulate_v1(use_damper=True, headless=True)
-
-    # ── Run 2.0 ──
-    print("[2/2] Running GRJL 2.0 (continuous ρ)...")
     from grjl2.threebody_rho import simulate_reactive as simulate_v2
-    log_v2 = simulate_v2(use_damper=True, headless=True)
+    from grjl_core.run_cache import RunCache
+
+    print("Running GRJL 1.0 (discrete modes) and 2.0 (continuous ρ)...")
+    cache = RunCache(None if args.no_cache else args.cache)
+    log_v1, log_v2 = cache.run_many([
+        (simulate_v1, {'use_damper': True, 'headless': True}),
+        (simulate_v2, {'use_damper': True, 'headless': True}),
+    ], n_workers=args.workers or None)
+    print(f"  {cache.hits} cached, {cache.misses} simulated")
 
     # ── 4-panel plot ──
     fig, axes = plt.subplots(2, 2, figsize=(14, 9))
@@ -84,7 +98,7 @@ def main():
 
     # Panel 4: Edge weights
     ax = axes[1, 1]
-    if 'edge_weights' in log_v2 and log_v2['edge_weights']:
+    if 'edge_weights' in log_v2 and len(log_v2['edge_weights']):
         # Extract one representative edge weight over time
         first_key = None
         w_series = []
@@ -32,13 +32,15 @@ import numpy as np
 from numpy.linalg import norm
 
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
 _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
-from order_parameter import compute_rho
-import mujoco
+from grjl_core.order_parameter import compute_rho
+from sim_log import SimLog
 
 
 # ── Scene parameters ───────────────────────────────────────
@@ -66,7 +68,7 @@ class DribbleController:
     # Paddle body rest position in world frame (from XML: pos="0 0 0.8")
     PADDLE_REST_POS = np.array([0.0, 0.0, 0.8])
 
-    def __init__(self, model, data):
+    def __init__(self, model, data, log_every=1):
         self.model = model
         self.data = data
         self.dt = model.opt.timestep
@@ -77,19 +79,14 @@ class DribbleController:
         self._paddle_pos_adr = self._sensor_adr('paddle_pos')
         self._touch_adr = self._sensor_adr('paddle_touch')
 
-        # Logging
-        self.log = {
-            'time': [],
-            'ball_z': [],
-            'paddle_z': [],
-            'rho': [],
-            'control_z': [],
-            'arc_type': [],   # 0=singular, 1=bang
-            'contact_force': [],
-            'sdf': [],        # signed distance: ball_z - ground
-        }
+        # Logging — columns: time, ball_z, paddle_z, rho, control_z,
+        # arc_type (0=singular, 1=bang), contact_force,
+        # sdf (signed distance: ball_z - ground)
+        self.log = SimLog(capacity=4096, every=log_every)
 
     def _sensor_adr(self, name):
+        import mujoco
+
         sid = mujoco.mj_name2id(
             self.model, mujoco.mjtObj.mjOBJ_SENSOR, name)
         return self.model.sensor_adr[sid]
@@ -206,20 +203,17 @@ class DribbleController:
         self.data.ctrl[:] = ctrl
 
         # ── Log ──
-        self.log['time'].append(t)
-        self.log['ball_z'].append(ball_z)
-        self.log['paddle_z'].append(paddle_p[2])
-        self.log['rho'].append(rho)
-        self.log['control_z'].append(ctrl[2])
-        self.log['arc_type'].append(arc_type)
-        self.log['contact_force'].append(F_contact)
-        self.log['sdf'].append(sdf)
+        self.log.append(time=t, ball_z=ball_z, paddle_z=paddle_p[2],
+                        rho=rho, control_z=ctrl[2], arc_type=arc_type,
+                        contact_force=F_contact, sdf=sdf)
 
 
 # ── Simulation loop ───────────────────────────────────────
 
 def run_simulation(headless=False):
     """Run the dribble simulation."""
+    import mujoco
+
     model = mujoco.MjModel.from_xml_path(XML_PATH)
     data = mujoco.MjData(model)
     mujoco.mj_resetData(model, data)
@@ -0,0 +1 @@
+../grjl/noise.py
\ No newline at end of file
@@ -15,8 +15,11 @@ Reference: threebody.tex eqs 3b-ustar, 3b-costate.
 import numpy as np
 from numpy.linalg import eigvalsh, eigh, norm
 
-from order_parameter import (smooth_edge_weight, d_smooth_edge_weight_d_rho,
-                              tidal_rho, build_laplacian_from_rho)
+from anderson import AndersonMixer
+from grjl_core.order_parameter import (smooth_edge_weight,
+                                       d_smooth_edge_weight_d_rho,
+                                       tidal_rho_all, damper_pairs,
+                                       build_laplacian_from_rho)
 
 
 # ── Physics ────────────────────────────────────────────────
@@ -105,17 +108,9 @@ class PmpRhoSolver:
 
         Returns dict mapping (i, j) -> ρ, with i < j.
         """
-        rho_pairs = {}
-        d_idx = self.damper_idx
-        for j in range(self.n_bodies):
-            if j == d_idx:
-                continue
-            i_pair = min(d_idx, j)
-            j_pair = max(d_idx, j)
-            rho_pairs[(i_pair, j_pair)] = tidal_rho(
-                positions, self.masses, d_idx, j,
-                self.G, softening=0.05)
-        return rho_pairs
+        rho = tidal_rho_all(positions, self.masses, self.damper_idx,
+                            self.G, softening=0.05)
+        return dict(zip(damper_pairs(self.n_bodies, self.damper_idx), rho))
 
     def rho_weighted_laplacian(self, positions):
         """Build Laplacian with ρ-based edge weights.
@@ -309,9 +304,13 @@ class PmpRhoSolver:
 
     # ── Full solve ─────────────────────────────────────────
 
-    def solve(self, x0, N, max_iter=20, tol=1e-4, verbose=False):
+    def solve(self, x0, N, max_iter=20, tol=1e-4, verbose=False,
+              anderson=0):
         """Solve the OCP via forward-backward sweep.
 
+        anderson > 0 accelerates the damped control update with an
+        Anderson history window of that size (see anderson.py).
+
         Returns
         -------
         result : dict with states, controls, costates, lambda1s,
@@ -320,6 +319,7 @@ class PmpRhoSolver:
         dim = len(x0)
         controls = np.zeros((N, 3))
         cost_history = []
+        mixer = AndersonMixer(m=anderson) if anderson > 0 else None
         du = float('inf')
 
         for iteration in range(max_iter):
@@ -340,9 +340,14 @@ class PmpRhoSolver:
             # Convergence check
             du = norm(controls_new - controls) / max(norm(controls), 1e-10)
 
-            # Damped update
+            # Damped (or Anderson-accelerated) update
             step = min(0.3, 1.0 / (iteration + 1) + 0.1)
-            controls = (1 - step) * controls + step * controls_new
+            if mixer is None:
+                controls = (1 - step) * controls + step * controls_new
+            else:
+                controls = saturate(
+                    mixer.update(controls, controls_new, beta=step),
+                    self.u_max)
 
             # Total cost
             total_cost = sum(
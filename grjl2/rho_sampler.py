@@ -5,14 +5,32 @@ Replaces discrete MODE_* enumeration with continuous order parameter ρ.
 The ρ value is *derived* from state+control at each timestep (not sampled
 directly).  A phase-transition penalty discourages lingering at ρ ≈ 1.
 
+`noise` selects the perturbation generator and reuse=True pools the
+previous iteration's rollouts under importance weights (noise.py);
+ess_history holds the effective sample size per iteration.
+
+The K rollouts advance together one time step at a time: rho_fn,
+cost_fn and the phase-transition penalty are evaluated for all K states
+of a step in one batched call (leading batch axis), and only the
+dynamics are stepped per rollout.  ρ is an (..., n_pairs) array whose
+columns follow self.pairs; no dicts are built in the loop.
+
+ρ storage (rho_storage): 'best' returns the argmin rollout's ρ as a
+(horizon, n_pairs) array (copied out of a scratch buffer reused across
+calls), 'all' returns the (K, horizon, n_pairs) array, 'dicts' the
+legacy K lists of per-step dicts; rho_dicts() converts an array.
+
 Reference: threebody.tex thm:3b-mppi, calculus.tex path integral.
 """
 
 import numpy as np
 from numpy.linalg import norm
 
-from order_parameter import (compute_rho, smooth_edge_weight,
-                              build_laplacian_from_rho, tidal_rho)
+from noise import (draw_noise, mixture_log_ratio,
+                   effective_sample_size)
+from grjl_core.order_parameter import (compute_rho, smooth_edge_weight,
+                                       laplacian_from_rho_array,
+                                       tidal_rho_all, damper_pairs)
 
 
 class RhoMPPISampler:
@@ -21,11 +39,13 @@ class RhoMPPISampler:
     Parameters
     ----------
     dynamics_fn : callable(state, control, dt) -> next_state
-    cost_fn : callable(state, control, rho_info) -> scalar
-        Running cost.  rho_info is a dict with per-pair ρ values.
-    rho_fn : callable(state, control) -> dict
-        Computes pairwise ρ values from state and control.
-        Returns dict mapping (i, j) -> ρ.
+    cost_fn : callable(states, controls, rho) -> (K,) array
+        Running cost of a batch of (K, state_dim) states and
+        (K, control_dim) controls; rho is the (K, n_pairs) array
+        from rho_fn.
+    rho_fn : callable(states, controls) -> (K, n_pairs) array
+        Pairwise ρ values derived from a batch of states and controls,
+        in the order of `pairs`.
     state_dim : int
     control_dim : int
     alpha : float
@@ -36,11 +56,29 @@ class RhoMPPISampler:
         Phase-transition penalty coefficient.
     delta_rho : float
         Width of the phase-transition penalty Gaussian.
+    noise : str
+        Noise generator, one of noise.NOISE_KINDS.
+    noise_beta : float
+        Spectral exponent for noise='colored'.
+    reuse : bool
+        Pool the previous iteration's rollouts into the reweighting.
+    rho_storage : str
+        'best' (default), 'all' or 'dicts' — see the module docstring.
+    rng : numpy Generator, SeedSequence, int or None
+        Source of the perturbations; None draws from the global
+        np.random state.
+    pairs : list of (i, j) or None
+        Labels of rho_fn's columns; defaults to rho_fn.pairs (set by
+        make_gravity_rho_fn), else the column indices.
     """
 
     def __init__(self, dynamics_fn, cost_fn, rho_fn,
                  state_dim, control_dim,
-                 alpha=0.05, u_max=5.0, gamma=5.0, delta_rho=0.1):
+                 alpha=0.05, u_max=5.0, gamma=5.0, delta_rho=0.1,
+                 noise='gaussian', noise_beta=1.0, reuse=False,
+                 rho_storage='best', rng=None, pairs=None):
+        if rho_storage not in ('best', 'all', 'dicts'):
+            raise ValueError(f"Unknown rho_storage '{rho_storage}'")
         self.dynamics_fn = dynamics_fn
         self.cost_fn = cost_fn
         self.rho_fn = rho_fn
@@ -50,16 +88,25 @@ class RhoMPPISampler:
         self.u_max = u_max
         self.gamma = gamma
         self.delta_rho = delta_rho
-
-    def _phase_transition_penalty(self, rho_dict):
-        """Penalty for lingering near ρ ≈ 1.
+        self.noise = noise
+        self.noise_beta = noise_beta
+        self.reuse = reuse
+        self.rng = None if rng is None else np.random.default_rng(rng)
+        self.ess_history = []
+        self.rho_storage = rho_storage
+        if pairs is None:
+            pairs = getattr(rho_fn, 'pairs', None)
+        self.pairs = None if pairs is None else list(pairs)
+        self.best_index = None  # argmin-cost sample of the last sample()
+        self._rho_buf = None    # (K, horizon, n_pairs) scratch for 'best'
+
+    def _phase_transition_penalty(self, rho):
+        """Penalty for lingering near ρ ≈ 1 (sum over the last axis).
 
         cost += γ · Σ_{(i,j)} exp(−(ρ_{ij}−1)² / δ²)
         """
-        penalty = 0.0
-        for rho in rho_dict.values():
-            penalty += np.exp(-(rho - 1.0)**2 / self.delta_rho**2)
-        return self.gamma * penalty
+        return self.gamma * np.sum(
+            np.exp(-(rho - 1.0)**2 / self.delta_rho**2), axis=-1)
 
     def sample(self, x0, K, horizon, dt, noise_std=1.0, u_nominal=None):
         """Sample K trajectories from current state.
@@ -69,7 +116,10 @@ class RhoMPPISampler:
         trajectories : (K, horizon+1, state_dim) array
         controls : (K, horizon, control_dim) array
         costs : (K,) array
-        rho_histories : list of K lists of dicts
+        rho_histories : depends on rho_storage —
+            'best'  (horizon, n_pairs) array of the argmin-cost sample
+            'all'   (K, horizon, n_pairs) array
+            'dicts' list of K lists of dicts
         """
         if u_nominal is None:
             u_nominal = np.zeros((horizon, self.control_dim))
@@ -77,40 +127,61 @@ class RhoMPPISampler:
         trajectories = np.zeros((K, horizon + 1, self.state_dim))
         controls = np.zeros((K, horizon, self.control_dim))
         costs = np.zeros(K)
-        rho_histories = []
-
-        for k in range(K):
-            noise = noise_std * np.random.randn(horizon, self.control_dim)
-            u_k = np.clip(u_nominal + noise, -self.u_max, self.u_max)
-
-            x = x0.copy()
-            trajectories[k, 0] = x
-            J = 0.0
-            rho_hist_k = []
-
-            for t in range(horizon):
-                # Derive ρ from current state and control
-                rho_dict = self.rho_fn(x, u_k[t])
-                rho_hist_k.append(rho_dict)
+        noise = noise_std * draw_noise(
+            self.noise, K, (horizon, self.control_dim), self.noise_beta,
+            self.rng)
+
+        if self.pairs is None:
+            self.pairs = list(range(
+                self.rho_fn(x0[None], u_nominal[:1]).shape[-1]))
+        shape = (K, horizon, len(self.pairs))
+        if self.rho_storage == 'all':
+            rho_all = np.zeros(shape)
+        else:
+            if self._rho_buf is None or self._rho_buf.shape != shape:
+                self._rho_buf = np.zeros(shape)
+            rho_all = self._rho_buf
+
+        controls[:] = np.clip(u_nominal + noise, -self.u_max, self.u_max)
+        trajectories[:, 0] = x0
+        for t in range(horizon):
+            x, u = trajectories[:, t], controls[:, t]
+
+            # Derive ρ for all K rollouts from state and control
+            rho = rho_all[:, t]
+            rho[:] = self.rho_fn(x, u)
+
+            # Running cost + phase-transition penalty
+            costs += self.cost_fn(x, u, rho) * dt
+            costs += self._phase_transition_penalty(rho) * dt
+
+            # Forward dynamics
+            for k in range(K):
+                trajectories[k, t + 1] = self.dynamics_fn(x[k], u[k], dt)
+
+        self.best_index = int(np.argmin(costs))
+        if self.rho_storage == 'best':
+            rho_histories = rho_all[self.best_index].copy()
+        elif self.rho_storage == 'all':
+            rho_histories = rho_all
+        else:
+            rho_histories = [self.rho_dicts(r) for r in rho_all]
 
-                # Running cost + phase-transition penalty
-                J += self.cost_fn(x, u_k[t], rho_dict) * dt
-                J += self._phase_transition_penalty(rho_dict) * dt
-
-                # Forward dynamics
-                x = self.dynamics_fn(x, u_k[t], dt)
-                trajectories[k, t + 1] = x
-                controls[k, t] = u_k[t]
+        return trajectories, controls, costs, rho_histories
 
-            costs[k] = J
-            rho_histories.append(rho_hist_k)
+    def rho_dicts(self, rho_array):
+        """(horizon, n_pairs) ρ array → list of per-step {pair: ρ} dicts."""
+        return [dict(zip(self.pairs, row.tolist())) for row in rho_array]
 
-        return trajectories, controls, costs, rho_histories
+    def reweight(self, costs, log_ratio=None):
+        """Boltzmann weights: w_k = exp(−J_k / α) / Z.
 
-    def reweight(self, costs):
-        """Boltzmann weights: w_k = exp(−J_k / α) / Z."""
+        log_ratio, if given, adds importance log ratios log p/q.
+        """
         c_min = np.min(costs)
         log_w = -(costs - c_min) / self.alpha
+        if log_ratio is not None:
+            log_w = log_w + log_ratio
         max_lw = np.max(log_w)
         w = np.exp(log_w - max_lw)
         Z = np.sum(w)
@@ -131,24 +202,38 @@ class RhoMPPISampler:
         -------
         u_opt : (horizon, control_dim) array
         cost_history : list of mean costs per iteration
-        rho_history : list of ρ dicts from final iteration
+        rho_history : best sample's ρ in the final iteration —
+                      (horizon, n_pairs) array over self.pairs, or a
+                      list of dicts with rho_storage='dicts'
         """
         u_nominal = (u_init.copy() if u_init is not None
                      else np.zeros((horizon, self.control_dim)))
         cost_history = []
         rho_history = []
+        self.ess_history = []
+        previous = None   # (controls, costs, nominal) of the last iteration
 
         for it in range(n_iters):
             trajs, ctrls, costs, rho_hists = self.sample(
                 x0, K, horizon, dt, noise_std, u_nominal)
-            weights = self.reweight(costs)
-            u_nominal = self.fuse(ctrls, weights)
+            if self.reuse and previous is not None:
+                pool_ctrls = np.concatenate([ctrls, previous[0]])
+                weights = self.reweight(
+                    np.concatenate([costs, previous[1]]),
+                    mixture_log_ratio(pool_ctrls, u_nominal, previous[2],
+                                      noise_std, len(ctrls),
+                                      len(previous[0])))
+            else:
+                pool_ctrls, weights = ctrls, self.reweight(costs)
+            self.ess_history.append(effective_sample_size(weights))
+            previous = (ctrls, costs, u_nominal)
+            u_nominal = self.fuse(pool_ctrls, weights)
             cost_history.append(float(np.mean(costs)))
 
             # Keep best trajectory's ρ history from last iteration
             if it == n_iters - 1:
-                best_k = np.argmin(costs)
-                rho_history = rho_hists[best_k]
+                rho_history = (rho_hists if self.rho_storage == 'best'
+                               else rho_hists[self.best_index])
 
         return u_nominal, cost_history, rho_history
 
@@ -158,39 +243,42 @@ class RhoMPPISampler:
 def make_gravity_rho_fn(masses, damper_idx=3, G=0.5, softening=0.05):
     """Create a rho_fn for the gravity three-body system.
 
-    The returned function extracts positions from the state vector
-    and computes pairwise ρ between the damper and each body.
+    The returned function views the positions in a (..., state_dim)
+    batch of states as (..., n, 3) and computes every damper–body ρ of
+    every state in one tidal_rho_all call.  Its `pairs` attribute labels
+    the columns of the (..., n − 1) result.
     """
     n = len(masses)
+    masses = np.asarray(masses, dtype=float)
 
-    def rho_fn(state, control):
-        positions = [state[3*i:3*i+3] for i in range(n)]
-        rho_dict = {}
-        for j in range(n):
-            if j == damper_idx:
-                continue
-            i_pair = min(damper_idx, j)
-            j_pair = max(damper_idx, j)
-            rho_dict[(i_pair, j_pair)] = tidal_rho(
-                positions, masses, damper_idx, j, G, softening)
-        return rho_dict
+    def rho_fn(states, controls):
+        states = np.asarray(states)
+        positions = states[..., :3 * n].reshape(states.shape[:-1] + (n, 3))
+        return tidal_rho_all(positions, masses, damper_idx, G, softening)
 
+    rho_fn.pairs = damper_pairs(n, damper_idx)
     return rho_fn
 
 
-def make_gravity_cost_fn(masses, alpha=0.05, epsilon=0.02, G=0.5):
-    """Create a cost function using ρ-based spectral gap."""
+def make_gravity_cost_fn(masses, alpha=0.05, epsilon=0.02, G=0.5,
+                         damper_idx=3):
+    """Create a cost function using ρ-based spectral gap.
+
+    Batched over leading axes: rho is the (..., n_pairs) array of
+    make_gravity_rho_fn (same damper_idx), and all Laplacians of the
+    batch are built and diagonalised in one laplacian_from_rho_array
+    call.
+    """
     n = len(masses)
+    pairs = damper_pairs(n, damper_idx)
 
-    def cost_fn(state, control, rho_dict):
+    def cost_fn(states, controls, rho):
         # Control cost
-        cost = 0.5 * alpha * np.dot(control, control)
+        cost = 0.5 * alpha * np.sum(controls * controls, axis=-1)
 
         # Spectral gap barrier via ρ-weighted Laplacian
-        _, lambda1, _ = build_laplacian_from_rho(rho_dict, n)
-        if lambda1 < epsilon:
-            cost += 100.0 * (epsilon - lambda1) / epsilon
-
-        return cost
+        _, lambda1, _ = laplacian_from_rho_array(rho, pairs, n)
+        return cost + np.where(lambda1 < epsilon,
+                               100.0 * (epsilon - lambda1) / epsilon, 0.0)
 
     return cost_fn
@@ -0,0 +1 @@
+../grjl/sim_log.py
\ No newline at end of file
@@ -22,19 +22,21 @@ import os
 import sys
 import numpy as np
 from numpy.linalg import eigvalsh, eigh, norm
-import matplotlib
-import matplotlib.pyplot as plt
 
 # Ensure sibling modules are importable
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
 _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
-from order_parameter import (compute_rho, smooth_edge_weight,
-                              d_smooth_edge_weight_d_rho,
-                              build_laplacian_from_rho, tidal_rho)
+from sim_log import SimLog
+from grjl_core.order_parameter import (compute_rho, smooth_edge_weight,
+                                       d_smooth_edge_weight_d_rho,
+                                       build_laplacian_from_rho,
+                                       tidal_rho_all, damper_pairs)
 
 
 # ── Physical constants ──────────────────────────────────────
@@ -82,15 +84,8 @@ def graph_laplacian_tidal(positions, masses):
 
 def compute_rho_pairs(positions, masses, damper_idx=3):
     """Compute pairwise ρ between damper and each body."""
-    rho_pairs = {}
-    for j in range(len(masses)):
-        if j == damper_idx:
-            continue
-        i_pair = min(damper_idx, j)
-        j_pair = max(damper_idx, j)
-        rho_pairs[(i_pair, j_pair)] = tidal_rho(
-            positions, masses, damper_idx, j, G, softening=0.05)
-    return rho_pairs
+    rho = tidal_rho_all(positions, masses, damper_idx, G, softening=0.05)
+    return dict(zip(damper_pairs(len(masses), damper_idx), rho))
 
 
 def rho_weighted_lambda1(positions, masses, damper_idx=3):
@@ -158,17 +153,8 @@ def simulate_reactive(use_damper=True, headless=False):
     masses = [M_BODY, M_BODY, M_BODY, M_DAMPER]
     n_bodies = 4 if use_damper else 3
 
-    log = {
-        'time': [],
-        'lambda1': [],
-        'control_norm': [],
-        'positions': [],
-        'arc_type': [],
-        'total_cost': 0.0,
-        'rho_min': [],
-        'rho_max': [],
-        'edge_weights': [],
-    }
+    log = SimLog(capacity=N_STEPS)
+    log['total_cost'] = 0.0
 
     for step in range(N_STEPS):
         t = step * DT
@@ -227,14 +213,10 @@ def simulate_reactive(use_damper=True, headless=False):
 
         # ── Log ──
         log['total_cost'] += (0.5 * ALPHA * np.dot(u, u)) * DT
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['control_norm'].append(norm(u))
-        log['positions'].append([p.copy() for p in positions])
-        log['arc_type'].append(arc_type)
-        log['rho_min'].append(rho_min)
-        log['rho_max'].append(rho_max)
-        log['edge_weights'].append(dict(weights))
+        log.append(time=t, lambda1=lambda1, control_norm=norm(u),
+                   positions=positions, arc_type=arc_type,
+                   rho_min=rho_min, rho_max=rho_max,
+                   edge_weights=dict(weights))
 
         # Early exit if escaped
         max_dist = max(norm(positions[i] - positions[j])
@@ -250,8 +232,12 @@ def simulate_reactive(use_damper=True, headless=False):
 # PMP simulator — ρ-weighted Laplacian
 # ══════════════════════════════════════════════════════════════
 
-def simulate_pmp(headless=False):
-    """Three-body simulation using PMP + MPPI with ρ-weighted Laplacian."""
+def simulate_pmp(headless=False, seed=None):
+    """Three-body simulation using PMP + MPPI with ρ-weighted Laplacian.
+
+    seed (int, SeedSequence or Generator) fixes the MPPI noise; None
+    draws from the global np.random state.
+    """
     from pmp_rho_solver import PmpRhoSolver
     from rho_sampler import RhoMPPISampler, make_gravity_rho_fn, make_gravity_cost_fn
 
@@ -287,27 +273,19 @@ def simulate_pmp(headless=False):
     mppi = RhoMPPISampler(
         mppi_dynamics, cost_fn, rho_fn,
         state_dim=24, control_dim=3,
-        alpha=ALPHA, u_max=U_MAX, gamma=5.0, delta_rho=0.1)
+        alpha=ALPHA, u_max=U_MAX, gamma=5.0, delta_rho=0.1, rng=seed)
 
     # ── Planning parameters ──
     PLAN_HORIZON = 50
     REPLAN_EVERY = 25
     MPPI_K = 32
     PMP_ITERS = 5
+    PMP_ANDERSON = 5
 
-    log = {
-        'time': [],
-        'lambda1': [],
-        'control_norm': [],
-        'positions': [],
-        'arc_type': [],
-        'total_cost': 0.0,
-        'rho_min': [],
-        'rho_max': [],
-        'edge_weights': [],
-        'pmp_cost_history': [],
-        'mppi_cost_history': [],
-    }
+    log = SimLog(capacity=N_STEPS)
+    log['total_cost'] = 0.0
+    log['pmp_cost_history'] = []
+    log['mppi_cost_history'] = []
 
     planned_controls = np.zeros((PLAN_HORIZON, 3))
     plan_step = 0
@@ -335,7 +313,8 @@ def simulate_pmp(headless=False):
             # PMP refinement
             pmp_horizon = min(PLAN_HORIZON, N_STEPS - step)
             pmp_result = pmp.solve(
-                x0, pmp_horizon, max_iter=PMP_ITERS, verbose=False)
+                x0, pmp_horizon, max_iter=PMP_ITERS, verbose=False,
+                anderson=PMP_ANDERSON)
             log['pmp_cost_history'].extend(pmp_result['cost_history'])
 
             # Blend: PMP where ρ > 1 (sticking), MPPI near transition
@@ -389,14 +368,10 @@ def simulate_pmp(headless=False):
 
         # ── Log ──
         log['total_cost'] += (0.5 * ALPHA * np.dot(u, u)) * DT
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['control_norm'].append(norm(u))
-        log['positions'].append([p.copy() for p in positions])
-        log['arc_type'].append(arc_type)
-        log['rho_min'].append(rho_min)
-        log['rho_max'].append(rho_max)
-        log['edge_weights'].append(dict(weights))
+        log.append(time=t, lambda1=lambda1, control_norm=norm(u),
+                   positions=positions, arc_type=arc_type,
+                   rho_min=rho_min, rho_max=rho_max,
+                   edge_weights=dict(weights))
 
         max_dist = max(norm(positions[i] - positions[j])
                        for i in range(3) for j in range(i + 1, 3))
@@ -413,6 +388,8 @@ def simulate_pmp(headless=False):
 
 def plot_rho_results(log, title_suffix=''):
     """3-panel plot: λ₁, ρ, and control effort."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(3, 1, figsize=(10, 10), sharex=True)
     t = log['time']
 
@@ -457,6 +434,8 @@ def plot_rho_results(log, title_suffix=''):
 
 def plot_phase_portrait(log, title_suffix=''):
     """Phase portrait: ρ_min vs λ₁."""
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(1, 1, figsize=(8, 6))
     ax.scatter(log['rho_min'], log['lambda1'],
                c=log['time'], cmap='viridis', s=1, alpha=0.5)
@@ -524,6 +503,7 @@ def main():
                         help='Solver mode')
     args = parser.parse_args()
 
+    import matplotlib
     if args.headless:
         matplotlib.use('Agg')
 
@@ -0,0 +1,374 @@
+"""
+Parallel Gain Autotuning — GRJL 3.0 dribble
+
+Searches the tunable constants of DualDribbleController,
+
+    STRIKE_OFFSET     how far past the ball the hand targets (bang arc)
+    XY_STEER_GAIN     xy nudge toward the trajectory at each strike
+
+over a set of headless MuJoCo episodes (mode × trajectory × initial
+ball offset).  The outer ρ-PID gains Kp, Ki, Kd can be added with
+--params, but the PID output is only logged, so they do not change the
+score.  Each candidate is scored on
+
+    J = hits per second − W_XY · mean xy error − W_ESCAPE · [ball escaped]
+
+averaged over the episodes; higher is better.  The search is a
+(μ/μ_w, λ)-CMA-ES [Hansen 2016] in the box-normalised parameter space.
+The episodes of a generation are farmed out to a process pool, and
+every candidate's result is written to a JSON file keyed by a hash of
+(gains, episodes, t_sim) — a rerun with the same seed replays the
+cached generations and resumes where an interrupted sweep stopped.
+
+Usage:
+    python autotune.py                          # 10 generations, λ = 8
+    python autotune.py --iters 30 --workers 8
+    python autotune.py --cache outputs/autotune_cache --t-sim 5
+    python autotune.py --params STRIKE_OFFSET XY_STEER_GAIN Kp
+
+Requirements: mujoco, numpy
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+_OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
+
+
+# ── Search space ──────────────────────────────────────────
+
+# name: (default, low, high) — defaults as hard-coded in the controller
+PARAMS = {
+    'Kp': (2.0, 0.1, 10.0),
+    'Ki': (0.1, 0.0, 1.0),
+    'Kd': (0.05, 0.0, 0.5),
+    'STRIKE_OFFSET': (0.08, 0.02, 0.20),
+    'XY_STEER_GAIN': (0.15, 0.0, 0.5),
+}
+
+# Searched by default.  Kp, Ki, Kd are left out: DualDribbleController
+# logs the ρ-PID output (pid_P/I/D) but decides strikes from the ball
+# state alone, so these gains have no effect on an episode and would
+# only spend CMA-ES dimensions on flat axes.
+TUNED = ('STRIKE_OFFSET', 'XY_STEER_GAIN')
+
+# (mode, trajectory, seed); the seed draws the initial ball xy offset
+EPISODES = [(mode, traj, seed)
+            for mode in ('down', 'up')
+            for traj in ('stationary', 'circle')
+            for seed in range(2)]
+
+W_XY = 5.0          # score per metre of mean xy tracking error
+W_ESCAPE = 10.0     # score penalty for a ball that escapes
+BALL_XY_STD = 0.02  # initial ball offset (m) for seed > 0
+
+
+def to_gains(z, names=tuple(PARAMS)):
+    """Normalised z ∈ [0, 1]^d (clipped) → gains dict."""
+    z = np.clip(z, 0.0, 1.0)
+    return {k: float(PARAMS[k][1] + zi * (PARAMS[k][2] - PARAMS[k][1]))
+            for k, zi in zip(names, z)}
+
+
+def from_gains(gains, names=tuple(PARAMS)):
+    """Gains dict → normalised z (inverse of to_gains)."""
+    return np.array([(gains[k] - PARAMS[k][1])
+                     / (PARAMS[k][2] - PARAMS[k][1]) for k in names])
+
+
+# ── Episodes ──────────────────────────────────────────────
+
+def score_episode(log, hits, t_sim):
+    """Metrics of one episode; 'score' is the scalar objective."""
+    xy_err = np.hypot(np.asarray(log['ball_x']) - np.asarray(log['traj_x']),
+                      np.asarray(log['ball_y']) - np.asarray(log['traj_y']))
+    escaped = bool(log['escape'])
+    mean_xy = float(np.mean(xy_err)) if len(xy_err) else 0.0
+    return {
+        'hits': int(hits),
+        'xy_err': mean_xy,
+        'escaped': escaped,
+        'score': hits / t_sim - W_XY * mean_xy - W_ESCAPE * escaped,
+    }
+
+
+def _run_episode(args):
+    """Worker: one headless episode → metrics dict."""
+    from dual_dribble_controller import run_simulation
+
+    gains, mode, trajectory, seed, t_sim = args
+    ball_xy = (np.random.default_rng(seed).normal(0.0, BALL_XY_STD, 2)
+               if seed else (0.0, 0.0))
+    log, hits = run_simulation(mode=mode, trajectory=trajectory,
+                               headless=True, gains=gains, t_sim=t_sim,
+                               ball_xy=ball_xy, verbose=False)
+    return score_episode(log, hits, t_sim)
+
+
+# ── On-disk result cache ──────────────────────────────────
+
+class ResultCache:
+    """One JSON file per evaluated candidate, keyed by content hash.
+
+    Parameters
+    ----------
+    path : str or None
+        Cache directory (created on demand); None disables caching.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(gains, episodes, t_sim):
+        blob = json.dumps({'gains': {k: round(v, 12)
+                                     for k, v in sorted(gains.items())},
+                           'episodes': [list(e) for e in episodes],
+                           't_sim': t_sim}, sort_keys=True)
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def get(self, key):
+        if self.path is None:
+            return None
+        fname = os.path.join(self.path, f'{key}.json')
+        if not os.path.isfile(fname):
+            return None
+        with open(fname) as f:
+            return json.load(f)
+
+    def put(self, key, result):
+        if self.path is None:
+            return
+        fname = os.path.join(self.path, f'{key}.json')
+        tmp = f'{fname}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(result, f, indent=1)
+        os.replace(tmp, fname)   # atomic: no half-written entries
+
+
+def evaluate(candidates, episodes=EPISODES, t_sim=5.0, n_workers=None,
+             cache=None):
+    """Mean score of each gains dict over the episodes.
+
+    Uncached (candidate, episode) runs of the whole batch go to one
+    process pool; n_workers None → os.cpu_count(), 1 → in-process.
+
+    Returns
+    -------
+    results : list of dicts — gains, score, hits, xy_err, escapes,
+              episodes (per-episode metrics), cached (bool)
+    """
+    cache = cache or ResultCache(None)
+    keys = [cache.key(g, episodes, t_sim) for g in candidates]
+    results = [cache.get(k) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+    tasks = [(candidates[i], *ep, t_sim) for i in todo for ep in episodes]
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, max(len(tasks), 1))
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            metrics = list(pool.map(_run_episode, tasks))
+    else:
+        metrics = [_run_episode(task) for task in tasks]
+
+    n_ep = len(episodes)
+    for j, i in enumerate(todo):
+        per_ep = metrics[j * n_ep:(j + 1) * n_ep]
+        results[i] = {
+            'gains': candidates[i],
+            'score': float(np.mean([m['score'] for m in per_ep])),
+            'hits': float(np.mean([m['hits'] for m in per_ep])),
+            'xy_err': float(np.mean([m['xy_err'] for m in per_ep])),
+            'escapes': int(sum(m['escaped'] for m in per_ep)),
+            'episodes': per_ep,
+        }
+        cache.put(keys[i], results[i])
+    for i, r in enumerate(results):
+        r['cached'] = i not in todo
+    return results
+
+
+# ── CMA-ES ────────────────────────────────────────────────
+
+class CMAES:
+    """(μ/μ_w, λ)-CMA-ES with ask/tell, minimising f.
+
+    Parameters
+    ----------
+    x0 : (d,) array — initial mean
+    sigma0 : float — initial step size
+    popsize : int or None — λ (default 4 + ⌊3 ln d⌋)
+    seed : int or None
+    """
+
+    def __init__(self, x0, sigma0=0.2, popsize=None, seed=None):
+        self.mean = np.asarray(x0, dtype=float)
+        d = self.dim = len(self.mean)
+        self.sigma = sigma0
+        self.lam = popsize or 4 + int(3 * np.log(d))
+        self.mu = self.lam // 2
+        w = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = w / w.sum()
+        self.mu_eff = 1.0 / np.sum(self.weights**2)
+
+        self.c_sigma = (self.mu_eff + 2) / (d + self.mu_eff + 5)
+        self.d_sigma = (1 + 2 * max(0.0, np.sqrt((self.mu_eff - 1)
+                                                 / (d + 1)) - 1)
+                        + self.c_sigma)
+        self.c_c = (4 + self.mu_eff / d) / (d + 4 + 2 * self.mu_eff / d)
+        self.c_1 = 2 / ((d + 1.3)**2 + self.mu_eff)
+        self.c_mu = min(1 - self.c_1,
+                        2 * (self.mu_eff - 2 + 1 / self.mu_eff)
+                        / ((d + 2)**2 + self.mu_eff))
+        self.chi_n = np.sqrt(d) * (1 - 1 / (4 * d) + 1 / (21 * d**2))
+
+        self.p_sigma = np.zeros(d)
+        self.p_c = np.zeros(d)
+        self.C = np.eye(d)
+        self.generation = 0
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self):
+        """λ candidate points, (λ, d)."""
+        evals, B = np.linalg.eigh(self.C)
+        self._BD = B * np.sqrt(np.maximum(evals, 1e-20))
+        self._invsqrtC = B @ np.diag(1 / np.sqrt(np.maximum(evals, 1e-20))) \
+            @ B.T
+        z = self.rng.standard_normal((self.lam, self.dim))
+        return self.mean + self.sigma * z @ self._BD.T
+
+    def tell(self, X, f):
+        """Update from candidates X (λ, d) and their costs f (λ,)."""
+        X = np.asarray(X)
+        order = np.argsort(f)[:self.mu]
+        old = self.mean
+        self.mean = self.weights @ X[order]
+        y = (self.mean - old) / self.sigma
+
+        self.p_sigma = ((1 - self.c_sigma) * self.p_sigma
+                        + np.sqrt(self.c_sigma * (2 - self.c_sigma)
+                                  * self.mu_eff) * self._invsqrtC @ y)
+        self.generation += 1
+        h_sigma = (np.linalg.norm(self.p_sigma)
+                   / np.sqrt(1 - (1 - self.c_sigma)**(2 * self.generation))
+                   < (1.4 + 2 / (self.dim + 1)) * self.chi_n)
+        self.p_c = ((1 - self.c_c) * self.p_c
+                    + h_sigma * np.sqrt(self.c_c * (2 - self.c_c)
+                                        * self.mu_eff) * y)
+
+        Y = (X[order] - old) / self.sigma
+        self.C = ((1 - self.c_1 - self.c_mu) * self.C
+                  + self.c_1 * (np.outer(self.p_c, self.p_c)
+                                + (1 - h_sigma) * self.c_c
+                                * (2 - self.c_c) * self.C)
+                  + self.c_mu * (Y.T * self.weights) @ Y)
+        self.sigma *= np.exp(self.c_sigma / self.d_sigma
+                             * (np.linalg.norm(self.p_sigma) / self.chi_n
+                                - 1))
+
+
+# ── Driver ────────────────────────────────────────────────
+
+def autotune(n_iter=10, popsize=8, sigma0=0.2, seed=0, episodes=EPISODES,
+             t_sim=5.0, n_workers=None, cache_dir=None, params=TUNED,
+             verbose=True):
+    """CMA-ES search over `params` (names in PARAMS), starting from the
+    hard-coded gains; the others keep their controller defaults.
+
+    Returns
+    -------
+    best : dict — result of the best candidate (gains, score, ...)
+    history : list of per-generation lists of results
+    """
+    cache = ResultCache(cache_dir)
+    params = tuple(params)
+    es = CMAES(from_gains({k: PARAMS[k][0] for k in params}, params),
+               sigma0=sigma0, popsize=popsize, seed=seed)
+
+    baseline = evaluate([to_gains(es.mean, params)], episodes, t_sim,
+                        n_workers, cache)[0]
+    best = baseline
+    history = []
+    if verbose:
+        print(f"  baseline: J={baseline['score']:+.3f}  "
+              f"hits={baseline['hits']:.1f}  "
+              f"xy={baseline['xy_err']:.3f}  "
+              f"escapes={baseline['escapes']}")
+
+    for gen in range(n_iter):
+        Z = es.ask()
+        results = evaluate([to_gains(z, params) for z in Z], episodes,
+                           t_sim, n_workers, cache)
+        # Out-of-box samples are evaluated clipped, penalised by distance
+        excess = np.sum((Z - np.clip(Z, 0.0, 1.0))**2, axis=1)
+        es.tell(Z, [-r['score'] + 10.0 * e for r, e in zip(results, excess)])
+        history.append(results)
+
+        gen_best = max(results, key=lambda r: r['score'])
+        if gen_best['score'] > best['score']:
+            best = gen_best
+        if verbose:
+            n_cached = sum(r['cached'] for r in results)
+            print(f"  gen {gen:3d}: best J={gen_best['score']:+.3f}  "
+                  f"overall J={best['score']:+.3f}  σ={es.sigma:.3f}  "
+                  f"({n_cached}/{len(results)} cached)")
+
+    return best, history
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='CMA-ES gain autotuning for the dual dribble controller')
+    parser.add_argument('--iters', type=int, default=10,
+                        help='CMA-ES generations')
+    parser.add_argument('--popsize', type=int, default=8,
+                        help='Candidates per generation')
+    parser.add_argument('--sigma', type=float, default=0.2,
+                        help='Initial step size (normalised box units)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--t-sim', type=float, default=5.0,
+                        help='Episode length (s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('--cache', default=os.path.join(
+        _OUTPUT_DIR, 'autotune_cache'),
+        help='Result cache directory (resume interrupted sweeps)')
+    parser.add_argument('--params', nargs='+', choices=list(PARAMS),
+                        default=list(TUNED),
+                        help='Constants to search (Kp/Ki/Kd have no '
+                             'effect on the score)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Dual Dribble Autotuning — GRJL 3.0")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+    print(f"  {len(EPISODES)} episodes × {args.popsize} candidates "
+          f"× {args.iters} generations, t_sim={args.t_sim} s")
+    print(f"  searching {', '.join(args.params)}")
+
+    best, _ = autotune(n_iter=args.iters, popsize=args.popsize,
+                       sigma0=args.sigma, seed=args.seed, t_sim=args.t_sim,
+                       n_workers=args.workers, cache_dir=args.cache,
+                       params=args.params)
+
+    print(f"\n  Best J = {best['score']:+.3f}  (hits={best['hits']:.1f}, "
+          f"xy={best['xy_err']:.3f} m, escapes={best['escapes']})")
+    for k, v in best['gains'].items():
+        print(f"    {k:14s} = {v:.4f}   (default {PARAMS[k][0]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Batched Multithreaded Dribble Rollouts — GRJL 3.0
+
+Steps B independent MjData instances of one MjModel in lock-step:
+
+    sensors   stack ball pos/vel and paddle pos of all envs → (B, 3)
+    control   BatchDribbleLaw: the DualDribbleController law on the
+              stacked states (kinematic ρ, ρ-filter, PIDBank, phase
+              logic as boolean masks) → ctrl (B, 3)
+    physics   mujoco.mj_step on contiguous chunks of envs across a
+              thread pool — mj_step releases the GIL, so the chunks
+              integrate in parallel
+
+Escaped balls freeze their env (no further steps) and are reported
+per env together with hit counts and xy tracking error, so one call
+evaluates many episodes (gain sweeps, training data).
+
+Usage:
+    python batch_rollout.py                            # 64 envs, 拍球
+    python batch_rollout.py --mode up --traj circle --envs 256 --threads 8
+
+Requirements: mujoco, numpy
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+
+from dual_dribble_controller import (BALL_RADIUS, GRAVITY, STRIKE_OFFSET,
+                                     XY_STEER_GAIN, XY_TRACK_MAX, T_SIM,
+                                     TRAJECTORIES, run_simulation)
+from pid_controller import PIDBank
+from sim_log import SimLog
+import mujoco
+
+
+class BatchDribbleLaw:
+    """DualDribbleController.step for B envs on stacked states.
+
+    Parameters
+    ----------
+    n_envs : int
+    mode : 'down' (拍球) or 'up' (颠球), shared by the batch
+    trajectory : str or list of str — per-env xy trajectory names
+    dt : float — control timestep
+    gains : dict or None — as DualDribbleController, values scalar or
+        (B,) arrays
+    """
+
+    def __init__(self, n_envs, mode='down', trajectory='stationary',
+                 dt=0.002, gains=None):
+        self.n = n_envs
+        self.mode = mode
+        self.dt = dt
+        names = ([trajectory] * n_envs if isinstance(trajectory, str)
+                 else list(trajectory))
+        self._traj_groups = {name: np.flatnonzero(np.array(names) == name)
+                             for name in set(names)}
+
+        gains = dict(gains or {})
+        self.strike_offset = np.broadcast_to(
+            gains.get('STRIKE_OFFSET', STRIKE_OFFSET), (n_envs,))
+        self.xy_steer_gain = np.broadcast_to(
+            gains.get('XY_STEER_GAIN', XY_STEER_GAIN), (n_envs,))
+        self.xy_track_max = np.broadcast_to(
+            gains.get('XY_TRACK_MAX', XY_TRACK_MAX), (n_envs,))
+
+        if mode == 'down':
+            self.hand_z_wait = 0.55
+            self.paddle_rest_pos = np.array([0.0, 0.0, 0.8])
+        else:
+            self.hand_z_wait = 0.05
+            self.paddle_rest_pos = np.array([0.0, 0.0, 0.15])
+
+        self.rho_alpha = 0.5    # KinematicRhoFilter(alpha=0.5)
+        self.epsilon = 1.0
+        self.rho_pid = PIDBank(n_envs, Kp=gains.get('Kp', 2.0),
+                               Ki=gains.get('Ki', 0.1),
+                               Kd=gains.get('Kd', 0.05), sat=5.0,
+                               horizon=2.0, log=False)
+        self.reset()
+
+    def reset(self):
+        self.prev_vz = np.zeros(self.n)
+        self.rho_smooth = np.zeros(self.n)
+        self.rho_pid.reset()
+
+    def trajectory_xy(self, t):
+        """Per-env trajectory targets (B, 2) at time t."""
+        xy = np.empty((self.n, 2))
+        for name, idx in self._traj_groups.items():
+            xy[idx] = TRAJECTORIES.get(name, TRAJECTORIES['stationary'])(t)
+        return xy
+
+    def step(self, t, ball_p, ball_v):
+        """One control step.
+
+        Parameters
+        ----------
+        t : float
+        ball_p, ball_v : (B, 3) arrays — ball position and velocity
+
+        Returns
+        -------
+        ctrl : (B, 3) — actuator targets (offsets from paddle rest)
+        arc_type : (B,) int — 1 on bang arcs
+        traj_xy : (B, 2) — trajectory targets
+        """
+        z, vz = ball_p[:, 2], ball_v[:, 2]
+
+        # ── Kinematic ρ and its filter ──
+        rho_raw = (np.abs((vz - self.prev_vz) / self.dt / GRAVITY + 1.0)
+                   if self.dt >= 1e-12 else np.zeros(self.n))
+        self.rho_smooth = (self.rho_alpha * rho_raw
+                           + (1 - self.rho_alpha) * self.rho_smooth)
+        self.prev_vz = vz.copy()
+        self.rho_pid.step(self.rho_smooth - self.epsilon, self.dt)
+
+        in_contact = self.rho_smooth > 1.5
+
+        # ── Trajectory target and clamped xy blend ──
+        traj_xy = self.trajectory_xy(t)
+        xy_error = traj_xy - ball_p[:, :2]
+        corr_norm = np.linalg.norm(xy_error, axis=1)
+        scale = np.where(corr_norm > self.xy_track_max,
+                         self.xy_track_max / np.maximum(corr_norm, 1e-300),
+                         1.0)
+        blended_xy = ball_p[:, :2] + xy_error * scale[:, None]
+        strike_xy = ball_p[:, :2] + self.xy_steer_gain[:, None] * xy_error
+
+        # ── Phase masks ──
+        if self.mode == 'down':
+            near_turn = (vz > 0.05) & (vz < 0.8)
+            boundary = z - BALL_RADIUS < 0.10
+            bang = in_contact & ~boundary
+            pre = ~bang & near_turn & (z > 0.20) & ~boundary
+            z_bang = z - self.strike_offset
+            z_pre = z + BALL_RADIUS + 0.02
+        else:
+            low = z < 0.35
+            bang = in_contact & low
+            pre = ~bang & (vz < -0.05) & low
+            z_bang = z + self.strike_offset
+            z_pre = z - BALL_RADIUS - 0.02
+
+        target = np.empty((self.n, 3))
+        target[:, :2] = np.where(bang[:, None], strike_xy, blended_xy)
+        target[:, 2] = np.where(bang, z_bang,
+                                np.where(pre, z_pre, self.hand_z_wait))
+        return target - self.paddle_rest_pos, bang.astype(int), traj_xy
+
+
+class BatchRollout:
+    """B dribble episodes of one model, stepped across threads.
+
+    Parameters
+    ----------
+    mode : 'down' or 'up'
+    n_envs : int
+    trajectory : str or list of str
+    gains : dict or None — scalar or (B,) per-env values
+    n_threads : int or None — None → os.cpu_count(), 1 → no pool
+    """
+
+    def __init__(self, mode='down', n_envs=64, trajectory='stationary',
+                 gains=None, n_threads=None):
+        xml_path = os.path.join(_CODE_DIR, f'dribble_{mode}.xml')
+        self.model = mujoco.MjModel.from_xml_path(xml_path)
+        self.mode = mode
+        self.n = n_envs
+        self.data = [mujoco.MjData(self.model) for _ in range(n_envs)]
+        self.dt = self.model.opt.timestep
+        self.law = BatchDribbleLaw(n_envs, mode, trajectory, self.dt, gains)
+
+        def adr(name):
+            sid = mujoco.mj_name2id(self.model, mujoco.mjtObj.mjOBJ_SENSOR,
+                                    name)
+            return self.model.sensor_adr[sid]
+        self._sensor_idx = np.concatenate([
+            adr(name) + np.arange(3)
+            for name in ('ball_pos', 'ball_vel', 'paddle_pos')])
+
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        self.n_threads = max(1, min(n_threads, n_envs))
+
+    def reset(self, ball_xy=None):
+        """Reset every env; ball_xy (B, 2) offsets the initial ball."""
+        z0 = 0.4 if self.mode == 'down' else 0.5
+        ball_xy = np.zeros((self.n, 2)) if ball_xy is None else ball_xy
+        for d, xy in zip(self.data, ball_xy):
+            mujoco.mj_resetData(self.model, d)
+            d.qpos[0:3] = [xy[0], xy[1], z0]
+            d.qpos[3] = 1.0
+        self.law.reset()
+
+    def sensors(self):
+        """Stacked ball pos, ball vel, paddle pos, each (B, 3)."""
+        S = np.stack([d.sensordata[self._sensor_idx] for d in self.data])
+        return S[:, 0:3], S[:, 3:6], S[:, 6:9]
+
+    def _step_chunk(self, idx):
+        for i in idx:
+            mujoco.mj_step(self.model, self.data[i])
+
+    def run(self, t_sim=T_SIM, ball_xy=None, log_every=0):
+        """Run all episodes to t_sim (or escape).
+
+        Parameters
+        ----------
+        t_sim : float
+        ball_xy : (B, 2) or None — initial ball offsets
+        log_every : int — keep every k-th step in result['log']
+            (0 = no per-step log)
+
+        Returns
+        -------
+        result : dict — hits (B,), xy_err (B,) mean tracking error,
+                 escaped (B,) bool, t_end (B,), steps, elapsed, and
+                 log (SimLog of (B, ...) rows) if log_every
+        """
+        self.reset(ball_xy)
+        n_steps = int(t_sim / self.dt)
+        active = np.ones(self.n, dtype=bool)
+        hits = np.zeros(self.n, dtype=int)
+        was_contact = np.zeros(self.n, dtype=bool)
+        xy_sum = np.zeros(self.n)
+        n_active = np.zeros(self.n, dtype=int)
+        t_end = np.full(self.n, (n_steps - 1) * self.dt)
+        log = (SimLog(capacity=n_steps // log_every + 1, every=log_every)
+               if log_every else None)
+
+        pool = (ThreadPoolExecutor(max_workers=self.n_threads)
+                if self.n_threads > 1 else None)
+        t0 = time.perf_counter()
+        try:
+            for step_i in range(n_steps):
+                t = step_i * self.dt
+                ball_p, ball_v, paddle_p = self.sensors()
+
+                # Escape checks on the state after the previous step
+                if step_i:
+                    escaped = active & ((ball_p[:, 2] < -0.1)
+                                        | (ball_p[:, 2] > 5.0)
+                                        | np.any(np.abs(ball_p[:, :2]) > 3,
+                                                 axis=1))
+                    t_end[escaped] = t - self.dt
+                    active &= ~escaped
+                    if not active.any():
+                        break
+
+                ctrl, arc_type, traj_xy = self.law.step(t, ball_p, ball_v)
+                for i in np.flatnonzero(active):
+                    self.data[i].ctrl[:] = ctrl[i]
+
+                contact = self.law.rho_smooth > 1.5
+                hits += active & contact & ~was_contact
+                was_contact = contact
+                xy_sum += active * np.linalg.norm(traj_xy - ball_p[:, :2],
+                                                  axis=1)
+                n_active += active
+                if log is not None:
+                    log.append(time=t, ball_pos=ball_p,
+                               paddle_z=paddle_p[:, 2],
+                               rho_smooth=self.law.rho_smooth,
+                               arc_type=arc_type, control=ctrl,
+                               active=active)
+
+                chunks = np.array_split(np.flatnonzero(active),
+                                        self.n_threads)
+                if pool is None:
+                    self._step_chunk(chunks[0])
+                else:
+                    list(pool.map(self._step_chunk, chunks))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        result = {
+            'hits': hits,
+            'xy_err': xy_sum / np.maximum(n_active, 1),
+            'escaped': ~active,
+            't_end': t_end,
+            'steps': int(n_active.sum()),
+            'elapsed': time.perf_counter() - t0,
+        }
+        if log is not None:
+            result['log'] = log
+        return result
+
+
+# ══════════════════════════════════════════════════════════════
+# Main
+# ══════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Batched multithreaded dribble rollouts')
+    parser.add_argument('--mode', choices=['down', 'up'], default='down')
+    parser.add_argument('--traj', choices=list(TRAJECTORIES),
+                        default='stationary')
+    parser.add_argument('--envs', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Stepping threads (default: all cores)')
+    parser.add_argument('--t-sim', type=float, default=T_SIM)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Batched Dribble Rollouts — GRJL 3.0")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+
+    rng = np.random.default_rng(args.seed)
+    ball_xy = rng.normal(0.0, 0.02, (args.envs, 2))
+    ball_xy[0] = 0.0
+
+    batch = BatchRollout(args.mode, args.envs, args.traj,
+                         n_threads=args.threads)
+    res = batch.run(args.t_sim, ball_xy)
+    print(f"\n  {args.envs} envs on {batch.n_threads} threads: "
+          f"{res['elapsed']:.2f} s, "
+          f"{args.envs * args.t_sim / res['elapsed']:.1f} sim-s/s")
+    print(f"    hits      = {res['hits'].mean():.1f} "
+          f"[{res['hits'].min()}, {res['hits'].max()}]")
+    print(f"    xy error  = {res['xy_err'].mean():.3f} m")
+    print(f"    escaped   = {res['escaped'].sum()}/{args.envs}")
+
+    t0 = time.perf_counter()
+    _, hits = run_simulation(args.mode, args.traj, headless=True,
+                             t_sim=args.t_sim, verbose=False)
+    elapsed = time.perf_counter() - t0
+    print(f"\n  Sequential single episode: {elapsed:.2f} s "
+          f"({args.t_sim / elapsed:.1f} sim-s/s), hits={hits} "
+          f"(batched env 0: {res['hits'][0]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,17 +7,20 @@ Backend 1 (three-body):
 
 Key new panels: PID term decomposition, kinematic ρ vs tidal ρ.
 
+Runs are cached in outputs/run_cache, keyed by the simulator source and
+arguments, so replotting after an unrelated edit takes seconds.
+
 Usage:
     python compare_v2_v3.py              # with plots
     python compare_v2_v3.py --headless   # stats only
+    python compare_v2_v3.py --no-cache   # force fresh runs
+    python compare_v2_v3.py --workers 3  # cache misses in parallel
 """
 
 import argparse
 import os
 import sys
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
 _PARENT = os.path.dirname(_CODE_DIR)
@@ -29,8 +32,13 @@ _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
 
-def run_comparison(headless=False):
-    """Run both 2.0 and 3.0, collect logs, compare."""
+def run_comparison(headless=False, cache_dir=None, n_workers=1):
+    """Run both 2.0 and 3.0, collect logs, compare.
+
+    cache_dir : str or None — RunCache directory (None: always simulate)
+    n_workers : int or None — processes for the uncached runs
+    """
+    from grjl_core.run_cache import RunCache
 
     # ── Import both versions ──
     from grjl2.threebody_rho import simulate_reactive as sim_v2
@@ -41,17 +49,16 @@ def run_comparison(headless=False):
     print("  顿开金绳，扯断玉锁")
     print("=" * 60)
 
-    # ── Run 2.0 ──
-    print("\n[1/3] Running GRJL 2.0 (tidal ρ + threshold)...")
-    log_v2 = sim_v2(use_damper=True, headless=True)
-
-    # ── Run 3.0 ──
-    print("[2/3] Running GRJL 3.0 (kinematic ρ + PID)...")
-    log_v3 = sim_v3(use_damper=True, headless=True)
-
-    # ── Run no-damper baseline ──
-    print("[3/3] Running baseline (no damper)...")
-    log_nd = sim_v2(use_damper=False, headless=True)
+    # ── Run 2.0, 3.0 and the no-damper baseline ──
+    print("\n  2.0 (tidal ρ + threshold), 3.0 (kinematic ρ + PID), "
+          "baseline (no damper)...")
+    cache = RunCache(cache_dir)
+    log_v2, log_v3, log_nd = cache.run_many([
+        (sim_v2, {'use_damper': True, 'headless': True}),
+        (sim_v3, {'use_damper': True, 'headless': True}),
+        (sim_v2, {'use_damper': False, 'headless': True}),
+    ], n_workers=n_workers)
+    print(f"  {cache.hits} cached, {cache.misses} simulated")
 
     # ── Statistics ──
     def stats(log, label):
@@ -102,6 +109,8 @@ def run_comparison(headless=False):
 
 def plot_comparison(log_v2, log_v3, log_nd):
     """5-panel comparison plot."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(5, 1, figsize=(12, 16), sharex=True)
 
     t2 = log_v2['time']
@@ -144,7 +153,7 @@ def plot_comparison(log_v2, log_v3, log_nd):
     pid_P = log_v3.get('pid_P', [])
     pid_I = log_v3.get('pid_I', [])
     pid_D = log_v3.get('pid_D', [])
-    if pid_P:
+    if len(pid_P):
         ax.plot(t3, pid_P, 'r-', linewidth=0.8, alpha=0.8,
                 label='P (spectral kick)')
         ax.plot(t3, pid_I, 'g-', linewidth=0.8, alpha=0.8,
@@ -178,12 +187,22 @@ def main():
         description='Compare GRJL 2.0 vs 3.0')
     parser.add_argument('--headless', action='store_true',
                         help='No plots')
+    parser.add_argument('--cache', default=os.path.join(
+        _OUTPUT_DIR, 'run_cache'), help='Run cache directory')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore and do not write the run cache')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes for uncached runs (0: all cores)')
     args = parser.parse_args()
 
+    import matplotlib
     if args.headless:
         matplotlib.use('Agg')
 
-    log_v2, log_v3, log_nd = run_comparison(headless=args.headless)
+    log_v2, log_v3, log_nd = run_comparison(
+        headless=args.headless,
+        cache_dir=None if args.no_cache else args.cache,
+        n_workers=args.workers or None)
 
     if not args.headless:
         plot_comparison(log_v2, log_v3, log_nd)
@@ -43,7 +43,7 @@ os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
 from kinematic_rho import kinematic_rho_dribble, KinematicRhoFilter
 from pid_controller import SpectralPID, DribblePID
-import mujoco
+from sim_log import SimLog
 
 
 # ── Scene parameters ───────────────────────────────────────
@@ -95,9 +95,14 @@ class DualDribbleController:
 
     Everything else — ρ computation, PID law, bang/singular switching —
     is identical.
+
+    gains overrides the tunable constants (see autotune.py): 'Kp', 'Ki',
+    'Kd' of the outer ρ-PID and 'STRIKE_OFFSET', 'XY_STEER_GAIN',
+    'XY_TRACK_MAX'.
     """
 
-    def __init__(self, model, data, mode='down', trajectory='stationary'):
+    def __init__(self, model, data, mode='down', trajectory='stationary',
+                 log_every=1, gains=None):
         self.model = model
         self.data = data
         self.dt = model.opt.timestep
@@ -106,6 +111,11 @@ class DualDribbleController:
         self.traj_fn = TRAJECTORIES.get(trajectory, traj_stationary)
         self.traj_name = trajectory
 
+        gains = dict(gains or {})
+        self.strike_offset = gains.get('STRIKE_OFFSET', STRIKE_OFFSET)
+        self.xy_steer_gain = gains.get('XY_STEER_GAIN', XY_STEER_GAIN)
+        self.xy_track_max = gains.get('XY_TRACK_MAX', XY_TRACK_MAX)
+
         # Mode-specific rest positions
         if mode == 'down':
             self.paddle_rest_z = 0.8    # XML paddle_base pos
@@ -128,33 +138,20 @@ class DualDribbleController:
         # PID controllers
         # Outer: ρ-based (decides when to strike)
         self.rho_pid = SpectralPID(
-            Kp=2.0, Ki=0.1, Kd=0.05,
+            Kp=gains.get('Kp', 2.0), Ki=gains.get('Ki', 0.1),
+            Kd=gains.get('Kd', 0.05),
             epsilon=1.0, horizon=2.0, sat=5.0)
 
         # Inner: position tracking (decides where to go)
         self.pos_pid = DribblePID(
             Kp=10.0, Ki=0.5, Kd=2.0, sat=None)
 
-        # Logging
-        self.log = {
-            'time': [],
-            'ball_z': [],
-            'ball_x': [],
-            'ball_y': [],
-            'traj_x': [],
-            'traj_y': [],
-            'paddle_z': [],
-            'rho_raw': [],
-            'rho_smooth': [],
-            'control_z': [],
-            'arc_type': [],
-            'sdf': [],
-            'pid_P': [],
-            'pid_I': [],
-            'pid_D': [],
-        }
+        # Logging (one row per step, every `log_every`-th kept)
+        self.log = SimLog(capacity=4096, every=log_every)
 
     def _sensor_adr(self, name):
+        import mujoco
+
         sid = mujoco.mj_name2id(
             self.model, mujoco.mjtObj.mjOBJ_SENSOR, name)
         return self.model.sensor_adr[sid]
@@ -269,8 +266,8 @@ class DualDribbleController:
         #   This ensures the hand is always under/over the ball for the next catch.
         xy_correction = xy_error.copy()
         corr_norm = norm(xy_correction)
-        if corr_norm > XY_TRACK_MAX:
-            xy_correction = xy_correction * (XY_TRACK_MAX / corr_norm)
+        if corr_norm > self.xy_track_max:
+            xy_correction = xy_correction * (self.xy_track_max / corr_norm)
         blended_xy = ball_p[:2] + xy_correction
 
         if self.mode == 'down':
@@ -279,9 +276,9 @@ class DualDribbleController:
                 # (III) BANG: hand strikes down.
                 # Offset paddle xy slightly toward trajectory — this nudges
                 # the ball toward the desired path at each bounce.
-                target_world[0] = ball_p[0] + XY_STEER_GAIN * xy_error[0]
-                target_world[1] = ball_p[1] + XY_STEER_GAIN * xy_error[1]
-                target_world[2] = ball_z - STRIKE_OFFSET
+                target_world[0] = ball_p[0] + self.xy_steer_gain * xy_error[0]
+                target_world[1] = ball_p[1] + self.xy_steer_gain * xy_error[1]
+                target_world[2] = ball_z - self.strike_offset
                 arc_type = 1
             elif near_turn and (ball_z > 0.20) and not ball_near_boundary:
                 # PRE-STRIKE: hand lowers to meet ball, blending toward traj.
@@ -303,9 +300,9 @@ class DualDribbleController:
 
             if in_contact and ball_low:
                 # (III) BANG: hand strikes upward, nudging ball toward traj.
-                target_world[0] = ball_p[0] + XY_STEER_GAIN * xy_error[0]
-                target_world[1] = ball_p[1] + XY_STEER_GAIN * xy_error[1]
-                target_world[2] = ball_z + STRIKE_OFFSET
+                target_world[0] = ball_p[0] + self.xy_steer_gain * xy_error[0]
+                target_world[1] = ball_p[1] + self.xy_steer_gain * xy_error[1]
+                target_world[2] = ball_z + self.strike_offset
                 arc_type = 1
             elif ball_descending and ball_low:
                 # PRE-STRIKE: hand below ball, blending toward traj.
@@ -325,33 +322,43 @@ class DualDribbleController:
         self.data.ctrl[:] = ctrl
 
         # ── Log ──
-        self.log['time'].append(t)
-        self.log['ball_z'].append(ball_z)
-        self.log['ball_x'].append(ball_p[0])
-        self.log['ball_y'].append(ball_p[1])
-        self.log['traj_x'].append(traj_xy[0])
-        self.log['traj_y'].append(traj_xy[1])
-        self.log['paddle_z'].append(paddle_p[2])
-        self.log['rho_raw'].append(rho_raw)
-        self.log['rho_smooth'].append(rho_smooth)
-        self.log['control_z'].append(ctrl[2])
-        self.log['arc_type'].append(arc_type)
-        self.log['sdf'].append(sdf)
-
-        if self.rho_pid.log['P']:
-            self.log['pid_P'].append(self.rho_pid.log['P'][-1])
-            self.log['pid_I'].append(self.rho_pid.log['I'][-1])
-            self.log['pid_D'].append(self.rho_pid.log['D'][-1])
+        pid_log = self.rho_pid.log
+        if pid_log.n_rows:
+            pid_P, pid_I, pid_D = (pid_log[k][-1] for k in ('P', 'I', 'D'))
         else:
-            self.log['pid_P'].append(0.0)
-            self.log['pid_I'].append(0.0)
-            self.log['pid_D'].append(0.0)
+            pid_P = pid_I = pid_D = 0.0
+
+        self.log.append(
+            time=t, ball_z=ball_z, ball_x=ball_p[0], ball_y=ball_p[1],
+            traj_x=traj_xy[0], traj_y=traj_xy[1], paddle_z=paddle_p[2],
+            rho_raw=rho_raw, rho_smooth=rho_smooth, control_z=ctrl[2],
+            arc_type=arc_type, sdf=sdf, pid_P=pid_P, pid_I=pid_I,
+            pid_D=pid_D)
 
 
 # ── Simulation ────────────────────────────────────────────
 
-def run_simulation(mode='down', trajectory='stationary', headless=False):
-    """Run dribble simulation in specified mode with trajectory tracking."""
+def run_simulation(mode='down', trajectory='stationary', headless=False,
+                   gains=None, t_sim=T_SIM, ball_xy=(0.0, 0.0),
+                   verbose=True):
+    """Run dribble simulation in specified mode with trajectory tracking.
+
+    Parameters
+    ----------
+    mode, trajectory : as DualDribbleController
+    headless : bool — run without the viewer
+    gains : dict or None — controller overrides (DualDribbleController)
+    t_sim : float — episode length (s)
+    ball_xy : (2,) — initial ball xy offset
+    verbose : bool — print the banner, escapes and statistics
+
+    Returns
+    -------
+    log : SimLog — per-step columns plus scalar 'escape' ('' if none)
+    hit_count : int
+    """
+    import mujoco
+
     if mode == 'down':
         xml_path = os.path.join(_CODE_DIR, 'dribble_down.xml')
     else:
@@ -363,18 +370,18 @@ def run_simulation(mode='down', trajectory='stationary', headless=False):
 
     if mode == 'down':
         # Ball at z=0.4, hand at z=0.8 (from XML)
-        data.qpos[0:3] = [0.0, 0.0, 0.4]
+        data.qpos[0:3] = [ball_xy[0], ball_xy[1], 0.4]
         data.qpos[3] = 1.0  # quaternion w
     else:
         # Ball at z=0.5, hand at z=0.15 (from XML)
-        data.qpos[0:3] = [0.0, 0.0, 0.5]
+        data.qpos[0:3] = [ball_xy[0], ball_xy[1], 0.5]
         data.qpos[3] = 1.0
 
     controller = DualDribbleController(model, data, mode=mode,
-                                        trajectory=trajectory)
+                                        trajectory=trajectory, gains=gains)
 
     dt = model.opt.timestep
-    n_steps = int(T_SIM / dt)
+    n_steps = int(t_sim / dt)
 
     mode_name = '拍球' if mode == 'down' else '颠球'
 
@@ -387,16 +394,18 @@ def run_simulation(mode='down', trajectory='stationary', headless=False):
             print("No viewer available, running headless.")
             headless = True
 
-    print("=" * 60)
-    print(f"  Dual Dribble Controller ({mode_name}) — GRJL 3.0")
-    print(f"  Mode: {mode} | Sign: {controller.sign} | "
-          f"Trajectory: {trajectory}")
-    print(f"  Force eliminated — kinematic ρ only")
-    print("=" * 60)
+    if verbose:
+        print("=" * 60)
+        print(f"  Dual Dribble Controller ({mode_name}) — GRJL 3.0")
+        print(f"  Mode: {mode} | Sign: {controller.sign} | "
+              f"Trajectory: {trajectory}")
+        print(f"  Force eliminated — kinematic ρ only")
+        print("=" * 60)
 
     # ── Main loop ──
     hit_count = 0
     was_in_contact = False
+    escape = ''
 
     for step_i in range(n_steps):
         t = step_i * dt
@@ -415,13 +424,15 @@ def run_simulation(mode='down', trajectory='stationary', headless=False):
         # Escape checks
         ball_z = controller.ball_pos[2]
         if ball_z < -0.1:
-            print(f"Ball fell through at t={t:.2f}")
-            break
-        if ball_z > 5.0:
-            print(f"Ball escaped upward at t={t:.2f}")
-            break
-        if abs(controller.ball_pos[0]) > 3 or abs(controller.ball_pos[1]) > 3:
-            print(f"Ball escaped laterally at t={t:.2f}")
+            escape = 'fell through'
+        elif ball_z > 5.0:
+            escape = 'escaped upward'
+        elif abs(controller.ball_pos[0]) > 3 or \
+                abs(controller.ball_pos[1]) > 3:
+            escape = 'escaped laterally'
+        if escape:
+            if verbose:
+                print(f"Ball {escape} at t={t:.2f}")
             break
 
     if viewer is not None:
@@ -429,6 +440,9 @@ def run_simulation(mode='down', trajectory='stationary', headless=False):
 
     # ── Statistics ──
     log = controller.log
+    log['escape'] = escape
+    if not verbose:
+        return log, hit_count
     rho_arr = np.array(log['rho_smooth'])
     arc_arr = np.array(log['arc_type'])
     ball_z_arr = np.array(log['ball_z'])
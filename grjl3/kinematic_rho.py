@@ -5,7 +5,9 @@ Kinematic ρ — GRJL 3.0 (force elimination)
 Force never enters the interface.
 
 Three entry points:
-    kinematic_rho_threebody  — tidal coupling ratio (positions only)
+    kinematic_rho_threebody  — tidal coupling ratio (positions only);
+                               kinematic_rho_threebody_all for all
+                               damper–body pairs at once
     kinematic_rho_dribble    — |q̈_z/g + 1| (velocity differences only)
     kinematic_rho_general    — M(q)q̈ decomposition (any EL system)
 """
@@ -18,7 +20,7 @@ import numpy as np
 def kinematic_rho_threebody(positions, masses, damper_idx, body_idx):
     """ρ from positions only — tidal coupling ratio.
 
-    Identical to tidal_rho() in grjl2/order_parameter.py.
+    Identical to tidal_rho() in grjl_core/order_parameter.py.
     Already force-free: ρ = w_damper / w_natural, where weights
     are gravitational tidal couplings G·m_i·m_j / ||r_ij||³.
 
@@ -57,6 +59,35 @@ def kinematic_rho_threebody(positions, masses, damper_idx, body_idx):
     return rho
 
 
+def kinematic_rho_threebody_all(positions, masses, damper_idx):
+    """kinematic_rho_threebody for every body from one distance matrix.
+
+    Parameters
+    ----------
+    positions : (..., n, 3) array — body positions, optional batch dims
+    masses : (n,) array — body masses
+    damper_idx : int — index of the damper body
+
+    Returns
+    -------
+    rho : (..., n − 1) array — ρ for each body ≠ damper, in index order
+    """
+    q = np.asarray(positions, dtype=float)
+    m = np.asarray(masses, dtype=float)
+    r = q[..., :, None, :] - q[..., None, :, :]
+    d3 = np.maximum(np.sum(r * r, axis=-1) ** 1.5, 1e-12)
+    W = m[:, None] * m[None, :] / d3          # G cancels in the ratio
+
+    bodies = np.array([i for i in range(len(m)) if i != damper_idx])
+    iu, ju = np.triu_indices(len(bodies), k=1)
+    if len(iu):
+        w_natural = W[..., bodies[iu], bodies[ju]].mean(axis=-1)
+    else:
+        w_natural = np.full(q.shape[:-2], 1e-12)
+    w_natural = np.maximum(w_natural, 1e-12)
+    return W[..., damper_idx, bodies] / w_natural[..., None]
+
+
 # ── Dribble (Backend 2) ──────────────────────────────────
 
 def kinematic_rho_dribble(vz, vz_prev, dt, g=9.81):
@@ -1 +0,0 @@
-../grjl2/order_parameter.py
\ No newline at end of file
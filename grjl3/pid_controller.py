@@ -14,10 +14,25 @@ maps to PID with error e(t) = λ₁(t) − ε:
 The MPC rolling horizon is "the rolling of the rolling window":
 the integral accumulates over a finite window H, and H itself
 advances forward in time.
+
+PIDBank steps N such controllers at once on (N, *shape) arrays —
+per-channel gains, saturation, horizons and derivative filters — so a
+batched ensemble makes one call per step instead of N object calls.
 """
 
+import os
+import sys
+
 import numpy as np
 
+_CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _CODE_DIR not in sys.path:
+    sys.path.insert(0, _CODE_DIR)
+
+from sim_log import SimLog
+
+_PID_COLUMNS = ('P', 'I', 'D', 'error', 'output')
+
 
 class SpectralPID:
     """PID controller where error = λ₁ − ε (spectral gap error).
@@ -50,17 +65,14 @@ class SpectralPID:
         self.prev_t = None
 
         # Logging
-        self.log = {
-            'P': [], 'I': [], 'D': [],
-            'error': [], 'output': [],
-        }
+        self.log = SimLog(columns=_PID_COLUMNS)
 
     def reset(self):
         """Reset controller state."""
         self.integral = 0.0
         self.prev_error = 0.0
         self.prev_t = None
-        self.log = {k: [] for k in self.log}
+        self.log = SimLog(columns=_PID_COLUMNS)
 
     def step(self, lambda1, t, dt=None):
         """One PID step.
@@ -110,11 +122,7 @@ class SpectralPID:
             u_mag = np.clip(u_mag, -self.sat, self.sat)
 
         # Log
-        self.log['P'].append(P)
-        self.log['I'].append(I)
-        self.log['D'].append(D)
-        self.log['error'].append(e)
-        self.log['output'].append(u_mag)
+        self.log.append(P=P, I=I, D=D, error=e, output=u_mag)
 
         return u_mag
 
@@ -124,7 +132,7 @@ class SpectralPID:
         0 = singular (coasting, |u| < sat)
         1 = bang (saturated, |u| = sat)
         """
-        if not self.log['output']:
+        if not self.log.n_rows:
             return 0
         u = self.log['output'][-1]
         if self.sat is not None and abs(abs(u) - self.sat) < 1e-6:
@@ -188,6 +196,122 @@ class DribblePID:
         return ctrl
 
 
+class PIDBank:
+    """N independent PID controllers stepped as one array update.
+
+    Controller k sees error e[k] of shape `shape` (() for SpectralPID's
+    λ₁ − ε, (3,) for DribblePID's target − actual).  With horizon=None,
+    deriv_tau=None the bank reproduces N scalar controllers exactly.
+
+    Parameters
+    ----------
+    n : int — number of controllers
+    shape : tuple — shape of one controller's error / output
+    Kp, Ki, Kd : float or array broadcastable to (n, *shape) — gains
+    sat : float, array or None — output saturation |u| ≤ sat
+    horizon : float, array or None — rolling integral window (seconds),
+        integral *= exp(−dt / horizon) each step; None or ≤ 0 disables
+    deriv_tau : float, array or None — time constant of a first-order
+        low-pass on the derivative term; None or 0 = raw difference
+    log : bool — record P, I, D, error, output per step
+    capacity : int — initial log rows (preallocated, see SimLog)
+    """
+
+    def __init__(self, n, shape=(), Kp=5.0, Ki=0.5, Kd=1.0, sat=None,
+                 horizon=None, deriv_tau=None, log=True, capacity=1024):
+        self.n = n
+        self.shape = (n,) + tuple(shape)
+        self.Kp = self._full(Kp)
+        self.Ki = self._full(Ki)
+        self.Kd = self._full(Kd)
+        self.sat = None if sat is None else self._full(sat)
+        self.horizon = None if horizon is None else self._full(horizon)
+        self.deriv_tau = None if deriv_tau is None else self._full(deriv_tau)
+        self._log_capacity = capacity
+        self._logging = log
+        self.reset()
+
+    def _full(self, value):
+        """Broadcast a per-bank, per-controller or per-channel parameter."""
+        value = np.asarray(value, dtype=float)
+        if value.ndim and value.shape[0] == self.n:
+            value = value.reshape(value.shape + (1,) * (
+                len(self.shape) - value.ndim))
+        return np.broadcast_to(value, self.shape).copy()
+
+    def _per_controller(self, value):
+        """Broadcast a scalar or (n,) value against (n, *shape)."""
+        value = np.asarray(value, dtype=float)
+        return value.reshape(value.shape + (1,) * (
+            len(self.shape) - value.ndim)) if value.ndim else value
+
+    def reset(self, idx=None):
+        """Reset all controllers, or only those in idx (keeps the log)."""
+        if idx is None:
+            self.integral = np.zeros(self.shape)
+            self.prev_error = np.zeros(self.shape)
+            self.deriv = np.zeros(self.shape)
+            self.output = np.zeros(self.shape)
+            self.log = (SimLog(capacity=self._log_capacity,
+                               columns=_PID_COLUMNS)
+                        if self._logging else None)
+            return
+        for buf in (self.integral, self.prev_error, self.deriv,
+                    self.output):
+            buf[idx] = 0.0
+
+    def step(self, e, dt):
+        """One PID step of every controller.
+
+        Parameters
+        ----------
+        e : (n, *shape) array — errors
+        dt : float or (n,) array — timesteps
+
+        Returns
+        -------
+        u : (n, *shape) array — saturated outputs
+        """
+        e = np.broadcast_to(np.asarray(e, dtype=float), self.shape)
+        dt = self._per_controller(dt)
+
+        # ── I term: integral with rolling-horizon decay ──
+        self.integral += e * dt
+        if self.horizon is not None:
+            on = self.horizon > 0
+            decay = np.exp(-dt / np.where(on, self.horizon, 1.0))
+            self.integral *= np.where(on, decay, 1.0)
+
+        # ── D term: (filtered) rate of change of error ──
+        valid = dt > 1e-12
+        de = np.where(valid, (e - self.prev_error)
+                      / np.where(valid, dt, 1.0), 0.0)
+        if self.deriv_tau is not None:
+            a = self.deriv_tau / np.maximum(
+                self.deriv_tau + np.where(valid, dt, 0.0), 1e-12)
+            de = a * self.deriv + (1.0 - a) * de
+        self.deriv = de
+        self.prev_error = e.copy()
+
+        P = self.Kp * e
+        I = self.Ki * self.integral
+        D = self.Kd * de
+        u = P + I + D
+        if self.sat is not None:
+            u = np.clip(u, -self.sat, self.sat)
+        self.output = u
+
+        if self.log is not None:
+            self.log.append(P=P, I=I, D=D, error=e, output=u)
+        return u
+
+    def arc_types(self):
+        """Per-channel arc type of the last output (1 = bang, 0 = singular)."""
+        if self.sat is None:
+            return np.zeros(self.shape, dtype=int)
+        return (np.abs(np.abs(self.output) - self.sat) < 1e-6).astype(int)
+
+
 # ── Verification ─────────────────────────────────────────
 
 def verify_pid():
@@ -224,5 +348,43 @@ def verify_pid():
     print(f"    D range: [{D_arr.min():.4f}, {D_arr.max():.4f}]")
 
 
+def verify_pid_bank(n=8, n_steps=200, dt=0.01, seed=0):
+    """PIDBank reproduces n SpectralPID / DribblePID objects."""
+    rng = np.random.default_rng(seed)
+    Kp = rng.uniform(1.0, 5.0, n)
+    sat = rng.uniform(0.5, 2.0, n)
+
+    scalar = [SpectralPID(Kp=Kp[k], Ki=0.5, Kd=1.0, epsilon=0.02,
+                          horizon=1.0, sat=sat[k]) for k in range(n)]
+    bank = PIDBank(n, Kp=Kp, Ki=0.5, Kd=1.0, sat=sat, horizon=1.0,
+                   capacity=n_steps)
+    lam = 0.02 + 0.03 * np.sin(np.linspace(0, 6, n_steps)[:, None]
+                               + rng.uniform(0, 6, n))
+    for i in range(n_steps):
+        u = bank.step(lam[i] - 0.02, dt)
+        u_ref = [pid.step(lam[i, k], i * dt, dt)
+                 for k, pid in enumerate(scalar)]
+    err = max(np.max(np.abs(bank.log['output'][:, k]
+                            - scalar[k].log['output'])) for k in range(n))
+    assert err < 1e-12, f"SpectralPID mismatch {err:.2e}"
+
+    pos = [DribblePID(Kp=10.0, Ki=0.5, Kd=2.0, sat=1.0) for _ in range(n)]
+    pos_bank = PIDBank(n, shape=(3,), Kp=10.0, Ki=0.5, Kd=2.0, sat=1.0,
+                       log=False)
+    target = rng.normal(size=(n_steps, n, 3))
+    actual = rng.normal(size=(n_steps, n, 3))
+    for i in range(n_steps):
+        u = pos_bank.step(target[i] - actual[i], dt)
+        u_ref = np.array([pid.step(target[i, k], actual[i, k], dt)
+                          for k, pid in enumerate(pos)])
+    err_pos = np.max(np.abs(u - u_ref))
+    assert err_pos < 1e-12, f"DribblePID mismatch {err_pos:.2e}"
+
+    print("  PIDBank verification: PASS")
+    print(f"    {n} SpectralPID: max |Δu| = {err:.1e}, "
+          f"{n} DribblePID: max |Δu| = {err_pos:.1e}")
+
+
 if __name__ == '__main__':
     verify_pid()
+    verify_pid_bank()
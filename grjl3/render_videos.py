@@ -6,19 +6,44 @@ Produces:
     outputs/dribble_up.mp4            (颠球, stationary)
     outputs/dribble_down_circle.mp4   (绕圈拍球)
     outputs/dribble_up_circle.mp4     (绕圈颠球)
+
+Each video is a two-stage pipeline: the simulation thread steps physics
+and the controller and hands (qpos, qvel) snapshots at the frame rate
+through a bounded queue to a render thread, which owns the
+mujoco.Renderer, rebuilds the scene on its own MjData and streams every
+frame straight into an incremental imageio writer.  Memory is bounded
+by the queue depth, independent of video length.  The four videos are
+rendered concurrently in separate processes.
+
+Every run also records the full state trajectory next to the video
+(outputs/dribble_*.npz, grjl_core.replay); --replay re-renders from
+those recordings — new cameras, resolution or frame rate — without
+re-simulating.
+
+Usage:
+    python render_videos.py                # all four, one process each
+    python render_videos.py --workers 1    # sequentially, in-process
+    python render_videos.py --replay --fps 60 --width 1280 --height 960
 """
 
+import argparse
 import os
+import queue
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import mujoco
 import imageio
 
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for _p in (_CODE_DIR, _ROOT):
+    if _p not in sys.path:
+        sys.path.insert(0, _p)
 
 from dual_dribble_controller import DualDribbleController
+from grjl_core.replay import TrajectoryRecorder, replay_video
 
 OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -27,6 +52,33 @@ T_SIM = 10.0       # 10 seconds of video
 FPS = 30
 RENDER_W = 640
 RENDER_H = 480
+QUEUE_DEPTH = 8    # frames in flight between simulation and rendering
+
+
+def _render_worker(model, camera, out_path, frames, stop, status):
+    """Consumer: render queued (qpos, qvel) snapshots into the video.
+
+    Runs in its own thread, which also owns the GL context.
+    """
+    try:
+        data = mujoco.MjData(model)
+        renderer = mujoco.Renderer(model, RENDER_H, RENDER_W)
+        try:
+            with imageio.get_writer(out_path, fps=FPS, quality=8) as writer:
+                while True:
+                    item = frames.get()
+                    if item is None:
+                        break
+                    data.qpos[:], data.qvel[:] = item
+                    mujoco.mj_forward(model, data)
+                    renderer.update_scene(data, camera)
+                    writer.append_data(renderer.render())
+                    status['frames'] += 1
+        finally:
+            renderer.close()
+    except BaseException as exc:
+        status['error'] = exc
+        stop.set()
 
 
 def render_mode(mode='down', trajectory='stationary'):
@@ -36,6 +88,7 @@ def render_mode(mode='down', trajectory='stationary'):
     xml_name = f'dribble_{mode}.xml'
     xml_path = os.path.join(_CODE_DIR, xml_name)
     out_path = os.path.join(OUTPUT_DIR, f'dribble_{mode}{suffix}.mp4')
+    rec_path = os.path.join(OUTPUT_DIR, f'dribble_{mode}{suffix}.npz')
 
     print(f"\n  Rendering {mode_name} ({mode}, traj={trajectory})...")
 
@@ -55,87 +108,156 @@ def render_mode(mode='down', trajectory='stationary'):
     controller = DualDribbleController(model, data, mode=mode,
                                         trajectory=trajectory)
 
-    # Renderer
-    renderer = mujoco.Renderer(model, RENDER_H, RENDER_W)
-
-    # Camera — for circle trajectories, pull back and look from above
     camera = mujoco.MjvCamera()
     camera.type = mujoco.mjtCamera.mjCAMERA_FREE
-    if trajectory != 'stationary':
-        camera.lookat[:] = [0.0, 0.0, 0.2]
-        camera.distance = 2.0
-        camera.elevation = -35
-        camera.azimuth = 135
-    else:
-        camera.lookat[:] = [0.0, 0.0, 0.3]
-        camera.distance = 1.5
-        camera.elevation = -20
-        camera.azimuth = 135
+    for key, value in camera_spec(trajectory).items():
+        if key == 'lookat':
+            camera.lookat[:] = value
+        else:
+            setattr(camera, key, value)
+    recorder = TrajectoryRecorder(model)
 
     dt = model.opt.timestep
     n_steps = int(T_SIM / dt)
     render_every = max(1, int(1.0 / (FPS * dt)))
 
-    frames = []
+    # Render thread (consumer), fed through a bounded queue
+    frames = queue.Queue(maxsize=QUEUE_DEPTH)
+    stop = threading.Event()
+    status = {'frames': 0, 'error': None}
+    consumer = threading.Thread(
+        target=_render_worker,
+        args=(model, camera, out_path, frames, stop, status), daemon=True)
+    consumer.start()
+
+    def _emit(item):
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
     hit_count = 0
     was_contact = False
 
-    for step_i in range(n_steps):
-        t = step_i * dt
-        controller.step(t)
-        mujoco.mj_step(model, data)
-
-        # Count contacts via ρ spikes
-        rho = controller.log['rho_smooth'][-1]
-        in_contact = rho > 1.5
-        if in_contact and not was_contact:
-            hit_count += 1
-        was_contact = in_contact
-
-        # Render frame
-        if step_i % render_every == 0:
-            renderer.update_scene(data, camera)
-            frame = renderer.render()
-            frames.append(frame)
-
-        # Escape check
-        ball_z = controller.ball_pos[2]
-        ball_p = controller.ball_pos
-        if ball_z < -0.5 or ball_z > 5.0:
-            print(f"    Ball escaped at t={t:.2f}")
-            break
-        if abs(ball_p[0]) > 3 or abs(ball_p[1]) > 3:
-            print(f"    Ball escaped laterally at t={t:.2f}")
-            break
-
-    renderer.close()
-
-    # Write video
-    imageio.mimwrite(out_path, frames, fps=FPS, quality=8)
+    # Always close the video: the sentinel ends the render thread, which
+    # then finalises the writer even if the simulation raised.
+    try:
+        for step_i in range(n_steps):
+            if stop.is_set():
+                break
+            t = step_i * dt
+            controller.step(t)
+            mujoco.mj_step(model, data)
+            recorder.record(data)
+
+            # Count contacts via ρ spikes
+            rho = controller.log['rho_smooth'][-1]
+            in_contact = rho > 1.5
+            if in_contact and not was_contact:
+                hit_count += 1
+            was_contact = in_contact
+
+            # Hand a snapshot to the render thread
+            if step_i % render_every == 0:
+                _emit((data.qpos.copy(), data.qvel.copy()))
+
+            # Escape check
+            ball_z = controller.ball_pos[2]
+            ball_p = controller.ball_pos
+            if ball_z < -0.5 or ball_z > 5.0:
+                print(f"    Ball escaped at t={t:.2f}")
+                break
+            if abs(ball_p[0]) > 3 or abs(ball_p[1]) > 3:
+                print(f"    Ball escaped laterally at t={t:.2f}")
+                break
+    finally:
+        _emit(None)
+        consumer.join()
+    if status['error'] is not None:
+        raise status['error']
+    recorder.save(rec_path, xml_path=xml_path, mode=mode,
+                  trajectory=trajectory)
+
+    n_frames = status['frames']
     print(f"  Saved {out_path}")
-    print(f"    Duration: {len(frames)/FPS:.1f}s, {len(frames)} frames")
+    print(f"    Duration: {n_frames/FPS:.1f}s, {n_frames} frames")
     print(f"    Hits: {hit_count}")
 
     return out_path
 
 
+def camera_spec(trajectory):
+    """Free camera; for circle trajectories pull back, look from above."""
+    if trajectory != 'stationary':
+        return {'lookat': [0.0, 0.0, 0.2], 'distance': 2.0,
+                'elevation': -35, 'azimuth': 135}
+    return {'lookat': [0.0, 0.0, 0.3], 'distance': 1.5,
+            'elevation': -20, 'azimuth': 135}
+
+
+def replay_mode(mode='down', trajectory='stationary', cameras=None,
+                fps=FPS, width=RENDER_W, height=RENDER_H, n_workers=None):
+    """Re-render a recorded run (render_mode) without re-simulating.
+
+    cameras : list of camera specs (grjl_core.replay.make_camera); the
+        default is the render_mode camera.  Camera k > 0 is written to
+        ..._cam{k}.mp4.
+    """
+    suffix = f'_{trajectory}' if trajectory != 'stationary' else ''
+    base = os.path.join(OUTPUT_DIR, f'dribble_{mode}{suffix}')
+    cameras = cameras or [camera_spec(trajectory)]
+    out_paths = [f'{base}.mp4' if k == 0 else f'{base}_cam{k}.mp4'
+                 for k in range(len(cameras))]
+    n_frames = replay_video(f'{base}.npz', out_paths, cameras, fps=fps,
+                            width=width, height=height, n_workers=n_workers)
+    print(f"  Replayed {base}.npz → {n_frames} frames × "
+          f"{len(cameras)} camera(s) at {fps} fps")
+    return out_paths[0]
+
+
+def _render_task(args):
+    """Worker: render one (mode, trajectory) video."""
+    return render_mode(*args)
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description='Render the GRJL 3.0 dribble videos')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Render processes (default: one per video, '
+                             'at most the core count); 1 = in-process')
+    parser.add_argument('--replay', action='store_true',
+                        help='Render from the recorded .npz trajectories')
+    parser.add_argument('--fps', type=int, default=FPS)
+    parser.add_argument('--width', type=int, default=RENDER_W)
+    parser.add_argument('--height', type=int, default=RENDER_H)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("  GRJL 3.0 — Video Rendering")
     print("  顿开金绳，扯断玉锁")
     print("=" * 60)
 
-    paths = []
-
-    # Stationary dribbles
-    paths.append(render_mode('down', 'stationary'))
-    paths.append(render_mode('up', 'stationary'))
+    # Stationary and circle-trajectory dribbles
+    tasks = [('down', 'stationary'), ('up', 'stationary'),
+             ('down', 'circle'), ('up', 'circle')]
 
-    # Circle trajectory dribbles
-    paths.append(render_mode('down', 'circle'))
-    paths.append(render_mode('up', 'circle'))
+    if args.replay:
+        # Replay parallelises over frame ranges within each video
+        paths = [replay_mode(mode, traj, fps=args.fps, width=args.width,
+                             height=args.height, n_workers=args.workers)
+                 for mode, traj in tasks]
+    else:
+        n_workers = args.workers or min(len(tasks), os.cpu_count() or 1)
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                paths = list(pool.map(_render_task, tasks))
+        else:
+            paths = [_render_task(task) for task in tasks]
 
-    print(f"\n  Videos saved to:")
+    print("\n  Videos saved to:")
     for p in paths:
         print(f"    {p}")
 
@@ -1 +0,0 @@
-../grjl/spectral_analytical.py
\ No newline at end of file
@@ -24,19 +24,21 @@ import os
 import sys
 import numpy as np
 from numpy.linalg import eigvalsh, norm
-import matplotlib
-import matplotlib.pyplot as plt
 
 # Ensure sibling modules are importable
 _CODE_DIR = os.path.dirname(os.path.abspath(__file__))
-if _CODE_DIR not in sys.path:
-    sys.path.insert(0, _CODE_DIR)
+_ROOT = os.path.dirname(_CODE_DIR)
+for p in (_CODE_DIR, _ROOT):
+    if p not in sys.path:
+        sys.path.insert(0, p)
 _OUTPUT_DIR = os.path.join(_CODE_DIR, 'outputs')
 os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
-from kinematic_rho import kinematic_rho_threebody
+from kinematic_rho import kinematic_rho_threebody_all
 from pid_controller import SpectralPID
-from order_parameter import (smooth_edge_weight, build_laplacian_from_rho)
+from sim_log import SimLog
+from grjl_core.order_parameter import (smooth_edge_weight,
+                                       build_laplacian_from_rho)
 
 
 # ── Physical constants ──────────────────────────────────────
@@ -91,16 +93,11 @@ def compute_rho_pairs_kinematic(positions, masses, damper_idx=3):
     No force computation.  ρ is the tidal coupling ratio:
     w_damper-body / w_body-body_avg.
     """
-    rho_pairs = {}
-    for j in range(len(masses)):
-        if j == damper_idx:
-            continue
-        rho = kinematic_rho_threebody(
-            np.array(positions), np.array(masses), damper_idx, j)
-        i_pair = min(damper_idx, j)
-        j_pair = max(damper_idx, j)
-        rho_pairs[(i_pair, j_pair)] = rho
-    return rho_pairs
+    bodies = [j for j in range(len(masses)) if j != damper_idx]
+    rho = kinematic_rho_threebody_all(np.array(positions), np.array(masses),
+                                      damper_idx)
+    return {(min(damper_idx, j), max(damper_idx, j)): r
+            for j, r in zip(bodies, rho)}
 
 
 def rho_weighted_lambda1(positions, masses, damper_idx=3):
@@ -183,21 +180,8 @@ def simulate_reactive(use_damper=True, headless=False):
         Kp=2.0, Ki=0.2, Kd=0.05,
         epsilon=EPSILON, horizon=2.0, sat=U_MAX)
 
-    log = {
-        'time': [],
-        'lambda1': [],
-        'control_norm': [],
-        'positions': [],
-        'arc_type': [],
-        'total_cost': 0.0,
-        'rho_min': [],
-        'rho_max': [],
-        'edge_weights': [],
-        'pid_P': [],
-        'pid_I': [],
-        'pid_D': [],
-        'pid_error': [],
-    }
+    log = SimLog(capacity=N_STEPS)
+    log['total_cost'] = 0.0
 
     for step in range(N_STEPS):
         t = step * DT
@@ -274,26 +258,19 @@ def simulate_reactive(use_damper=True, headless=False):
         # ── Log ──
         u_norm = norm(u)
         log['total_cost'] += (0.5 * ALPHA * np.dot(u, u)) * DT
-        log['time'].append(t)
-        log['lambda1'].append(lambda1)
-        log['control_norm'].append(u_norm)
-        log['positions'].append([p.copy() for p in positions])
-        log['arc_type'].append(arc_type)
-        log['rho_min'].append(rho_min)
-        log['rho_max'].append(rho_max)
-        log['edge_weights'].append(dict(weights))
 
         # PID term logging
-        if use_damper and pid.log['P']:
-            log['pid_P'].append(pid.log['P'][-1])
-            log['pid_I'].append(pid.log['I'][-1])
-            log['pid_D'].append(pid.log['D'][-1])
-            log['pid_error'].append(pid.log['error'][-1])
+        if use_damper and pid.log.n_rows:
+            pid_P, pid_I, pid_D, pid_error = (
+                pid.log[k][-1] for k in ('P', 'I', 'D', 'error'))
         else:
-            log['pid_P'].append(0.0)
-            log['pid_I'].append(0.0)
-            log['pid_D'].append(0.0)
-            log['pid_error'].append(0.0)
+            pid_P = pid_I = pid_D = pid_error = 0.0
+
+        log.append(time=t, lambda1=lambda1, control_norm=u_norm,
+                   positions=positions, arc_type=arc_type,
+                   rho_min=rho_min, rho_max=rho_max,
+                   edge_weights=dict(weights), pid_P=pid_P, pid_I=pid_I,
+                   pid_D=pid_D, pid_error=pid_error)
 
         # Early exit if escaped
         max_dist = max(norm(positions[i] - positions[j])
@@ -311,6 +288,8 @@ def simulate_reactive(use_damper=True, headless=False):
 
 def plot_results(log, title_suffix=''):
     """4-panel plot: λ₁, ρ, PID terms, control effort."""
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(4, 1, figsize=(10, 12), sharex=True)
     t = log['time']
 
@@ -473,6 +452,7 @@ def main():
                         help='Run verification suite')
     args = parser.parse_args()
 
+    import matplotlib
     if args.headless:
         matplotlib.use('Agg')
 
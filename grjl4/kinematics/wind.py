@@ -38,12 +38,14 @@ class Wind:
     horizontal_only : bool
         If True, wind direction is restricted to the xy-plane.
         Horizontal gusts are the primary destabiliser for stacks.
-    seed : int or None
-        RNG seed for reproducibility.
+    seed : int, SeedSequence, Generator or None
+        RNG seed for reproducibility; a Generator is used as is, so
+        several winds (or a worker's child stream) can share one source.
     """
 
     def __init__(self, F_max: float = 0.0, horizontal_only: bool = True,
-                 seed: int | None = None):
+                 seed: int | np.random.SeedSequence | np.random.Generator
+                 | None = None):
         self.F_max = F_max
         self.horizontal_only = horizontal_only
         self._rng = np.random.default_rng(seed)
@@ -10,8 +10,13 @@ then places the cube at the goal pose and retreats.
 
 Visualises contact points + forces.
 
+The run is also recorded (state per step, grjl_core.replay) to
+assets/visual_reads/pick_place_contacts.npz; --replay re-renders the
+video from that file without re-simulating.
+
 Run from project root:
     python verification/render_pick_place.py
+    python verification/render_pick_place.py --replay
 """
 
 import numpy as np
@@ -22,8 +27,20 @@ from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT.parent))
 
 from kinematics import Wind
+from grjl_core.replay import TrajectoryRecorder, replay_video
+
+XML_PATH = ROOT / 'scene' / 'floating_gripper.xml'
+VIDEO_PATH = ROOT / 'assets' / 'visual_reads' / 'pick_place_contacts.mp4'
+RECORD_PATH = VIDEO_PATH.with_suffix('.npz')
+# qvel/ctrl/xfrc_applied too, so mj_forward reproduces the contact forces
+RECORD_FIELDS = ('qpos', 'qvel', 'ctrl', 'mocap_pos', 'mocap_quat',
+                 'xfrc_applied')
+CAMERA = {'lookat': [0.3, 0.04, 0.06], 'distance': 0.40,
+          'azimuth': -50, 'elevation': -25}
+VIS_FLAGS = ('mjVIS_CONTACTPOINT', 'mjVIS_CONTACTFORCE')
 
 
 def lerp(a, b, t):
@@ -59,7 +76,7 @@ def quat_mul(q1, q2):
 
 
 def main():
-    m = mujoco.MjModel.from_xml_path(str(ROOT / 'scene' / 'floating_gripper.xml'))
+    m = mujoco.MjModel.from_xml_path(str(XML_PATH))
     d = mujoco.MjData(m)
 
     cube_id = mujoco.mj_name2id(m, mujoco.mjtObj.mjOBJ_BODY, "block_cube_0")
@@ -106,14 +123,14 @@ def main():
     renderer = mujoco.Renderer(m, height=H, width=W)
 
     vopt = mujoco.MjvOption()
-    vopt.flags[mujoco.mjtVisFlag.mjVIS_CONTACTPOINT] = True
-    vopt.flags[mujoco.mjtVisFlag.mjVIS_CONTACTFORCE] = True
+    for flag in VIS_FLAGS:
+        vopt.flags[getattr(mujoco.mjtVisFlag, flag)] = True
 
     cam = mujoco.MjvCamera()
-    cam.lookat[:] = [0.3, 0.04, 0.06]
-    cam.distance = 0.40
-    cam.azimuth = -50
-    cam.elevation = -25
+    cam.lookat[:] = CAMERA['lookat']
+    cam.distance = CAMERA['distance']
+    cam.azimuth = CAMERA['azimuth']
+    cam.elevation = CAMERA['elevation']
 
     dt = m.opt.timestep
     N_steps = int(T_total / dt)
@@ -128,6 +145,7 @@ def main():
         mujoco.mj_step(m, d)
 
     frames = []
+    recorder = TrajectoryRecorder(m, fields=RECORD_FIELDS)
     cur_xy = start_xy.copy()
     cur_quat = grip_quat.copy()
 
@@ -195,6 +213,7 @@ def main():
             wind.clear(d, [cube_id])
 
         mujoco.mj_step(m, d)
+        recorder.record(d)
 
         if step % frame_every == 0:
             renderer.update_scene(d, camera=cam, scene_option=vopt)
@@ -205,8 +224,9 @@ def main():
     print(f"Captured {len(frames)} frames at {fps} fps")
 
     # Write MP4 via imageio
-    outpath = str(ROOT / 'assets' / 'visual_reads' / 'pick_place_contacts.mp4')
+    outpath = str(VIDEO_PATH)
     os.makedirs(os.path.dirname(outpath), exist_ok=True)
+    recorder.save(str(RECORD_PATH), xml_path=str(XML_PATH))
     iio.imwrite(outpath, np.stack(frames), fps=fps,
                 codec='libx264', plugin='pyav')
     print(f"Video saved to {outpath}")
@@ -215,6 +235,20 @@ def main():
     _save_keyframes(m, cube_id, cam, vopt)
 
 
+def replay(fps=30, width=960, height=720, cameras=(CAMERA,)):
+    """Re-render the recorded run for any cameras / resolution / fps.
+
+    Camera k > 0 is written to pick_place_contacts_cam{k}.mp4.
+    """
+    outs = [str(VIDEO_PATH) if k == 0 else
+            str(VIDEO_PATH.with_name(f'{VIDEO_PATH.stem}_cam{k}.mp4'))
+            for k in range(len(cameras))]
+    n = replay_video(str(RECORD_PATH), outs, list(cameras),
+                     xml_path=str(XML_PATH), fps=fps, width=width,
+                     height=height, vis_flags=VIS_FLAGS)
+    print(f"Replayed {n} frames from {RECORD_PATH} to {outs}")
+
+
 def _ramp_mocap(m, d, target_pos, target_quat, steps=400):
     """Gradually ramp the mocap target to avoid impulse on the weld."""
     start_pos = d.mocap_pos[0].copy()
@@ -305,4 +339,7 @@ def _save_keyframes(m, cube_id, cam, vopt):
 
 
 if __name__ == "__main__":
-    main()
+    if "--replay" in sys.argv[1:]:
+        replay()
+    else:
+        main()
@@ -0,0 +1,69 @@
+"""
+grjl_core — kernels shared by every GRJL generation
+
+One importable home for the modules grjl, grjl2 and grjl3 used to carry
+as copies or symlinks:
+
+    bspline_trajectory    BSplineTrajectory (cubic B-spline, Step 2a)
+    spectral_analytical   Fiedler eigenvalue gradient (Step 2d)
+    order_parameter       ρ, smooth edge weights, tidal ρ (GRJL 2.0)
+    replay                record MuJoCo states, re-render without re-simulating
+    run_cache             content-addressed cache of simulation logs
+    importtime            import-time check of the simulator entry points
+    rng                   independent random streams for worker pools
+
+The kernels are vectorised over all body pairs and accept leading batch
+dimensions.  The names below are the stable API; submodules are loaded
+on first attribute access, so `import grjl_core` costs nothing beyond
+the package itself (no scipy, matplotlib or mujoco).
+
+The simulators import them as grjl_core.<module>, with the repo root
+on sys.path next to their own directory.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'BSplineTrajectory': 'bspline_trajectory',
+
+    'graph_laplacian_with_eigenvectors': 'spectral_analytical',
+    'spectral_gradient_analytical': 'spectral_analytical',
+    'spectral_gradient_finite_diff': 'spectral_analytical',
+    'verify_gradient': 'spectral_analytical',
+
+    'compute_rho': 'order_parameter',
+    'smooth_edge_weight': 'order_parameter',
+    'd_smooth_edge_weight_d_rho': 'order_parameter',
+    'verify_smooth_weight': 'order_parameter',
+    'build_laplacian_from_rho': 'order_parameter',
+    'laplacian_from_rho_array': 'order_parameter',
+    'tidal_rho': 'order_parameter',
+    'tidal_rho_all': 'order_parameter',
+    'damper_pairs': 'order_parameter',
+
+    'TrajectoryRecorder': 'replay',
+    'load_trajectory': 'replay',
+    'replay_video': 'replay',
+
+    'RunCache': 'run_cache',
+    'source_digest': 'run_cache',
+
+    'seed_sequence': 'rng',
+    'spawn': 'rng',
+    'spawn_generators': 'rng',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
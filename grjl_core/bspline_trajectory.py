@@ -0,0 +1,229 @@
+"""
+B-Spline Trajectory Parameterisation (Step 2a)
+
+Cubic B-spline q(t) = sum_i c_i B_i(t) reduces the infinite-dimensional
+trajectory to R^{3m} control points with C^2 continuity for free.
+
+The coefficients back a single vector-valued scipy BSpline; derivative
+splines are built once per order and cached.  For fixed query times
+(e.g. the control rate of a simulation loop) basis(t) precomputes the
+collocation rows once, after which each evaluation is one small product
+A[k] @ control_points (evaluate_basis).
+
+Fitting solves the least-squares normal equations AᵀA C = AᵀW, whose
+matrix is banded (bandwidth 3) for a cubic basis: the sparse design
+matrix and the banded Cholesky factor are cached per (n_control, N,
+t_span), and all dimensions — and, with fit_many, all waypoint sets —
+share one solve.  The cost ∫‖q̇‖² dt is evaluated exactly as
+Σ_d c_dᵀ G c_d with the Gram matrix G_ij = ∫ Ḃ_i Ḃ_j dt, integrated by
+Gauss–Legendre quadrature on each knot span (exact for the piecewise
+quartic integrand).
+
+scipy.interpolate is imported on first use, so importing this module
+costs only numpy.
+
+Reference: threebody.tex eq 3b-ocp (line 117), OCP definition.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def _clamped_knots(n_control, t0, tf):
+    """Uniform clamped cubic knot vector for n_control control points."""
+    if n_control < 4:
+        raise ValueError(
+            f"Need >= 4 control points for cubic B-spline, got {n_control}")
+    knots_internal = np.linspace(t0, tf, n_control - 2)[1:-1]
+    # Clamped knot vector: k+1 repeats at ends
+    return np.concatenate([np.full(4, t0), knots_internal, np.full(4, tf)])
+
+
+@lru_cache(maxsize=32)
+def _normal_factor(n_control, n_data, t0, tf):
+    """Sparse design matrix A and banded Cholesky factor of AᵀA."""
+    from scipy.interpolate import BSpline
+    from scipy.linalg import cholesky_banded
+
+    t_data = np.linspace(t0, tf, n_data)
+    A = BSpline.design_matrix(t_data, _clamped_knots(n_control, t0, tf), 3)
+    AtA = (A.T @ A).toarray()
+    # Upper banded storage: ab[3 + i − j, j] = AtA[i, j]
+    ab = np.zeros((4, n_control))
+    for k in range(4):
+        ab[3 - k, k:] = np.diagonal(AtA, k)
+    return A.tocsc(), cholesky_banded(ab)
+
+
+@lru_cache(maxsize=32)
+def _gram_matrix(n_control, t0, tf, order):
+    breaks = np.unique(_clamped_knots(n_control, t0, tf))
+    x, w = np.polynomial.legendre.leggauss(4)
+    half = 0.5 * np.diff(breaks)[:, None]
+    t = (half * x + 0.5 * (breaks[:-1] + breaks[1:])[:, None]).ravel()
+    D = BSplineTrajectory.basis_matrix(n_control, t, (t0, tf), order)
+    G = D.T @ ((half * w).ravel()[:, None] * D)
+    G.flags.writeable = False
+    return G
+
+
+class BSplineTrajectory:
+    """Cubic B-spline trajectory in R^3 (or R^n).
+
+    Parameters
+    ----------
+    control_points : (m, d) array
+        Control points c_i in R^d.
+    t_span : (2,) tuple
+        Time interval [t0, tf].
+    """
+
+    def __init__(self, control_points, t_span=(0.0, 1.0)):
+        from scipy.interpolate import BSpline
+
+        self.control_points = np.asarray(control_points, dtype=float)
+        self.m, self.d = self.control_points.shape
+        self.t0, self.tf = t_span
+
+        # Uniform clamped knot vector for cubic (k=3) B-spline
+        self.knots = _clamped_knots(self.m, self.t0, self.tf)
+        self.k = 3  # cubic
+
+        # One vector-valued BSpline over the (m, d) coefficients
+        self._spline = BSpline(self.knots, self.control_points, self.k)
+        self._derivatives = {0: self._spline}
+
+    def _derivative_spline(self, order):
+        """d^n q / dt^n as a BSpline, built once per order."""
+        spline = self._derivatives.get(order)
+        if spline is None:
+            spline = self._spline.derivative(order)
+            self._derivatives[order] = spline
+        return spline
+
+    def evaluate(self, t):
+        """Evaluate q(t) -> (d,) or (len(t), d)."""
+        return self._spline(np.asarray(t, dtype=float))
+
+    def derivative(self, t, order=1):
+        """Evaluate d^n q / dt^n at t."""
+        return self._derivative_spline(order)(np.asarray(t, dtype=float))
+
+    def basis(self, t, order=0):
+        """Collocation rows of this spline at fixed times t.
+
+        basis(t, order) @ control_points == derivative(t, order), so the
+        rows can be computed once and reused with evaluate_basis().
+
+        Returns
+        -------
+        A : (len(t), m) array, or (m,) for scalar t
+        """
+        return self.basis_matrix(self.m, t, (self.t0, self.tf), order)
+
+    def evaluate_basis(self, A):
+        """q (or a derivative) from precomputed basis rows A (..., m)."""
+        return A @ self.control_points
+
+    @classmethod
+    def fit_from_waypoints(cls, waypoints, n_control=None, t_span=(0.0, 1.0)):
+        """Fit a cubic B-spline through waypoints.
+
+        Parameters
+        ----------
+        waypoints : (N, d) array
+            Points to interpolate.
+        n_control : int or None
+            Number of control points. If None (or >= N), uses N, which
+            interpolates the waypoints in the clamped uniform basis.
+        t_span : tuple
+            Time interval.
+
+        Returns
+        -------
+        BSplineTrajectory
+        """
+        waypoints = np.asarray(waypoints, dtype=float)
+        cp = cls.fit_many(waypoints[None], n_control, t_span)[0]
+        return cls(cp, t_span)
+
+    @staticmethod
+    def fit_many(waypoint_sets, n_control=None, t_span=(0.0, 1.0)):
+        """Least-squares control points for a batch of waypoint sets.
+
+        The sets share N and t_span, so one cached banded factorisation
+        of AᵀA serves every set and dimension.
+
+        Parameters
+        ----------
+        waypoint_sets : (B, N, d) array
+            Waypoints at np.linspace(t0, tf, N).
+        n_control : int or None
+            As fit_from_waypoints.
+        t_span : tuple
+            Time interval.
+
+        Returns
+        -------
+        control_points : (B, n_control, d) array
+        """
+        from scipy.linalg import cho_solve_banded
+
+        W = np.asarray(waypoint_sets, dtype=float)
+        B, N, d = W.shape
+        if n_control is None or n_control >= N:
+            n_control = N
+        n_control = max(n_control, 4)
+        A, cb = _normal_factor(n_control, N, float(t_span[0]),
+                               float(t_span[1]))
+        rhs = A.T @ W.transpose(1, 0, 2).reshape(N, B * d)
+        cp = cho_solve_banded((cb, False), rhs)
+        return cp.reshape(n_control, B, d).transpose(1, 0, 2)
+
+    @staticmethod
+    def basis_matrix(n_control, t, t_span=(0.0, 1.0), order=0):
+        """Collocation matrix A[j, i] = B_i(t_j) of the clamped cubic basis.
+
+        With control points C (n_control, d), A @ C evaluates the spline
+        at the times t, so a precomputed A maps control-point
+        perturbations to sampled trajectories by one matrix product.
+
+        Parameters
+        ----------
+        n_control : int
+            Number of control points (>= 4).
+        t : (N,) array
+            Evaluation times in t_span.
+        t_span : tuple
+            Time interval.
+        order : int
+            Derivative order of the basis functions, B_i^(order)(t_j).
+
+        Returns
+        -------
+        A : (N, n_control) array
+        """
+        from scipy.interpolate import BSpline
+
+        knots = _clamped_knots(n_control, *t_span)
+        basis = BSpline(knots, np.eye(n_control), 3)
+        if order:
+            basis = basis.derivative(order)
+        return basis(np.asarray(t, float))
+
+    @staticmethod
+    def gram_matrix(n_control, t_span=(0.0, 1.0), order=1):
+        """Gram matrix G_ij = ∫ B_i^(order) B_j^(order) dt (cached, read-only).
+
+        For control points C (n_control, d), ∫‖d^n q/dt^n‖² dt equals
+        np.sum(C * (G @ C)); batches use np.einsum('bid,ij,bjd->b', ...).
+        """
+        return _gram_matrix(n_control, float(t_span[0]), float(t_span[1]),
+                            order)
+
+    def cost_integral(self):
+        """Compute integral of ||q'(t)||^2 dt (kinetic energy proxy), exactly."""
+        G = self.gram_matrix(self.m, (self.t0, self.tf))
+        C = self.control_points
+        return float(np.sum(C * (G @ C)))
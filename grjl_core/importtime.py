@@ -0,0 +1,110 @@
+"""
+Import-Time Check for the Simulator Entry Points
+
+Headless sweeps and pool workers import a simulator module thousands
+of times over a session; plotting (matplotlib) and rendering (mujoco,
+imageio) must therefore load only inside the functions that draw or
+step a MuJoCo model.  This script imports each entry point in a fresh
+interpreter under `python -X importtime`, reports the cumulative time
+and the slowest imports, and fails if a heavy dependency was pulled in
+or a time budget was exceeded:
+
+    python grjl_core/importtime.py                  # check all
+    python grjl_core/importtime.py --budget-ms 400  # also time budget
+    python grjl_core/importtime.py --top 10
+
+Exit status 1 on any failure, so it can gate CI.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (directory the module is run from, module name)
+ENTRY_POINTS = [
+    ('grjl', 'threebody_damper'),
+    ('grjl', 'manipulation_damper'),
+    ('grjl2', 'threebody_rho'),
+    ('grjl2', 'dribble_controller'),
+    ('grjl3', 'threebody_kinematic'),
+    ('grjl3', 'dual_dribble_controller'),
+    ('grjl3', 'autotune'),
+    ('', 'grjl_core'),
+]
+
+# Top-level packages a headless import must not load
+FORBIDDEN = ('matplotlib', 'mujoco', 'imageio')
+
+
+def import_profile(module, cwd):
+    """Import `module` in a fresh interpreter under -X importtime.
+
+    Returns
+    -------
+    rows : list of (name, self_us, cumulative_us) in import order
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, capture_output=True, text=True)
+    if proc.returncode:
+        raise ImportError(f"import {module} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cum_us)))
+    return rows
+
+
+def check(entry_points=ENTRY_POINTS, budget_ms=None, top=5):
+    """Profile every entry point; returns the list of failure messages."""
+    failures = []
+    for subdir, module in entry_points:
+        rows = import_profile(module, os.path.join(_ROOT, subdir))
+        total_ms = next(c for n, s, c in rows if n == module) / 1e3
+        heavy = sorted({n.split('.')[0] for n, s, c in rows
+                        if n.split('.')[0] in FORBIDDEN})
+        slow = sorted(rows, key=lambda r: -r[1])[:top]
+
+        label = f"{subdir + '/' if subdir else ''}{module}"
+        print(f"  {label:<34} {total_ms:8.1f} ms"
+              + (f"   loads {', '.join(heavy)}" if heavy else ''))
+        for name, self_us, _ in slow:
+            print(f"      {self_us / 1e3:7.1f} ms  {name}")
+
+        if heavy:
+            failures.append(f"{label} imports {', '.join(heavy)}")
+        if budget_ms is not None and total_ms > budget_ms:
+            failures.append(f"{label} takes {total_ms:.0f} ms "
+                            f"(budget {budget_ms:.0f} ms)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import-time check of the simulator entry points')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='Fail if an import takes longer (default: off)')
+    parser.add_argument('--top', type=int, default=5,
+                        help='Slowest imports (self time) to list')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  Import time (python -X importtime)")
+    print("  顿开金绳，扯断玉锁")
+    print("=" * 60)
+
+    failures = check(budget_ms=args.budget_ms, top=args.top)
+    print()
+    for msg in failures:
+        print(f"  FAIL  {msg}")
+    print("  PASS" if not failures else f"  {len(failures)} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,12 @@ Everything in 2.0 is a smooth function of the single scalar:
 Edge weight w(ρ) is a C∞ sigmoid composition with closed-form derivative.
 No discrete MODE_* enums, no if/else chains.
 
+Array kernels: smooth_edge_weight / d_smooth_edge_weight_d_rho act
+elementwise on arrays of any shape; tidal_rho_all returns every
+damper–body ρ at once from one distance matrix and
+laplacian_from_rho_array builds the batched Laplacian and λ₁, all with
+leading batch dimensions (e.g. MPPI samples).
+
 Reference: threebody.tex eq:3b-rho.
 """
 
@@ -39,17 +45,12 @@ def compute_rho(F_repulsion, F_attraction, eps=1e-12):
 
 
 def _sigmoid(x):
-    """Numerically stable logistic sigmoid."""
-    x = np.atleast_1d(np.asarray(x, dtype=float))
-    out = np.empty_like(x)
-    pos = x >= 0
-    neg = ~pos
-    if np.any(pos):
-        out[pos] = 1.0 / (1.0 + np.exp(-x[pos]))
-    if np.any(neg):
-        exp_x = np.exp(x[neg])
-        out[neg] = exp_x / (1.0 + exp_x)
-    return float(out[0]) if out.size == 1 else out
+    """Numerically stable logistic sigmoid, shape-preserving."""
+    x = np.asarray(x, dtype=float)
+    # exp of −|x| never overflows; fold the sign back in
+    e = np.exp(-np.abs(x))
+    out = np.where(x >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+    return float(out) if out.ndim == 0 else out
 
 
 def _sigmoid_deriv(x):
@@ -184,6 +185,38 @@ def build_laplacian_from_rho(rho_pairs, n_bodies, k_n=1.0, k_t=1.0,
     return L, lambda1, weights
 
 
+def laplacian_from_rho_array(rho, pairs, n_bodies, k_n=1.0, k_t=1.0,
+                             mu=0.5, beta=20.0):
+    """Batched build_laplacian_from_rho on pair-indexed ρ arrays.
+
+    Parameters
+    ----------
+    rho : (..., n_pairs) array
+        ρ values in the order of `pairs`.
+    pairs : list of (i, j) tuples
+    n_bodies : int
+    k_n, k_t, mu, beta : float
+
+    Returns
+    -------
+    L : (..., n_bodies, n_bodies) array
+    lambda1 : (...) array
+    weights : (..., n_pairs) array
+    """
+    rho = np.asarray(rho, dtype=float)
+    w = np.asarray(smooth_edge_weight(rho, k_n, k_t, mu, beta))
+    i, j = np.array(pairs).T
+    L = np.zeros(rho.shape[:-1] + (n_bodies, n_bodies))
+    for c in range(len(pairs)):
+        L[..., i[c], i[c]] += w[..., c]
+        L[..., j[c], j[c]] += w[..., c]
+        L[..., i[c], j[c]] -= w[..., c]
+        L[..., j[c], i[c]] -= w[..., c]
+    lambda1 = eigvalsh(L)[..., 1] if n_bodies > 1 \
+        else np.zeros(rho.shape[:-1])
+    return L, lambda1, w
+
+
 # ── Tidal ρ for gravity systems ────────────────────────────
 
 def tidal_rho(positions, masses, damper_idx, body_idx,
@@ -244,6 +277,43 @@ def tidal_rho(positions, masses, damper_idx, body_idx,
     return w_damper / w_natural
 
 
+def damper_pairs(n_bodies, damper_idx):
+    """Pair keys (i < j) of the damper edges, in body order."""
+    return [(min(damper_idx, j), max(damper_idx, j))
+            for j in range(n_bodies) if j != damper_idx]
+
+
+def tidal_rho_all(positions, masses, damper_idx, G=0.5, softening=0.05):
+    """tidal_rho for every damper–body pair from one distance matrix.
+
+    Parameters
+    ----------
+    positions : (..., n, 3) array
+    masses : (n,) array
+    damper_idx : int
+    G, softening : float
+
+    Returns
+    -------
+    rho : (..., n − 1) array, ordered as damper_pairs(n, damper_idx)
+    """
+    q = np.asarray(positions, dtype=float)
+    m = np.asarray(masses, dtype=float)
+    n = len(m)
+    r = q[..., :, None, :] - q[..., None, :, :]
+    d = np.maximum(np.sqrt(np.sum(r * r, axis=-1)), softening)
+    W = G * m[:, None] * m[None, :] / d**3
+
+    bodies = np.array([i for i in range(n) if i != damper_idx])
+    iu, ju = np.triu_indices(len(bodies), k=1)
+    if len(iu):
+        w_natural = W[..., bodies[iu], bodies[ju]].mean(axis=-1)
+    else:
+        w_natural = np.zeros(q.shape[:-2])
+    w_natural = np.maximum(w_natural, 1e-12)
+    return W[..., damper_idx, bodies] / w_natural[..., None]
+
+
 if __name__ == '__main__':
     # Self-test
     err, passed = verify_smooth_weight()
@@ -0,0 +1,251 @@
+"""
+Record and Replay MuJoCo Trajectories
+
+Rendering footage by re-running controller and physics is wasteful: the
+picture depends only on the state.  TrajectoryRecorder stores the state
+fields of every recorded step (qpos and mocap poses by default; add
+qvel, ctrl, xfrc_applied to reproduce contact-force visualisation) as
+float32 arrays in one compressed .npz:
+
+    rec = TrajectoryRecorder(model)
+    for step in range(n_steps):
+        ...
+        mujoco.mj_step(model, data)
+        rec.record(data)
+    rec.save('run.npz', xml_path=xml_path)
+
+replay_video() then writes any set of cameras, resolution and frame
+rate from the file.  Each output frame restores the nearest recorded
+state and calls mj_forward — no controller, no integration — and the
+frames are rendered in parallel over frame ranges by worker processes
+(each with its own model and GL context) and streamed in order into
+one incremental writer per camera.
+
+mujoco and imageio are imported on first use.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+DEFAULT_FIELDS = ('qpos', 'mocap_pos', 'mocap_quat')
+
+
+class TrajectoryRecorder:
+    """Per-step MjData fields, saved as one compressed .npz.
+
+    Parameters
+    ----------
+    model : mujoco.MjModel
+    fields : sequence of str
+        MjData attributes to store each step (empty ones are skipped).
+    every : int
+        Keep one call out of every `every` to record().
+    dtype : numpy dtype
+        Storage type (float32 halves the file; ample for rendering).
+    """
+
+    def __init__(self, model, fields=DEFAULT_FIELDS, every=1,
+                 dtype=np.float32):
+        self.fields = tuple(fields)
+        self.every = max(int(every), 1)
+        self.dtype = dtype
+        self.nq = model.nq
+        self._rows = {k: [] for k in ('time',) + self.fields}
+        self._calls = 0
+
+    def __len__(self):
+        return len(self._rows['time'])
+
+    def record(self, data):
+        """Store the current state of `data` (timestamped by data.time)."""
+        self._calls += 1
+        if (self._calls - 1) % self.every:
+            return
+        self._rows['time'].append(data.time)
+        for k in self.fields:
+            self._rows[k].append(np.array(getattr(data, k), self.dtype))
+
+    def save(self, path, **meta):
+        """Write the recording; meta (e.g. xml_path, fps) is stored too."""
+        arrays = {'time': np.asarray(self._rows['time'])}
+        for k in self.fields:
+            value = np.stack(self._rows[k]) if self._rows[k] else np.empty(0)
+            if value.size:
+                arrays[k] = value
+        meta = {f'meta_{k}': np.asarray(v) for k, v in meta.items()}
+        np.savez_compressed(path, nq=self.nq, **arrays, **meta)
+        return path
+
+
+def load_trajectory(path):
+    """Load a recording → dict of arrays; metadata under 'meta'."""
+    with np.load(path, allow_pickle=False) as f:
+        traj = {k: f[k] for k in f.files if not k.startswith('meta_')}
+        traj['meta'] = {k[5:]: f[k][()] for k in f.files
+                        if k.startswith('meta_')}
+    return traj
+
+
+def frame_indices(times, fps, t_start=None, t_end=None):
+    """Indices of the recorded states nearest to a uniform fps grid."""
+    times = np.asarray(times)
+    if len(times) == 1:
+        return np.zeros(1, dtype=int)
+    t0 = times[0] if t_start is None else t_start
+    t1 = times[-1] if t_end is None else t_end
+    grid = np.arange(t0, t1 + 1e-9, 1.0 / fps)
+    idx = np.clip(np.searchsorted(times, grid), 1, len(times) - 1)
+    left = times[idx - 1]
+    return np.where(grid - left < times[idx] - grid, idx - 1, idx)
+
+
+def make_camera(model, spec):
+    """MjvCamera from a spec.
+
+    spec : str or int — fixed model camera (name or id); dict — free
+        camera with any of lookat, distance, azimuth, elevation.
+    """
+    import mujoco
+
+    camera = mujoco.MjvCamera()
+    if isinstance(spec, (str, int, np.integer)):
+        camera.type = mujoco.mjtCamera.mjCAMERA_FIXED
+        camera.fixedcamid = (spec if not isinstance(spec, str) else
+                             mujoco.mj_name2id(
+                                 model, mujoco.mjtObj.mjOBJ_CAMERA, spec))
+        return camera
+    camera.type = mujoco.mjtCamera.mjCAMERA_FREE
+    for key, value in spec.items():
+        if key == 'lookat':
+            camera.lookat[:] = value
+        else:
+            setattr(camera, key, value)
+    return camera
+
+
+def render_frames(model, traj, indices, cameras, width=640, height=480,
+                  vis_flags=()):
+    """Render recorded states `indices` for every camera.
+
+    Parameters
+    ----------
+    model : mujoco.MjModel
+    traj : dict from load_trajectory
+    indices : sequence of int
+    cameras : list of camera specs (see make_camera)
+    width, height : int
+    vis_flags : sequence of mjtVisFlag names to enable
+        (e.g. 'mjVIS_CONTACTPOINT')
+
+    Returns
+    -------
+    frames : list (per camera) of (len(indices), height, width, 3) uint8
+    """
+    import mujoco
+
+    data = mujoco.MjData(model)
+    option = mujoco.MjvOption()
+    for name in vis_flags:
+        option.flags[getattr(mujoco.mjtVisFlag, name)] = True
+    cams = [make_camera(model, spec) for spec in cameras]
+    fields = [k for k in traj if k not in ('time', 'nq', 'meta')]
+
+    frames = [np.empty((len(indices), height, width, 3), np.uint8)
+              for _ in cams]
+    renderer = mujoco.Renderer(model, height=height, width=width)
+    try:
+        for n, i in enumerate(indices):
+            for k in fields:
+                getattr(data, k)[:] = traj[k][i]
+            data.time = traj['time'][i]
+            mujoco.mj_forward(model, data)
+            for c, camera in enumerate(cams):
+                renderer.update_scene(data, camera=camera,
+                                      scene_option=option)
+                frames[c][n] = renderer.render()
+    finally:
+        renderer.close()
+    return frames
+
+
+def _render_chunk(args):
+    """Worker: load model + recording once per call, render a range."""
+    import mujoco
+
+    xml_path, traj_path, indices, cameras, width, height, vis_flags = args
+    model = mujoco.MjModel.from_xml_path(xml_path)
+    traj = load_trajectory(traj_path)
+    return render_frames(model, traj, indices, cameras, width, height,
+                         vis_flags)
+
+
+def _bounded_map(pool, fn, tasks, window):
+    """pool.map in order with at most `window` tasks in flight."""
+    tasks = iter(tasks)
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def replay_video(traj_path, out_paths, cameras, xml_path=None, fps=30,
+                 width=640, height=480, vis_flags=(), n_workers=None,
+                 chunk=64, t_start=None, t_end=None):
+    """Render a recording to one video per camera, without re-simulating.
+
+    Parameters
+    ----------
+    traj_path : str — file written by TrajectoryRecorder.save
+    out_paths : list of str — one output video per camera
+    cameras : list of camera specs (see make_camera)
+    xml_path : str or None — model file (default: recorded meta xml_path)
+    fps, width, height : output format
+    vis_flags : mjtVisFlag names to enable
+    n_workers : int or None — None → os.cpu_count(), 1 → in-process
+    chunk : int — frames per worker task; at most 2·n_workers chunks
+        are in flight, so memory does not grow with video length
+    t_start, t_end : float or None — time window
+
+    Returns
+    -------
+    n_frames : int — frames written per video
+    """
+    import imageio
+
+    traj = load_trajectory(traj_path)
+    if xml_path is None:
+        xml_path = str(traj['meta']['xml_path'])
+    indices = frame_indices(traj['time'], fps, t_start, t_end)
+    tasks = [(xml_path, traj_path, indices[s:s + chunk], list(cameras),
+              width, height, tuple(vis_flags))
+             for s in range(0, len(indices), chunk)]
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(tasks))
+    pool = (ProcessPoolExecutor(max_workers=n_workers)
+            if n_workers > 1 else None)
+    writers = [imageio.get_writer(p, fps=fps, quality=8) for p in out_paths]
+    try:
+        if pool is None:
+            results = map(_render_chunk, tasks)
+        else:
+            results = _bounded_map(pool, _render_chunk, tasks,
+                                   2 * n_workers)
+        for per_camera in results:       # in order, chunk by chunk
+            for writer, frames in zip(writers, per_camera):
+                for frame in frames:
+                    writer.append_data(frame)
+    finally:
+        for writer in writers:
+            writer.close()
+        if pool is not None:
+            pool.shutdown()
+    return len(indices)
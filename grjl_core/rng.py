@@ -0,0 +1,41 @@
+"""
+Random Streams for Reproducible Parallel Runs
+
+Stochastic components take a `seed` or `rng` argument in any form
+np.random.default_rng accepts — None, an int, a SeedSequence or a
+Generator — and draw only from the Generator built from it, never from
+the global np.random state.  A run is then fixed by its root seed.
+
+For worker pools, spawn() splits the root into independent child
+SeedSequences, one per task (not per worker), so the result depends on
+the root seed and the task split only — not on the number of workers
+or the order in which tasks finish:
+
+    tasks = [(child, ...) for child in spawn(seed, n_tasks)]
+    results = pool.map(worker, tasks)    # worker: default_rng(child)
+
+Children are small and picklable; spawning from an int twice gives the
+same children, spawning twice from the same SeedSequence or Generator
+gives fresh ones.
+"""
+
+import numpy as np
+
+
+def seed_sequence(seed=None):
+    """SeedSequence behind an int, None, SeedSequence or Generator."""
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return seed.bit_generator.seed_seq
+    return np.random.SeedSequence(seed)
+
+
+def spawn(seed, n):
+    """n independent child SeedSequences of `seed`."""
+    return seed_sequence(seed).spawn(n)
+
+
+def spawn_generators(seed, n):
+    """n independent Generators, one per child of `seed`."""
+    return [np.random.default_rng(child) for child in spawn(seed, n)]
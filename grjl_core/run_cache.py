@@ -0,0 +1,190 @@
+"""
+Content-Addressed Cache of Simulation Runs
+
+The comparison scripts replay the same simulations every time a figure
+is touched.  RunCache stores each run's log as one .npz file named by
+
+    sha1(function name, parameters, source of the modules it depends on)
+
+so a rerun with unchanged code and arguments loads the log from disk,
+and any edit to the simulator (or to a repo module it imports, such as
+order_parameter or sim_log) changes the key and forces a fresh run:
+
+    cache = RunCache('outputs/run_cache')
+    log_v2, log_nd = cache.run_many([
+        (simulate_reactive, {'use_damper': True, 'headless': True}),
+        (simulate_reactive, {'use_damper': False, 'headless': True}),
+    ], n_workers=2)
+
+The dependency set is the closure of the function's module over the
+repo modules bound in its globals (imports inside function bodies are
+not seen; pass them as `deps`).  Stochastic simulators are cached as
+one sample — pass their seed as a parameter if that matters.
+
+Every run — cached, simulated in-process or in a worker — comes back
+in the same form: a plain dict of arrays with 0-d entries unwrapped to
+scalars, as from SimLog.load.  Array parameters are keyed by their
+dtype, shape and bytes, never by their (summarised) repr.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+_REPO = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+def _repo_file(module):
+    """Real path of a module's source if it lives in this repo, else None."""
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    if (not path.startswith(_REPO + os.sep) or 'site-packages' in path
+            or not path.endswith('.py')):
+        return None
+    return path
+
+
+def source_files(fn, deps=()):
+    """Repo source files `fn` depends on (transitively, via globals)."""
+    stack = [sys.modules[fn.__module__]]
+    stack += [sys.modules[d] if isinstance(d, str) else d for d in deps]
+    files = set()
+    while stack:
+        module = stack.pop()
+        path = _repo_file(module)
+        if path is None or path in files:
+            continue
+        files.add(path)
+        for value in vars(module).values():
+            if isinstance(value, types.ModuleType):
+                stack.append(value)
+            else:
+                owner = sys.modules.get(getattr(value, '__module__', None)
+                                        or '')
+                if owner is not None:
+                    stack.append(owner)
+    return sorted(files)
+
+
+def source_digest(fn, deps=()):
+    """sha1 over the repo source files `fn` depends on."""
+    h = hashlib.sha1()
+    for path in source_files(fn, deps):
+        h.update(os.path.relpath(path, _REPO).encode())
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _to_arrays(log):
+    return {k: np.asarray(v) for k, v in dict(log).items()}
+
+
+def _unwrap(arrays):
+    """0-d entries back to scalars — the form get() returns."""
+    return {k: v[()] if v.ndim == 0 else v for k, v in arrays.items()}
+
+
+def _canonical(value):
+    """JSON-able stand-in for a parameter; arrays by content digest."""
+    if isinstance(value, np.ndarray):
+        data = (repr(value.tolist()).encode() if value.dtype == object
+                else np.ascontiguousarray(value).tobytes())
+        return {'ndarray': value.dtype.str, 'shape': list(value.shape),
+                'sha1': hashlib.sha1(data).hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def _run_job(args):
+    """Worker: run one simulation, return its log as arrays."""
+    fn, params = args
+    return _to_arrays(fn(**params))
+
+
+class RunCache:
+    """One .npz file per simulation run, keyed by content hash.
+
+    Parameters
+    ----------
+    path : str or None
+        Cache directory (created on demand); None disables caching.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(fn, params, deps=()):
+        blob = json.dumps({'fn': f'{fn.__module__}.{fn.__qualname__}',
+                           'params': _canonical(params),
+                           'source': source_digest(fn, deps)},
+                          sort_keys=True, default=repr)
+        return hashlib.sha1(blob.encode()).hexdigest()
+
+    def get(self, key):
+        if self.path is None:
+            return None
+        fname = os.path.join(self.path, f'{key}.npz')
+        if not os.path.isfile(fname):
+            return None
+        with np.load(fname, allow_pickle=True) as data:
+            return _unwrap({k: data[k] for k in data.files})
+
+    def put(self, key, log):
+        if self.path is None:
+            return
+        fname = os.path.join(self.path, f'{key}.npz')
+        tmp = f'{fname}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(tmp, **_to_arrays(log))
+        os.replace(tmp, fname)   # atomic: no half-written entries
+
+    def run(self, fn, deps=(), **params):
+        """fn(**params), served from the cache when possible."""
+        return self.run_many([(fn, params)], n_workers=1, deps=deps)[0]
+
+    def run_many(self, jobs, n_workers=None, deps=()):
+        """Logs of a list of (fn, params) jobs, in order.
+
+        Cache misses go to one process pool; n_workers None →
+        os.cpu_count(), 1 → in-process.  `fn` must be importable by
+        name (a module-level function) for the pool.
+        """
+        jobs = [(fn, dict(params)) for fn, params in jobs]
+        keys = [self.key(fn, params, deps) for fn, params in jobs]
+        logs = [self.get(k) for k in keys]
+        todo = [i for i, log in enumerate(logs) if log is None]
+        self.hits += len(jobs) - len(todo)
+        self.misses += len(todo)
+
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = min(n_workers, len(todo))
+        if n_workers > 1:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                fresh = list(pool.map(_run_job, [jobs[i] for i in todo]))
+        else:
+            fresh = [jobs[i][0](**jobs[i][1]) for i in todo]
+
+        for i, log in zip(todo, fresh):
+            arrays = _to_arrays(log)
+            self.put(keys[i], arrays)
+            logs[i] = _unwrap(arrays)
+        return logs
@@ -8,6 +8,10 @@ via eigenvector perturbation theory:
 
 where v_1 is the Fiedler eigenvector of the graph Laplacian L.
 
+The Laplacian and the gradient are built from the pairwise distance
+matrix in one pass and accept positions with leading batch dimensions,
+(..., n, 3), using numpy's batched eigh.
+
 Reference: threebody.tex lines 50-55 (tidal coupling weights),
            existing graph_laplacian() in threebody_damper.py line 56.
 """
@@ -20,22 +24,26 @@ def graph_laplacian_with_eigenvectors(positions, masses, G=0.5,
                                        softening=0.05):
     """Compute graph Laplacian, eigenvalues, and eigenvectors.
 
+    Parameters
+    ----------
+    positions : list of (3,) arrays or (..., n, 3) array
+    masses : (n,) list or array
+
     Returns
     -------
-    L : (n, n) array
-    eigenvalues : (n,) array, ascending
-    eigenvectors : (n, n) array, columns are eigenvectors
+    L : (..., n, n) array
+    eigenvalues : (..., n) array, ascending
+    eigenvectors : (..., n, n) array, columns are eigenvectors
     """
-    n = len(masses)
-    L = np.zeros((n, n))
-    for i in range(n):
-        for j in range(i + 1, n):
-            d = max(norm(positions[i] - positions[j]), softening)
-            w = G * masses[i] * masses[j] / d**3
-            L[i, i] += w
-            L[j, j] += w
-            L[i, j] -= w
-            L[j, i] -= w
+    q = np.asarray(positions, dtype=float)
+    m = np.asarray(masses, dtype=float)
+    r = q[..., :, None, :] - q[..., None, :, :]
+    d = np.maximum(np.sqrt(np.sum(r * r, axis=-1)), softening)
+    W = G * m[:, None] * m[None, :] / d**3
+    W = W * (1.0 - np.eye(len(m)))
+    L = -W
+    idx = np.arange(len(m))
+    L[..., idx, idx] = W.sum(axis=-1)
     eigenvalues, eigenvectors = eigh(L)
     return L, eigenvalues, eigenvectors
 
@@ -52,7 +60,7 @@ def spectral_gradient_analytical(positions, masses, damper_idx=3,
 
     Parameters
     ----------
-    positions : list of (3,) arrays
+    positions : list of (3,) arrays or (..., n, 3) array
     masses : list of float
     damper_idx : int
     G : float
@@ -60,46 +68,35 @@ def spectral_gradient_analytical(positions, masses, damper_idx=3,
 
     Returns
     -------
-    grad : (3,) array
+    grad : (..., 3) array
         Gradient of lambda_1 w.r.t. q*.
     """
-    n = len(masses)
-    _, eigenvalues, eigenvectors = graph_laplacian_with_eigenvectors(
-        positions, masses, G, softening)
-
-    v1 = eigenvectors[:, 1]  # Fiedler eigenvector
-    lambda1 = eigenvalues[1]
-
-    q_star = np.asarray(positions[damper_idx])
-    m_star = masses[damper_idx]
-    grad = np.zeros(3)
-
-    for j in range(n):
-        if j == damper_idx:
-            continue
-
-        r = np.asarray(positions[j]) - q_star
-        d = max(norm(r), softening)
-
-        # dw_{*j}/dq*  (3-vector)
-        # w = G m_* m_j / d^3,  d = |q_j - q*|
-        # dd/dq*_k = -(q_j - q*)_k / d = -r_k / d
-        # dw/dq*_k = -3 G m_* m_j / d^4 * (dd/dq*_k)
-        #          = +3 G m_* m_j / d^5 * r_k
-        dw_dqstar = 3.0 * G * m_star * masses[j] / d**5 * r
-
-        # For each coordinate k, build dL/dq*_k and compute v1^T dL v1
-        # dL/dq*_k has entries:
-        #   dL[*,*] += dw_k,  dL[j,j] += dw_k
-        #   dL[*,j] -= dw_k,  dL[j,*] -= dw_k
-        #
-        # v1^T dL v1 = dw_k * (v1[*]^2 + v1[j]^2 - 2*v1[*]*v1[j])
-        #            = dw_k * (v1[*] - v1[j])^2
-        diff_sq = (v1[damper_idx] - v1[j])**2
-
-        grad += dw_dqstar * diff_sq
-
-    return grad
+    q = np.asarray(positions, dtype=float)
+    m = np.asarray(masses, dtype=float)
+    _, _, eigenvectors = graph_laplacian_with_eigenvectors(
+        q, m, G, softening)
+    v1 = eigenvectors[..., :, 1]  # Fiedler eigenvector
+
+    others = np.array([j for j in range(len(m)) if j != damper_idx])
+    r = q[..., others, :] - q[..., damper_idx, None, :]
+    d = np.maximum(np.linalg.norm(r, axis=-1), softening)
+
+    # dw_{*j}/dq*  (3-vector per body j)
+    # w = G m_* m_j / d^3,  d = |q_j - q*|
+    # dd/dq*_k = -(q_j - q*)_k / d = -r_k / d
+    # dw/dq*_k = -3 G m_* m_j / d^4 * (dd/dq*_k)
+    #          = +3 G m_* m_j / d^5 * r_k
+    dw_dqstar = (3.0 * G * m[damper_idx] * m[others] / d**5)[..., None] * r
+
+    # dL/dq*_k has entries:
+    #   dL[*,*] += dw_k,  dL[j,j] += dw_k
+    #   dL[*,j] -= dw_k,  dL[j,*] -= dw_k
+    #
+    # v1^T dL v1 = dw_k * (v1[*]^2 + v1[j]^2 - 2*v1[*]*v1[j])
+    #            = dw_k * (v1[*] - v1[j])^2
+    diff_sq = (v1[..., damper_idx, None] - v1[..., others])**2
+
+    return np.sum(dw_dqstar * diff_sq[..., None], axis=-2)
 
 
 def spectral_gradient_finite_diff(positions, masses, damper_idx=3,